@@ -54,6 +54,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add WhiteNoise for production
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -62,6 +63,61 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Response compression (core.middleware.CompressionMiddleware). Static files
+# are served precompressed by WhiteNoise; api responses of the listed types
+# and at least COMPRESSION_MIN_SIZE bytes are compressed with the client's
+# preferred encoding. Brotli quality 4 and gzip level 6 are the usual
+# trade-offs for bodies compressed on every request.
+COMPRESSION_ENCODINGS = [
+    encoding.strip()
+    for encoding in os.environ.get('COMPRESSION_ENCODINGS', 'br,gzip').split(',')
+    if encoding.strip()
+]
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6'))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '4'))
+COMPRESSION_CONTENT_TYPES = [
+    'application/json',
+    'application/vnd.oai.openapi+json',
+    'application/vnd.oai.openapi',
+    'application/x-ndjson',
+    'text/csv',
+    'text/plain',
+]
+
+# Load testing: report the queries each request ran in X-DB-Queries and
+# X-DB-Time headers (benchmarks/loadtest.py reads them).
+QUERY_COUNT_HEADER = os.environ.get('QUERY_COUNT_HEADER', 'false').lower() == 'true'
+if QUERY_COUNT_HEADER:
+    MIDDLEWARE.insert(0, 'core.middleware.QueryCountMiddleware')
+
+# Per-view request metrics (core.metrics), served at /metrics. Workers write
+# snapshots to METRICS_DIR at most every METRICS_FLUSH_INTERVAL seconds; all
+# workers of a server must share the directory. /metrics is only served with
+# METRICS_TOKEN set, to scrapers sending "Authorization: Bearer <token>".
+# SERVER_TIMING=true adds a Server-Timing header with the same numbers to
+# every response.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'false').lower() == 'true'
+METRICS_DIR = os.environ.get('METRICS_DIR', '/tmp/recipe-api-metrics')
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', '1'))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+SERVER_TIMING = os.environ.get('SERVER_TIMING', 'false').lower() == 'true'
+if METRICS_ENABLED:
+    MIDDLEWARE.insert(0, 'core.middleware.MetricsMiddleware')
+
+# On-demand profiling (core.middleware.ProfilingMiddleware). Requests with an
+# X-Profile header from staff users, or carrying PROFILING_TOKEN, and a
+# PROFILING_SAMPLE_RATE fraction of all requests are profiled with cProfile.
+# The newest PROFILING_MAX_PROFILES profiles are kept in PROFILING_DIR.
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+PROFILING_DIR = os.environ.get('PROFILING_DIR', '/tmp/recipe-api-profiles')
+PROFILING_MAX_PROFILES = int(os.environ.get('PROFILING_MAX_PROFILES', '100'))
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN', '')
+if PROFILING_ENABLED:
+    # After MetricsMiddleware so the serializer time is shared with it.
+    MIDDLEWARE.insert(1 if METRICS_ENABLED else 0, 'core.middleware.ProfilingMiddleware')
+
 ROOT_URLCONF = 'app.urls'
 
 TEMPLATES = [
@@ -86,13 +142,26 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Connections are kept open for DB_CONN_MAX_AGE seconds and checked before
+# being reused, so each worker thread holds one connection instead of
+# opening a new one per request. Use 0 under ASGI (asgi.py sets it), where
+# request threads do not outlive the request. Behind PgBouncer in
+# transaction mode set DB_POOLER=transaction.
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', '600'))
+DB_CONN_HEALTH_CHECKS = os.environ.get('DB_CONN_HEALTH_CHECKS', 'true').lower() == 'true'
+DB_POOLER = os.environ.get('DB_POOLER', '').lower()
+
 # Check if we have a DATABASE_URL (for Render deployment)
 DATABASE_URL = os.environ.get('DATABASE_URL')
 
 if DATABASE_URL:
     # Production database configuration (Render)
     DATABASES = {
-        'default': dj_database_url.parse(DATABASE_URL)
+        'default': dj_database_url.parse(
+            DATABASE_URL,
+            conn_max_age=DB_CONN_MAX_AGE,
+            conn_health_checks=DB_CONN_HEALTH_CHECKS,
+        )
     }
 else:
     # Development database configuration (Docker)
@@ -103,10 +172,16 @@ else:
             'NAME': os.environ.get('DB_NAME'),
             'USER': os.environ.get('DB_USER'),
             'PASSWORD': os.environ.get('DB_PASS'),
-            'PORT': os.environ.get('DB_PORT', '5432')
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
         }
     }
 
+if DB_POOLER == 'transaction':
+    # Server-side cursors do not survive PgBouncer's transaction pooling.
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -166,9 +241,82 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'core.User'
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Same JSON as DRF's JSONRenderer, encoded with orjson.
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 
 }
 
+def bounded_cache_options(backend, max_entries):
+    """MAX_ENTRIES/CULL_FREQUENCY for backends that support them"""
+    if backend.endswith('RedisCache'):
+        return {}
+    return {'MAX_ENTRIES': max_entries, 'CULL_FREQUENCY': 10}
+
+
+# Caches. The "api" cache holds per-user list responses (recipe.cache); entries
+# are keyed on a per-user version stored in the database, so any backend is
+# safe with several workers. Set API_CACHE_BACKEND to e.g.
+# django.core.cache.backends.filebased.FileBasedCache or
+# django.core.cache.backends.redis.RedisCache (with API_CACHE_LOCATION) to
+# share entries between workers. LocMemCache evicts least recently used
+# entries once API_CACHE_MAX_ENTRIES is reached; for Redis configure
+# maxmemory with an allkeys-lru policy on the server instead.
+API_CACHE_BACKEND = os.environ.get(
+    'API_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+)
+AUTH_CACHE_BACKEND = os.environ.get(
+    'AUTH_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Token -> user id and flags for user.authentication. Deleting a token
+    # or deactivating a user must reach every worker at once, so gunicorn
+    # workers only use the per-process default when there is a single
+    # worker; point AUTH_CACHE_BACKEND at Redis or memcached to cache with
+    # several. Never use a file cache in a shared directory: cache entries
+    # are unpickled.
+    'auth': {
+        'BACKEND': AUTH_CACHE_BACKEND,
+        'LOCATION': os.environ.get('AUTH_CACHE_LOCATION', 'recipe-api-auth'),
+        'TIMEOUT': int(os.environ.get('AUTH_CACHE_TIMEOUT', '60')),
+        'OPTIONS': bounded_cache_options(
+            AUTH_CACHE_BACKEND,
+            int(os.environ.get('AUTH_CACHE_MAX_ENTRIES', '10000')),
+        ),
+    },
+    'api': {
+        'BACKEND': API_CACHE_BACKEND,
+        'LOCATION': os.environ.get('API_CACHE_LOCATION', 'recipe-api'),
+        'TIMEOUT': int(os.environ.get('API_CACHE_TIMEOUT', '300')),
+        'OPTIONS': bounded_cache_options(
+            API_CACHE_BACKEND,
+            int(os.environ.get('API_CACHE_MAX_ENTRIES', '5000')),
+        ),
+    },
+}
+
+# Threads per process generating resized recipe images (recipe.images).
+# 0 processes uploads inline right after the request's transaction commits.
+IMAGE_PROCESSING_WORKERS = int(os.environ.get('IMAGE_PROCESSING_WORKERS', '2'))
+
+# Keyset pagination for the recipe, tag and ingredient lists. It is opt-in:
+# clients enable it by sending ?page_size= or ?cursor=.
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', '50'))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', '500'))
+
+# Recipes read per database round trip by the streaming export
+# (recipe.export); bounds a worker's memory during an export.
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', '500'))
+
+# Largest file accepted by the recipe import, in bytes.
+IMPORT_MAX_UPLOAD_SIZE = int(os.environ.get('IMPORT_MAX_UPLOAD_SIZE', str(50 * 1024 * 1024)))
+
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
 }
@@ -26,8 +26,10 @@ from django.contrib import admin
 from django.urls import path,include
 from django.conf.urls.static import static
 from django.conf import settings
+from core.views import metrics_view
 urlpatterns = [
      path('admin/', admin.site.urls),
+     path('metrics', metrics_view, name='metrics'),
      path('api/schema/',SpectacularAPIView.as_view(),name= 'api_schema'),
      path(
          'api/docs/',
@@ -36,7 +38,8 @@ urlpatterns = [
 
      ),
      path('api/user/', include('user.urls')),
-     path('api/recipe/', include('recipe.urls'))
+     path('api/recipe/', include('recipe.urls')),
+     path('api/async/recipe/', include('recipe.async_urls')),
 ]
 
 
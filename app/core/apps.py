@@ -4,3 +4,30 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from core import compression, db, metrics, signals
+        signals.connect()
+        db.connect()
+        metrics.registry.register_collector(
+            'recipe_api_db_connections_opened_total',
+            'Database connections opened.',
+            lambda: db.stats.snapshot()['opened'],
+        )
+        metrics.registry.register_collector(
+            'recipe_api_db_connections_reused_total',
+            'Requests that reused an open database connection.',
+            lambda: db.stats.snapshot()['reused'],
+        )
+        metrics.registry.register_collector(
+            'recipe_api_compression_input_bytes_total',
+            'Response bytes before compression.',
+            lambda: {(key,): value for key, value in compression.stats.snapshot()['input'].items()},
+            labelnames=('encoding',),
+        )
+        metrics.registry.register_collector(
+            'recipe_api_compression_output_bytes_total',
+            'Response bytes after compression.',
+            lambda: {(key,): value for key, value in compression.stats.snapshot()['output'].items()},
+            labelnames=('encoding',),
+        )
@@ -0,0 +1,118 @@
+"""
+Negotiated gzip / brotli compression of api responses
+
+``negotiate`` picks the encoding from the Accept-Encoding header and
+``compressor`` returns an incremental encoder, so streaming responses are
+compressed chunk by chunk with a flush after each one: clients still get
+the rows as they are produced. ``stats`` counts the bytes before and after
+compression per encoding for /metrics.
+
+Brotli needs the ``Brotli`` package; without it only gzip is offered.
+"""
+import threading
+import zlib
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is in requirements.txt
+    brotli = None
+
+
+def available_encodings():
+    """Supported encodings, preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encoding, encodings):
+    """The first of ``encodings`` the client accepts, or None.
+
+    ``encodings`` is in server preference order; a q-value of 0 refuses an
+    encoding and ``*`` stands for any encoding not listed.
+    """
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class _GzipCompressor:
+
+    def __init__(self, level):
+        # wbits=31: zlib stream with a gzip header and trailer.
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliCompressor:
+
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def compressor(encoding, level):
+    """An encoder with ``compress(chunk)`` and ``finish()`` for ``encoding``"""
+    if encoding == 'br':
+        return _BrotliCompressor(level)
+    return _GzipCompressor(level)
+
+
+def compress(encoding, level, data):
+    """``data`` compressed in one go"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    encoder = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return encoder.compress(data) + encoder.flush(zlib.Z_FINISH)
+
+
+class CompressionStats:
+    """Process-local byte counters per encoding, read with ``snapshot()``"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.input_bytes = {}
+            self.output_bytes = {}
+
+    def record(self, encoding, input_bytes, output_bytes):
+        with self._lock:
+            self.input_bytes[encoding] = self.input_bytes.get(encoding, 0) + input_bytes
+            self.output_bytes[encoding] = self.output_bytes.get(encoding, 0) + output_bytes
+
+    def snapshot(self):
+        with self._lock:
+            return {'input': dict(self.input_bytes), 'output': dict(self.output_bytes)}
+
+
+stats = CompressionStats()
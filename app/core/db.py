@@ -0,0 +1,97 @@
+"""
+Database connection reuse: sizing and statistics
+
+Connections are kept open between requests (CONN_MAX_AGE) and checked
+before reuse (CONN_HEALTH_CHECKS), so every thread of a worker holds at most
+one connection of its own. That makes a worker's share of the database's
+connection limit a matter of counting threads, which gunicorn.conf.py does
+with ``max_workers`` before it starts the workers.
+
+This module must stay importable without configured settings: the gunicorn
+config imports it before Django is set up.
+"""
+import threading
+
+
+def connections_per_worker(threads=1, background_threads=0):
+    """Connections one worker process can hold at once.
+
+    ``threads`` are the request threads, ``background_threads`` other pools
+    that query the database (e.g. IMAGE_PROCESSING_WORKERS).
+    """
+    return max(1, threads) + max(0, background_threads)
+
+
+def max_workers(max_connections, per_worker, reserved=0):
+    """Most workers that fit in the database's connection limit.
+
+    ``reserved`` connections are kept free for migrations, shells and the
+    admin. Returns None if there is no limit to respect and at least 1
+    otherwise, even if a single worker already exceeds the budget.
+    """
+    if not max_connections:
+        return None
+    return max(1, (max_connections - reserved) // per_worker)
+
+
+class ConnectionStats:
+    """Process-local counters of connection reuse.
+
+    ``requests`` counts requests, ``reused`` those that started with a
+    connection left open by an earlier request and ``opened`` new
+    connections. Read them with ``snapshot()``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.reused = 0
+            self.opened = 0
+
+    def record_request(self, reused):
+        with self._lock:
+            self.requests += 1
+            if reused:
+                self.reused += 1
+
+    def record_opened(self):
+        with self._lock:
+            self.opened += 1
+
+    def snapshot(self):
+        with self._lock:
+            requests, reused, opened = self.requests, self.reused, self.opened
+        return {
+            'requests': requests,
+            'reused': reused,
+            'opened': opened,
+            'reuse_ratio': reused / requests if requests else 0.0,
+        }
+
+
+stats = ConnectionStats()
+
+
+def _request_started(sender, **kwargs):
+    from django.db import connection
+
+    # Django's own request_started handler has already closed connections
+    # that outlived CONN_MAX_AGE, so whatever is still open gets reused.
+    stats.record_request(reused=connection.connection is not None)
+
+
+def _connection_created(sender, connection, **kwargs):
+    stats.record_opened()
+
+
+def connect():
+    """Connect the statistics handlers, called from CoreConfig.ready()"""
+    from django.core.signals import request_started
+    from django.db.backends.signals import connection_created
+
+    request_started.connect(_request_started, dispatch_uid='core.db.request_started')
+    connection_created.connect(_connection_created, dispatch_uid='core.db.connection_created')
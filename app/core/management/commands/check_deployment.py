@@ -21,6 +21,18 @@ class Command(BaseCommand):
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'✗ Database connection: FAILED - {e}'))
 
+        # Check connection reuse
+        database = settings.DATABASES['default']
+        self.stdout.write(f"  CONN_MAX_AGE: {database.get('CONN_MAX_AGE', 0)}")
+        self.stdout.write(f"  CONN_HEALTH_CHECKS: {database.get('CONN_HEALTH_CHECKS', False)}")
+        if connection.vendor == 'postgresql':
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("SHOW max_connections")
+                    self.stdout.write(f'  max_connections: {cursor.fetchone()[0]}')
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'✗ max_connections: FAILED - {e}'))
+
         # Check environment variables
         env_vars = ['SECRET_KEY', 'DEBUG']
         for var in env_vars:
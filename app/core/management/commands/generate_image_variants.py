@@ -0,0 +1,34 @@
+"""
+Django command to generate missing resized recipe images
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe
+from recipe.images import process_recipe_image
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate thumbnail/medium variants for recipes whose image has none, '
+        'e.g. after a worker was restarted with uploads still queued'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Regenerate variants for every recipe with an image',
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image1='').exclude(image1__isnull=True)
+        if not options['all']:
+            recipes = recipes.filter(image_variants__isnull=True)
+
+        done = 0
+        for recipe_id in recipes.values_list('id', flat=True).iterator():
+            try:
+                if process_recipe_image(recipe_id):
+                    done += 1
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'Recipe {recipe_id}: {e}'))
+        self.stdout.write(self.style.SUCCESS(f'Generated variants for {done} recipes'))
@@ -0,0 +1,58 @@
+"""
+Django command to bulk import recipes for a user
+"""
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe import importer
+
+
+class Command(BaseCommand):
+    help = (
+        'Import recipes for a user from a JSON Lines or CSV file in the '
+        'format of the recipe export. Invalid rows are reported and skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' for stdin")
+        parser.add_argument('--user', required=True, help='Email of the owner')
+        parser.add_argument(
+            '--type', choices=importer.IMPORT_TYPES,
+            help='Format of the file (default: from its extension, else jsonl)',
+        )
+        parser.add_argument('--batch-size', type=int, default=importer.DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user {options['user']}")
+
+        path = options['path']
+        import_type = options['type'] or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+        started = time.perf_counter()
+        if path == '-':
+            result = self.run(user, sys.stdin.buffer, import_type, options['batch_size'])
+        else:
+            try:
+                with open(path, 'rb') as stream:
+                    result = self.run(user, stream, import_type, options['batch_size'])
+            except OSError as e:
+                raise CommandError(f'Cannot read {path}: {e}')
+        elapsed = time.perf_counter() - started
+
+        for error in result.errors:
+            self.stdout.write(self.style.ERROR(f"Row {error['row']}: {error['errors']}"))
+        if result.failed > len(result.errors):
+            self.stdout.write(f'... and {result.failed - len(result.errors)} more invalid rows')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.created} recipes, skipped {result.failed} in {elapsed:.1f}s '
+            f'({result.created / max(elapsed, 1e-9):.0f} recipes/s)'
+        ))
+
+    def run(self, user, stream, import_type, batch_size):
+        rows = importer.read_rows(stream, import_type)
+        return importer.import_recipes(user, rows, batch_size)
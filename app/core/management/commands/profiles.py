@@ -0,0 +1,86 @@
+"""
+Django command to list and summarize captured request profiles
+"""
+import io
+import pstats
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import ProfileStore
+
+
+class Command(BaseCommand):
+    help = (
+        'List the request profiles captured by ProfilingMiddleware, or '
+        'summarize one: its database and serializer time and the functions '
+        'it spent the most time in'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('profile_id', nargs='?', help='Profile to summarize')
+        parser.add_argument('--limit', type=int, default=20, help='Rows to show')
+        parser.add_argument(
+            '--sort', default='cumulative',
+            help='pstats sort key for the function table (e.g. tottime, calls)',
+        )
+        parser.add_argument('--clear', action='store_true', help='Delete all profiles')
+
+    def handle(self, *args, **options):
+        store = ProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_PROFILES)
+        if options['clear']:
+            store.clear()
+            self.stdout.write(self.style.SUCCESS('Deleted all profiles'))
+        elif options['profile_id']:
+            self.summarize(store, options['profile_id'], options)
+        else:
+            self.list(store, options['limit'])
+
+    def list(self, store, limit):
+        profiles = store.list()
+        if not profiles:
+            self.stdout.write(f'No profiles in {store.directory}')
+            return
+        self.stdout.write(
+            f"{'id':<28} {'captured':<19} {'total ms':>9} {'db ms':>8} "
+            f"{'queries':>7} {'ser ms':>8}  request"
+        )
+        for info in profiles[:limit]:
+            captured = datetime.fromtimestamp(info['created']).strftime('%Y-%m-%d %H:%M:%S')
+            self.stdout.write(
+                f"{info['id']:<28} {captured:<19} {info['duration'] * 1000:>9.1f} "
+                f"{info['db_duration'] * 1000:>8.1f} {info['db_queries']:>7} "
+                f"{info['serializer_duration'] * 1000:>8.1f}  "
+                f"{info['method']} {info['path']} {info['status']}"
+            )
+
+    def summarize(self, store, profile_id, options):
+        found = store.get(profile_id)
+        if found is None:
+            raise CommandError(f'No profile {profile_id} in {store.directory}')
+        info, path = found
+
+        total = info['duration']
+        self.stdout.write(
+            f"{info['method']} {info['path']} -> {info['status']} "
+            f"({info['view']}, {info['trigger']})"
+        )
+        phases = [
+            ('database', info['db_duration'], f"{info['db_queries']} queries"),
+            ('serializer', info['serializer_duration'], ''),
+            ('other', total - info['db_duration'] - info['serializer_duration'], ''),
+        ]
+        for name, seconds, note in phases:
+            share = seconds / total * 100 if total else 0
+            self.stdout.write(f'  {name:<11}{seconds * 1000:>9.1f} ms {share:>5.1f}%  {note}')
+        self.stdout.write(f"  {'total':<11}{total * 1000:>9.1f} ms")
+        self.stdout.write('')
+
+        buffer = io.StringIO()
+        try:
+            stats = pstats.Stats(str(path), stream=buffer)
+        except (OSError, TypeError) as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+        stats.strip_dirs().sort_stats(options['sort']).print_stats(options['limit'])
+        self.stdout.write(buffer.getvalue())
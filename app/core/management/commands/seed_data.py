@@ -0,0 +1,277 @@
+"""
+Django command to fill the database with synthetic users and recipes
+"""
+import io
+import itertools
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import Recipe, Tag, Ingredient
+from core.signals import notify_users_data_changed
+
+
+TAG_WORDS = [
+    'vegan', 'quick', 'dinner', 'breakfast', 'lunch', 'spicy', 'dessert',
+    'healthy', 'italian', 'mexican', 'indian', 'thai', 'soup', 'salad',
+    'baking', 'grill', 'comfort', 'holiday', 'kids', 'budget',
+]
+INGREDIENT_WORDS = [
+    'tomato', 'onion', 'garlic', 'rice', 'beans', 'cheese', 'chicken',
+    'tofu', 'pepper', 'flour', 'egg', 'milk', 'basil', 'lemon', 'potato',
+    'carrot', 'butter', 'salt', 'sugar', 'olive oil', 'ginger', 'lentils',
+    'spinach', 'mushroom', 'coconut milk', 'pasta', 'beef', 'salmon',
+]
+TITLE_WORDS = [
+    'roasted', 'creamy', 'smoky', 'crispy', 'slow cooked', 'baked',
+    'stir fried', 'grilled', 'stuffed', 'braised',
+]
+DISHES = ['soup', 'stew', 'curry', 'salad', 'pie', 'tacos', 'risotto', 'bowl', 'pasta']
+
+# Recipes inserted per transaction; bounds memory and transaction size.
+CHUNK_RECIPES = 20000
+# Rows per multi-row INSERT; PostgreSQL allows 65535 parameters a statement.
+MAX_INSERT_ROWS = 30000
+
+
+def vocabulary(words, size):
+    """``size`` distinct names, most common first"""
+    return [
+        words[k % len(words)] + (f' {k // len(words)}' if k >= len(words) else '')
+        for k in range(size)
+    ]
+
+
+class ZipfSampler:
+    """Draw distinct ranks 0..n-1 where rank k has weight 1 / (k + 1) ** s"""
+
+    def __init__(self, n, s, rng):
+        self.n = n
+        self.rng = rng
+        self.population = range(n)
+        self.cum_weights = list(itertools.accumulate(1 / (k + 1) ** s for k in range(n)))
+
+    def sample(self, k):
+        k = min(k, self.n)
+        chosen = []
+        seen = set()
+        while len(chosen) < k:
+            for rank in self.rng.choices(self.population, cum_weights=self.cum_weights, k=k):
+                if rank not in seen and len(chosen) < k:
+                    seen.add(rank)
+                    chosen.append(rank)
+        return chosen
+
+
+class Command(BaseCommand):
+    help = (
+        'Create N users with M recipes each, with Zipf-distributed tags and '
+        'ingredients. The data only depends on the options, so runs with '
+        'the same --seed produce the same rows.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--recipes', type=int, default=100, help='Recipes per user')
+        parser.add_argument('--tags', type=int, default=50, help='Distinct tags per user')
+        parser.add_argument(
+            '--ingredients', type=int, default=200, help='Distinct ingredients per user',
+        )
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=6)
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Zipf exponent of tag and ingredient popularity',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='Users are named <prefix>-<seed>-<n>@example.com',
+        )
+        parser.add_argument('--password', default='seedpass123')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--no-copy', dest='copy', action='store_false',
+            help='On PostgreSQL, load the links with multi-row INSERTs instead of COPY',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] <= 0:
+            return
+
+        emails = [
+            f"{options['prefix']}-{options['seed']}-{n}@example.com"
+            for n in range(options['users'])
+        ]
+
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.tag_names = vocabulary(TAG_WORDS, options['tags'])
+        self.ingredient_names = vocabulary(INGREDIENT_WORDS, options['ingredients'])
+        self.tag_sampler = ZipfSampler(len(self.tag_names), options['zipf'], self.rng)
+        self.ingredient_sampler = ZipfSampler(
+            len(self.ingredient_names), options['zipf'], self.rng
+        )
+        # Hashing is deliberately slow; every seeded user shares one hash.
+        self.password = make_password(options['password'], salt=f"seed{options['seed']}")
+
+        users_per_chunk = max(1, CHUNK_RECIPES // max(1, options['recipes']))
+        started = time.perf_counter()
+        totals = {'users': 0, 'recipes': 0, 'links': 0}
+        for offset in range(0, len(emails), users_per_chunk):
+            with transaction.atomic():
+                counts = self.seed_chunk(emails[offset:offset + users_per_chunk])
+            for key, value in counts.items():
+                totals[key] += value
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{totals['users']}/{len(emails)} users, {totals['recipes']} recipes, "
+                f"{totals['links']} links in {elapsed:.1f}s"
+            )
+
+        elapsed = time.perf_counter() - started
+        rows = sum(totals.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {rows} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):.0f} rows/s)'
+        ))
+
+    def seed_chunk(self, emails):
+        options = self.options
+        batch_size = options['batch_size']
+        User = get_user_model()
+
+        # Checked in the chunk's transaction, for every email: a run that
+        # stopped part way leaves users anywhere in the range.
+        if User.objects.filter(email__in=emails).exists():
+            raise CommandError(
+                'Seed users already exist; pick another --seed or --prefix'
+            )
+        User.objects.bulk_create(
+            [User(email=email, name=email.split('@')[0], password=self.password)
+             for email in emails],
+            batch_size=batch_size,
+        )
+        user_ids = dict(User.objects.filter(email__in=emails).values_list('email', 'id'))
+        user_ids = [user_ids[email] for email in emails]
+
+        tag_ids = self.create_names(Tag, user_ids, self.tag_names)
+        ingredient_ids = self.create_names(Ingredient, user_ids, self.ingredient_names)
+
+        recipes = []
+        tag_ranks = []
+        ingredient_ranks = []
+        for user_id in user_ids:
+            for _ in range(options['recipes']):
+                recipe = self.make_recipe(user_id)
+                tag_ranks.append(self.tag_sampler.sample(options['tags_per_recipe']))
+                ranks = self.ingredient_sampler.sample(options['ingredients_per_recipe'])
+                # The raw links below skip the signals that maintain it.
+                recipe.ingredient_count = len(ranks)
+                recipes.append(recipe)
+                ingredient_ranks.append(ranks)
+        Recipe.objects.bulk_create(recipes, batch_size=batch_size)
+        # Re-read the ids: not every backend returns them from bulk inserts.
+        # Rows are inserted in list order, so id order matches it.
+        recipe_rows = list(
+            Recipe.objects.filter(user_id__in=user_ids)
+            .order_by('id').values_list('id', 'user_id')
+        )
+
+        tag_links = [
+            (recipe_id, tag_ids[user_id][rank])
+            for (recipe_id, user_id), ranks in zip(recipe_rows, tag_ranks)
+            for rank in ranks
+        ]
+        ingredient_links = [
+            (recipe_id, ingredient_ids[user_id][rank])
+            for (recipe_id, user_id), ranks in zip(recipe_rows, ingredient_ranks)
+            for rank in ranks
+        ]
+        self.link(Recipe.tags.through, 'tag_id', tag_links)
+        self.link(Recipe.ingredients.through, 'ingredient_id', ingredient_links)
+
+        # Bulk inserts skip the model signals that maintain the data stamp.
+        notify_users_data_changed(user_ids)
+        return {
+            'users': len(user_ids),
+            'recipes': len(recipe_rows),
+            'links': len(tag_links) + len(ingredient_links),
+        }
+
+    def create_names(self, model, user_ids, names):
+        """Create ``names`` for every user; return {user_id: [id by rank]}"""
+        model.objects.bulk_create(
+            [model(user_id=user_id, name=name) for user_id in user_ids for name in names],
+            batch_size=self.options['batch_size'],
+        )
+        ids = {user_id: {} for user_id in user_ids}
+        rows = model.objects.filter(user_id__in=user_ids).values_list('user_id', 'name', 'id')
+        for user_id, name, pk in rows:
+            ids[user_id][name] = pk
+        return {
+            user_id: [by_name[name] for name in names]
+            for user_id, by_name in ids.items()
+        }
+
+    def make_recipe(self, user_id):
+        rng = self.rng
+        title = f'{rng.choice(TITLE_WORDS)} {rng.choice(self.ingredient_names[:20])} {rng.choice(DISHES)}'
+        return Recipe(
+            user_id=user_id,
+            title=title.capitalize(),
+            description=f'A {title} for {rng.randint(1, 8)} people.',
+            time_minutes=rng.randint(5, 180),
+            price=Decimal(rng.randint(100, 5000)) / 100,
+            link='',
+        )
+
+    def link(self, through, target_column, rows):
+        if not rows:
+            return
+        table = through._meta.db_table
+        columns = ['recipe_id', target_column]
+        # The through rows are most of the data: no model instances, and on
+        # PostgreSQL no round trip per row.
+        if connection.vendor == 'postgresql':
+            if self.options['copy']:
+                self.copy_rows(table, columns, rows)
+            else:
+                self.insert_rows(table, columns, rows)
+            return
+        # SQLite runs in process, where executemany costs no round trips.
+        quote = connection.ops.quote_name
+        sql = (
+            f"INSERT INTO {quote(table)} ({', '.join(map(quote, columns))}) "
+            f"VALUES (%s, %s)"
+        )
+        batch_size = self.options['batch_size']
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                cursor.executemany(sql, rows[start:start + batch_size])
+
+    def insert_rows(self, table, columns, rows):
+        quote = connection.ops.quote_name
+        prefix = f"INSERT INTO {quote(table)} ({', '.join(map(quote, columns))}) VALUES "
+        size = min(self.options['batch_size'], MAX_INSERT_ROWS)
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), size):
+                batch = rows[start:start + size]
+                cursor.execute(
+                    prefix + ', '.join(['(%s, %s)'] * len(batch)),
+                    [value for row in batch for value in row],
+                )
+
+    def copy_rows(self, table, columns, rows):
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join(map(str, row)) + '\n')
+        buffer.seek(0)
+        quote = connection.ops.quote_name
+        sql = f"COPY {quote(table)} ({', '.join(map(quote, columns))}) FROM STDIN"
+        with connection.cursor() as cursor:
+            cursor.cursor.copy_expert(sql, buffer)
@@ -0,0 +1,319 @@
+"""
+Request metrics aggregated across worker processes
+
+Each worker records histograms in memory and regularly writes a snapshot
+to ``<METRICS_DIR>/<pid>.json`` with an atomic rename, so readers never see
+a partial file. The /metrics view merges the snapshots of all workers and
+renders them in the Prometheus text format. A worker that exits folds its
+numbers into ``archive.json`` under an exclusive lock, which readers take
+shared, so the totals never double count or go backwards. The gunicorn
+master does the same for workers that were killed before they could.
+
+Like core.db this module does not need configured settings; gunicorn.conf.py
+imports it to reset the directory when the server starts.
+"""
+import bisect
+import contextvars
+import fcntl
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+DEFAULT_DIRECTORY = '/tmp/recipe-api-metrics'
+ARCHIVE_FILE = 'archive.json'
+LOCK_FILE = '.lock'
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Any other request method is counted as OTHER, so clients cannot add
+# series by inventing methods.
+METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+
+
+class Histogram:
+    """A labelled histogram; bucket counts are stored non-cumulative"""
+
+    def __init__(self, name, documentation, buckets, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        with self._lock:
+            series = {
+                json.dumps(key): {'buckets': list(counts), 'sum': total, 'count': count}
+                for key, (counts, total, count) in self._series.items()
+            }
+        return {
+            'type': 'histogram',
+            'help': self.documentation,
+            'buckets': list(self.buckets),
+            'labels': list(self.labelnames),
+            'series': series,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._series = {}
+
+
+class Registry:
+    """The histograms and counter collectors of one process"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.collectors = {}
+
+    def histogram(self, name, documentation, buckets, labelnames=('view',)):
+        if name not in self.histograms:
+            self.histograms[name] = Histogram(name, documentation, buckets, labelnames)
+        return self.histograms[name]
+
+    def register_collector(self, name, documentation, collect, labelnames=()):
+        """Expose a counter read from ``collect()`` at snapshot time.
+
+        ``collect`` returns a number, or {label tuple: number} if the
+        counter has ``labelnames``.
+        """
+        self.collectors[name] = (documentation, collect, tuple(labelnames))
+
+    def snapshot(self):
+        metrics = {name: histogram.snapshot() for name, histogram in self.histograms.items()}
+        for name, (documentation, collect, labelnames) in self.collectors.items():
+            values = collect()
+            if not labelnames:
+                values = {(): values}
+            metrics[name] = {
+                'type': 'counter',
+                'help': documentation,
+                'labels': list(labelnames),
+                'series': {json.dumps(list(key)): value for key, value in values.items()},
+            }
+        return metrics
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+
+registry = Registry()
+
+REQUEST_DURATION = registry.histogram(
+    'recipe_api_request_duration_seconds', 'Time spent handling a request.',
+    DURATION_BUCKETS, ('view', 'method', 'status'),
+)
+DB_QUERIES = registry.histogram(
+    'recipe_api_db_queries', 'Database queries run by a request.', QUERY_BUCKETS,
+)
+DB_DURATION = registry.histogram(
+    'recipe_api_db_duration_seconds', 'Time a request spent in database queries.',
+    DURATION_BUCKETS,
+)
+SERIALIZER_DURATION = registry.histogram(
+    'recipe_api_serializer_duration_seconds', 'Time a request spent serializing.',
+    DURATION_BUCKETS,
+)
+RESPONSE_SIZE = registry.histogram(
+    'recipe_api_response_size_bytes', 'Size of response bodies.', SIZE_BUCKETS,
+)
+COMPRESSION_DURATION = registry.histogram(
+    'recipe_api_compression_duration_seconds', 'Time spent compressing a response body.',
+    DURATION_BUCKETS, ('view', 'encoding'),
+)
+
+
+# Timings of the request being handled, see ``timed``.
+current_timings = contextvars.ContextVar('current_timings', default=None)
+
+
+@contextmanager
+def timed(phase):
+    """Add the time spent in the block to ``phase`` of the current request"""
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = timings.get(phase, 0.0) + time.perf_counter() - started
+
+
+def merge(target, snapshot):
+    """Add the series of ``snapshot`` to ``target`` in place"""
+    for name, metric in snapshot.items():
+        merged = target.setdefault(name, {**metric, 'series': {}})
+        for key, value in metric['series'].items():
+            current = merged['series'].get(key)
+            if metric['type'] == 'counter':
+                merged['series'][key] = (current or 0) + value
+            elif current is None:
+                merged['series'][key] = {
+                    'buckets': list(value['buckets']), 'sum': value['sum'], 'count': value['count'],
+                }
+            else:
+                current['buckets'] = [a + b for a, b in zip(current['buckets'], value['buckets'])]
+                current['sum'] += value['sum']
+                current['count'] += value['count']
+    return target
+
+
+def _write_json(path, data):
+    temporary = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    temporary.write_text(json.dumps(data))
+    os.replace(temporary, path)
+
+
+def _read_json(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+@contextmanager
+def _locked(directory, exclusive):
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / LOCK_FILE, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class FileExporter:
+    """Writes this process' snapshot to a directory shared by the workers"""
+
+    def __init__(self, directory, interval=1.0):
+        self.directory = Path(directory)
+        self.interval = interval
+        self._last = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return self.directory / f'{os.getpid()}.json'
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last < self.interval:
+                return
+            self._last = now
+        self.directory.mkdir(parents=True, exist_ok=True)
+        _write_json(self.path, registry.snapshot())
+
+    def retire(self):
+        """Fold this process into the archive, e.g. when a worker exits"""
+        with _locked(self.directory, exclusive=True):
+            archive = self.directory / ARCHIVE_FILE
+            totals = merge(_read_json(archive), registry.snapshot())
+            _write_json(archive, totals)
+            self.path.unlink(missing_ok=True)
+
+    def collect(self):
+        """Merged snapshot of every process, this one up to date"""
+        self.flush(force=True)
+        totals = {}
+        with _locked(self.directory, exclusive=False):
+            for path in sorted(self.directory.glob('*.json')):
+                merge(totals, _read_json(path))
+        return totals
+
+
+_exporter = None
+
+
+def get_exporter():
+    """The exporter of this process, configured from settings"""
+    global _exporter
+    if _exporter is None:
+        from django.conf import settings
+        _exporter = FileExporter(settings.METRICS_DIR, settings.METRICS_FLUSH_INTERVAL)
+    return _exporter
+
+
+def method_label(method):
+    """``method`` if it is a standard HTTP method, else OTHER"""
+    return method if method in METHODS else 'OTHER'
+
+
+def retire_pid(directory, pid):
+    """Fold the last snapshot of a dead process into the archive.
+
+    For workers killed before they could retire themselves; their numbers
+    since the last flush are lost. Does nothing if the process retired.
+    """
+    directory = Path(directory)
+    path = directory / f'{pid}.json'
+    with _locked(directory, exclusive=True):
+        if not path.exists():
+            return
+        archive = directory / ARCHIVE_FILE
+        _write_json(archive, merge(_read_json(archive), _read_json(path)))
+        path.unlink()
+
+
+def clear_directory(directory):
+    """Remove the snapshots of a previous server run"""
+    directory = Path(directory)
+    if directory.is_dir():
+        for path in directory.glob('*.json'):
+            path.unlink(missing_ok=True)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def render(snapshot):
+    """Prometheus text exposition (version 0.0.4) of a merged snapshot"""
+    lines = []
+    for name in sorted(snapshot):
+        metric = snapshot[name]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for key in sorted(metric['series']):
+            values = json.loads(key)
+            value = metric['series'][key]
+            labels = metric['labels']
+            if metric['type'] == 'counter':
+                lines.append(f'{name}{_format_labels(labels, values)} {value}')
+                continue
+            cumulative = 0
+            for bound, count in zip(metric['buckets'] + ['+Inf'], value['buckets']):
+                cumulative += count
+                label_text = _format_labels(labels, values, [('le', bound)])
+                lines.append(f'{name}_bucket{label_text} {cumulative}')
+            lines.append(f"{name}_sum{_format_labels(labels, values)} {value['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels, values)} {value['count']}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,280 @@
+"""
+Middleware for the recipe api
+"""
+import cProfile
+import hmac
+import random
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.utils.cache import patch_vary_headers
+from rest_framework.exceptions import AuthenticationFailed
+
+from core import compression, metrics
+from core.profiling import ProfileStore
+from user.authentication import CachedTokenAuthentication
+
+
+class QueryCountMiddleware:
+    """Report the database work of each request in response headers.
+
+    Adds ``X-DB-Queries`` (statements run on the default database) and
+    ``X-DB-Time`` (milliseconds spent in them). It is enabled with
+    QUERY_COUNT_HEADER=true for load tests; the counting works without
+    DEBUG and costs one wrapper call per query.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = _QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        response['X-DB-Queries'] = str(counter.count)
+        response['X-DB-Time'] = f'{counter.duration * 1000:.2f}'
+        return response
+
+
+class _QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+class MetricsMiddleware:
+    """Record duration, database work, serializer time and size per view.
+
+    The numbers go into the histograms of core.metrics, exposed at
+    /metrics. With SERVER_TIMING=true each response also carries them in a
+    Server-Timing header for the browser's network panel.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = {}
+        token = metrics.current_timings.set(timings)
+        counter = _QueryCounter()
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(counter):
+                response = self.get_response(request)
+        finally:
+            metrics.current_timings.reset(token)
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.view_name if match is not None else 'unmatched'
+        serializer = timings.get('serializer', 0.0)
+        metrics.REQUEST_DURATION.observe(
+            duration, view=view, method=metrics.method_label(request.method),
+            status=response.status_code,
+        )
+        metrics.DB_QUERIES.observe(counter.count, view=view)
+        metrics.DB_DURATION.observe(counter.duration, view=view)
+        metrics.SERIALIZER_DURATION.observe(serializer, view=view)
+        if not response.streaming:
+            metrics.RESPONSE_SIZE.observe(len(response.content), view=view)
+
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={counter.duration * 1000:.2f};desc="{counter.count} queries"',
+                f'serializer;dur={serializer * 1000:.2f}',
+                f'total;dur={duration * 1000:.2f}',
+            ])
+        metrics.get_exporter().flush()
+        return response
+
+
+class ProfilingMiddleware:
+    """Capture a cProfile of selected requests into core.profiling.
+
+    A request is profiled when it sends ``X-Profile`` with the value of
+    PROFILING_TOKEN, or from a staff user's API token; anyone else's header
+    is ignored before the profiler starts, so it cannot be used to slow the
+    server down. PROFILING_SAMPLE_RATE additionally profiles that fraction
+    of all requests. Kept profiles are named in the ``X-Profile-Id`` header;
+    ``python manage.py profiles`` lists and summarizes them.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.store = ProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_PROFILES)
+
+    def __call__(self, request):
+        sampled = random.random() < settings.PROFILING_SAMPLE_RATE
+        requested = (
+            not sampled and 'X-Profile' in request.headers and self._authorized(request)
+        )
+        if not (requested or sampled):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is active in this process (Python 3.12+).
+            return self.get_response(request)
+
+        timings = metrics.current_timings.get()
+        token = None
+        if timings is None:
+            timings = {}
+            token = metrics.current_timings.set(timings)
+        serializer_before = timings.get('serializer', 0.0)
+        counter = _QueryCounter()
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(counter):
+                response = self.get_response(request)
+        finally:
+            profiler.disable()
+            if token is not None:
+                metrics.current_timings.reset(token)
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        response['X-Profile-Id'] = self.store.save(profiler, {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view': match.view_name if match is not None else 'unmatched',
+            'status': response.status_code,
+            'trigger': 'sample' if sampled else 'header',
+            'duration': duration,
+            'db_queries': counter.count,
+            'db_duration': counter.duration,
+            'serializer_duration': timings.get('serializer', 0.0) - serializer_before,
+        })
+        return response
+
+    def _authorized(self, request):
+        token = settings.PROFILING_TOKEN
+        supplied = request.headers.get('X-Profile', '')
+        if token and hmac.compare_digest(supplied.encode(), token.encode()):
+            return True
+        # The api views authenticate inside DRF, after this middleware, so
+        # resolve the token here; it only happens for X-Profile requests.
+        try:
+            authenticated = CachedTokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        return authenticated is not None and authenticated[0].is_staff
+
+
+class CompressionMiddleware:
+    """Compress api responses with gzip or brotli as the client accepts.
+
+    Only COMPRESSION_CONTENT_TYPES are compressed; HTML is left alone, so
+    the CSRF token of the browsable API is never exposed to BREACH style
+    attacks. Bodies under COMPRESSION_MIN_SIZE bytes are sent as they are.
+    Streaming responses are compressed chunk by chunk. The time spent and
+    the bytes saved are recorded in core.metrics.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.encodings = tuple(
+            encoding for encoding in compression.available_encodings()
+            if encoding in settings.COMPRESSION_ENCODINGS
+        )
+        self.levels = {
+            'br': settings.COMPRESSION_BROTLI_QUALITY,
+            'gzip': settings.COMPRESSION_GZIP_LEVEL,
+        }
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.status_code == 304:
+            return self._not_modified(request, response)
+        if not self._compressible(response):
+            return response
+
+        patch_vary_headers(response, ['Accept-Encoding'])
+        encoding = self._negotiate(request)
+        if encoding is None:
+            return response
+
+        match = request.resolver_match
+        view = match.view_name if match is not None else 'unmatched'
+        level = self.levels[encoding]
+        if response.streaming:
+            response.streaming_content = self._stream(
+                response.streaming_content, encoding, level, view,
+            )
+            del response['Content-Length']
+        else:
+            started = time.perf_counter()
+            content = compression.compress(encoding, level, response.content)
+            duration = time.perf_counter() - started
+            metrics.COMPRESSION_DURATION.observe(duration, view=view, encoding=encoding)
+            compression.stats.record(encoding, len(response.content), len(content))
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+
+        # The compressed body differs byte for byte, which a strong ETag
+        # promises not to; a weak one still answers If-None-Match.
+        self._weaken_etag(response)
+        response['Content-Encoding'] = encoding
+        return response
+
+    def _not_modified(self, request, response):
+        # A 304 has no body to compress, but it must carry the same ETag as
+        # the compressed 200 it stands for.
+        patch_vary_headers(response, ['Accept-Encoding'])
+        if self._negotiate(request) is not None:
+            self._weaken_etag(response)
+        return response
+
+    def _negotiate(self, request):
+        return compression.negotiate(
+            request.headers.get('Accept-Encoding', ''), self.encodings,
+        )
+
+    def _weaken_etag(self, response):
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = f'W/{etag}'
+
+    def _compressible(self, response):
+        if response.has_header('Content-Encoding'):
+            return False
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type not in settings.COMPRESSION_CONTENT_TYPES:
+            return False
+        return response.streaming or len(response.content) >= settings.COMPRESSION_MIN_SIZE
+
+    def _stream(self, chunks, encoding, level, view):
+        encoder = compression.compressor(encoding, level)
+        input_bytes = output_bytes = 0
+        duration = 0.0
+        try:
+            for chunk in chunks:
+                started = time.perf_counter()
+                data = encoder.compress(chunk)
+                duration += time.perf_counter() - started
+                input_bytes += len(chunk)
+                output_bytes += len(data)
+                if data:
+                    yield data
+            started = time.perf_counter()
+            data = encoder.finish()
+            duration += time.perf_counter() - started
+            output_bytes += len(data)
+            yield data
+        finally:
+            metrics.COMPRESSION_DURATION.observe(duration, view=view, encoding=encoding)
+            compression.stats.record(encoding, input_bytes, output_bytes)
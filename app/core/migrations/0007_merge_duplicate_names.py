@@ -0,0 +1,60 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:41
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Fold duplicate (user, name) tags and ingredients into the oldest row.
+
+    Recipes pointing at a duplicate are re-linked to the surviving row before
+    the duplicates are deleted, so no recipe loses a tag or ingredient.
+    """
+    Recipe = apps.get_model('core', 'Recipe')
+    relations = [
+        (apps.get_model('core', 'Tag'), Recipe.tags.through, 'tag_id'),
+        (apps.get_model('core', 'Ingredient'), Recipe.ingredients.through, 'ingredient_id'),
+    ]
+    for model, through, column in relations:
+        groups = (
+            model.objects
+            .values('user_id', 'name')
+            .annotate(keep=Min('id'), rows=Count('id'))
+            .filter(rows__gt=1)
+            .order_by()
+        )
+        for group in groups.iterator():
+            duplicates = list(
+                model.objects
+                .filter(user_id=group['user_id'], name=group['name'])
+                .exclude(id=group['keep'])
+                .values_list('id', flat=True)
+            )
+            linked = set(
+                through.objects
+                .filter(**{f'{column}__in': duplicates})
+                .values_list('recipe_id', flat=True)
+            )
+            linked -= set(
+                through.objects
+                .filter(**{column: group['keep'], 'recipe_id__in': linked})
+                .values_list('recipe_id', flat=True)
+            )
+            through.objects.bulk_create([
+                through(recipe_id=recipe_id, **{column: group['keep']})
+                for recipe_id in linked
+            ])
+            model.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_recipe_image1'),
+    ]
+
+    # Runs in its own transaction, so the duplicates are gone before 0008
+    # builds the unique indexes outside of one.
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+    ]
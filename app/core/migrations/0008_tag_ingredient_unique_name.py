@@ -0,0 +1,111 @@
+"""
+Make tag and ingredient names unique per user and index recipe lookups.
+
+On PostgreSQL every index is built with CREATE INDEX CONCURRENTLY, which
+only takes a SHARE UPDATE EXCLUSIVE lock, so recipes, tags and ingredients
+stay writable while it runs; the unique constraints are then attached to
+their ready-made indexes with ``UNIQUE USING INDEX``, a catalog-only change.
+CONCURRENTLY cannot run in a transaction, hence ``atomic = False``: if a
+statement fails, drop the indexes it left behind before migrating again.
+Other backends build plain indexes, a unique index standing in for each
+constraint as it does when Django adds one on SQLite.
+"""
+from django.db import migrations, models
+
+
+RECIPE_INDEX = models.Index(fields=['user', 'id'], name='core_recipe_user_id_idx')
+
+UNIQUE_NAMES = {
+    'tag': models.UniqueConstraint(fields=('user', 'name'), name='core_tag_unique_user_name'),
+    'ingredient': models.UniqueConstraint(
+        fields=('user', 'name'), name='core_ingredient_unique_user_name',
+    ),
+}
+
+# The auto-created through tables only index (recipe_id, <fk>) and the bare
+# foreign key. Filtering recipes by tag or ingredient walks them the other
+# way round, so give that direction a covering index.
+THROUGH_INDEXES = {
+    'core_recipe_tags_tag_recipe_idx': 'core_recipe_tags (tag_id, recipe_id)',
+    'core_recipe_ingredients_ingredient_recipe_idx':
+        'core_recipe_ingredients (ingredient_id, recipe_id)',
+}
+
+POSTGRES_INSTALL = [
+    f'CREATE INDEX CONCURRENTLY {RECIPE_INDEX.name} ON core_recipe (user_id, id)',
+    *[
+        statement
+        for model, constraint in UNIQUE_NAMES.items()
+        for statement in (
+            f'CREATE UNIQUE INDEX CONCURRENTLY {constraint.name} '
+            f'ON core_{model} (user_id, name)',
+            f'ALTER TABLE core_{model} ADD CONSTRAINT {constraint.name} '
+            f'UNIQUE USING INDEX {constraint.name}',
+        )
+    ],
+    *[
+        f'CREATE INDEX CONCURRENTLY {name} ON {columns}'
+        for name, columns in THROUGH_INDEXES.items()
+    ],
+]
+
+INSTALL = [
+    f'CREATE INDEX {RECIPE_INDEX.name} ON core_recipe (user_id, id)',
+    *[
+        f'CREATE UNIQUE INDEX {constraint.name} ON core_{model} (user_id, name)'
+        for model, constraint in UNIQUE_NAMES.items()
+    ],
+    *[f'CREATE INDEX {name} ON {columns}' for name, columns in THROUGH_INDEXES.items()],
+]
+
+POSTGRES_UNINSTALL = [
+    *[f'DROP INDEX CONCURRENTLY IF EXISTS {name}' for name in THROUGH_INDEXES],
+    *[
+        f'ALTER TABLE core_{model} DROP CONSTRAINT IF EXISTS {constraint.name}'
+        for model, constraint in UNIQUE_NAMES.items()
+    ],
+    f'DROP INDEX CONCURRENTLY IF EXISTS {RECIPE_INDEX.name}',
+]
+
+UNINSTALL = [
+    *[f'DROP INDEX IF EXISTS {name}' for name in THROUGH_INDEXES],
+    *[f'DROP INDEX IF EXISTS {constraint.name}' for constraint in UNIQUE_NAMES.values()],
+    f'DROP INDEX IF EXISTS {RECIPE_INDEX.name}',
+]
+
+
+def _run(schema_editor, statements, default):
+    for statement in statements.get(schema_editor.connection.vendor, default):
+        schema_editor.execute(statement)
+
+
+def add_indexes(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES_INSTALL}, INSTALL)
+
+
+def remove_indexes(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES_UNINSTALL}, UNINSTALL)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0007_merge_duplicate_names'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(add_indexes, remove_indexes),
+            ],
+            state_operations=[
+                migrations.AddIndex(model_name='recipe', index=RECIPE_INDEX),
+                *[
+                    migrations.AddConstraint(model_name=model, constraint=constraint)
+                    for model, constraint in UNIQUE_NAMES.items()
+                ],
+            ],
+        ),
+    ]
@@ -0,0 +1,145 @@
+"""
+Maintain a full-text search document for recipes inside the database.
+
+On PostgreSQL this is a ``tsvector`` column set by a trigger, with a GIN
+index; on SQLite an FTS5 table kept in sync by triggers. Other backends get
+nothing and recipe search falls back to substring matching.
+
+A stored generated column would rewrite core_recipe under an ACCESS
+EXCLUSIVE lock. Instead the column is added nullable, which only touches
+the catalog, existing rows are filled in batches that each commit, and the
+index is built CONCURRENTLY; hence ``atomic = False``. Recipes stay
+writable throughout and the trigger covers rows written meanwhile.
+"""
+from django.db import migrations
+
+
+DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce({row}title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce({row}description, '')), 'B')"
+)
+BACKFILL_BATCH = 5000
+
+POSTGRES_COLUMN = [
+    'ALTER TABLE core_recipe ADD COLUMN search_vector tsvector',
+    f"""
+    CREATE FUNCTION core_recipe_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {DOCUMENT.format(row='NEW.')};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER core_recipe_search_vector_trg
+    BEFORE INSERT OR UPDATE OF title, description ON core_recipe
+    FOR EACH ROW EXECUTE PROCEDURE core_recipe_search_vector()
+    """,
+]
+
+# Returns the last id of the batch, NULL once past the end.
+POSTGRES_BACKFILL = f"""
+    WITH batch AS (
+        UPDATE core_recipe SET search_vector = {DOCUMENT.format(row='')}
+        WHERE id IN (
+            SELECT id FROM core_recipe WHERE id > %s ORDER BY id LIMIT %s
+        )
+        RETURNING id
+    )
+    SELECT max(id) FROM batch
+"""
+
+POSTGRES_INDEX = [
+    'CREATE INDEX CONCURRENTLY core_recipe_search_vector_idx '
+    'ON core_recipe USING GIN (search_vector)',
+]
+
+POSTGRES_UNINSTALL = [
+    'DROP INDEX CONCURRENTLY IF EXISTS core_recipe_search_vector_idx',
+    'DROP TRIGGER IF EXISTS core_recipe_search_vector_trg ON core_recipe',
+    'DROP FUNCTION IF EXISTS core_recipe_search_vector()',
+    'ALTER TABLE core_recipe DROP COLUMN IF EXISTS search_vector',
+]
+
+SQLITE_INSTALL = [
+    """
+    CREATE VIRTUAL TABLE core_recipe_fts USING fts5(
+        title, description,
+        content='core_recipe', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER core_recipe_fts_ai AFTER INSERT ON core_recipe BEGIN
+        INSERT INTO core_recipe_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER core_recipe_fts_ad AFTER DELETE ON core_recipe BEGIN
+        INSERT INTO core_recipe_fts(core_recipe_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER core_recipe_fts_au AFTER UPDATE OF title, description
+    ON core_recipe BEGIN
+        INSERT INTO core_recipe_fts(core_recipe_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO core_recipe_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO core_recipe_fts(core_recipe_fts) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS core_recipe_fts_au',
+    'DROP TRIGGER IF EXISTS core_recipe_fts_ad',
+    'DROP TRIGGER IF EXISTS core_recipe_fts_ai',
+    'DROP TABLE IF EXISTS core_recipe_fts',
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def _backfill(schema_editor):
+    last_id = 0
+    with schema_editor.connection.cursor() as cursor:
+        while last_id is not None:
+            # Outside a transaction each batch commits on its own.
+            cursor.execute(POSTGRES_BACKFILL, [last_id, BACKFILL_BATCH])
+            last_id = cursor.fetchone()[0]
+
+
+def install_search_document(apps, schema_editor):
+    _run(schema_editor, {
+        'postgresql': POSTGRES_COLUMN,
+        'sqlite': SQLITE_INSTALL,
+    })
+    if schema_editor.connection.vendor == 'postgresql':
+        _backfill(schema_editor)
+        _run(schema_editor, {'postgresql': POSTGRES_INDEX})
+
+
+def uninstall_search_document(apps, schema_editor):
+    _run(schema_editor, {
+        'postgresql': POSTGRES_UNINSTALL,
+        'sqlite': SQLITE_UNINSTALL,
+    })
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0008_tag_ingredient_unique_name'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_document, uninstall_search_document),
+    ]
@@ -0,0 +1,70 @@
+"""
+Index tag and ingredient names for case-insensitive prefix search.
+
+``name__istartswith`` compiles to ``UPPER(name::text) LIKE UPPER(%s) || '%'``
+on PostgreSQL, which only a ``text_pattern_ops`` index on that expression can
+serve, and to ``name LIKE %s`` on SQLite, which uses an index on the column
+with NOCASE collation. Both lead with ``user_id`` so a lookup only scans the
+matching names of one user. Other backends get nothing and scan.
+
+PostgreSQL builds the indexes CONCURRENTLY so tags and ingredients stay
+writable meanwhile; that cannot run in a transaction, hence ``atomic = False``.
+"""
+from django.db import migrations
+
+
+TABLES = ('core_tag', 'core_ingredient')
+
+POSTGRES_INSTALL = [
+    f'CREATE INDEX CONCURRENTLY {table}_user_name_prefix_idx '
+    f'ON {table} (user_id, UPPER(name::text) text_pattern_ops)'
+    for table in TABLES
+]
+
+SQLITE_INSTALL = [
+    f'CREATE INDEX {table}_user_name_prefix_idx '
+    f'ON {table} (user_id, name COLLATE NOCASE)'
+    for table in TABLES
+]
+
+POSTGRES_UNINSTALL = [
+    f'DROP INDEX CONCURRENTLY IF EXISTS {table}_user_name_prefix_idx'
+    for table in TABLES
+]
+
+SQLITE_UNINSTALL = [
+    f'DROP INDEX IF EXISTS {table}_user_name_prefix_idx'
+    for table in TABLES
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def install_prefix_indexes(apps, schema_editor):
+    _run(schema_editor, {
+        'postgresql': POSTGRES_INSTALL,
+        'sqlite': SQLITE_INSTALL,
+    })
+
+
+def uninstall_prefix_indexes(apps, schema_editor):
+    _run(schema_editor, {
+        'postgresql': POSTGRES_UNINSTALL,
+        'sqlite': SQLITE_UNINSTALL,
+    })
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0012_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_prefix_indexes, uninstall_prefix_indexes),
+    ]
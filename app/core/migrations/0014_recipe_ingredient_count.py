@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:33
+
+from importlib import import_module
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_ingredients(apps, schema_editor):
+    """Fill ingredient_count of existing recipes from their links"""
+    Recipe = apps.get_model('core', 'Recipe')
+    links = (
+        Recipe.ingredients.through.objects
+        .filter(recipe_id=models.OuterRef('pk'))
+        .order_by()
+        .values('recipe_id')
+        .annotate(total=models.Count('*'))
+        .values('total')
+    )
+    Recipe.objects.update(ingredient_count=Coalesce(
+        models.Subquery(links, output_field=models.IntegerField()), 0,
+    ))
+
+
+def reinstall_search_document(apps, schema_editor):
+    """Recreate the FTS table and triggers of 0009 on SQLite.
+
+    SQLite adds a NOT NULL column by rebuilding core_recipe, which drops
+    the triggers that keep the search document in sync.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    search_document = import_module('core.migrations.0009_recipe_search_document')
+    search_document.uninstall_search_document(apps, schema_editor)
+    search_document.install_search_document(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_tag_ingredient_name_prefix_index'),
+    ]
+
+    operations = [
+        # Unapplying, removing the column rebuilds the table again.
+        migrations.RunPython(migrations.RunPython.noop, reinstall_search_document),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_ingredients, migrations.RunPython.noop),
+        migrations.RunPython(reinstall_search_document, migrations.RunPython.noop),
+    ]
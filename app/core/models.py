@@ -1,6 +1,7 @@
 """Database models"""
 
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import(
     AbstractBaseUser,
     BaseUserManager,
@@ -41,11 +42,54 @@ class User(AbstractBaseUser,PermissionsMixin):
     name=models.CharField(max_length=255)
     is_active=models.BooleanField(default=True)
     is_staff= models.BooleanField(default=False)
+    # Bumped whenever the user's recipes, tags or ingredients change, see
+    # core.signals. Read paths use them to key caches and answer
+    # conditional requests.
+    data_version = models.PositiveBigIntegerField(default=0, editable=False)
+    data_modified_at = models.DateTimeField(null=True, editable=False)
 
     USERNAME_FIELD = 'email'
 
     objects= UserManager()
 
+class RecipeQuerySet(models.QuerySet):
+    """QuerySet for recipes"""
+
+    def with_related(self, relations=('tags', 'ingredients')):
+        """Prefetch tags and ingredients with one query each.
+
+        Every recipe read view goes through this so serializing N recipes
+        costs a constant number of queries instead of 2 per recipe. Pass
+        ``relations`` to prefetch only some of them.
+        """
+        querysets = {
+            'tags': Tag.objects.order_by('id'),
+            'ingredients': Ingredient.objects.order_by('id'),
+        }
+        return self.prefetch_related(*(
+            models.Prefetch(relation, queryset=querysets[relation])
+            for relation in relations
+        ))
+
+    def refresh_ingredient_counts(self):
+        """Recount ``ingredient_count`` of these recipes from their links.
+
+        The model signals keep the count current; code that links
+        ingredients with raw SQL calls this for the recipes it touched.
+        """
+        links = (
+            Recipe.ingredients.through.objects
+            .filter(recipe_id=models.OuterRef('pk'))
+            .order_by()
+            .values('recipe_id')
+            .annotate(total=models.Count('*'))
+            .values('total')
+        )
+        return self.update(ingredient_count=Coalesce(
+            models.Subquery(links, output_field=models.IntegerField()), 0,
+        ))
+
+
 class Recipe(models.Model):
     """Recipe object"""
     user= models.ForeignKey(
@@ -60,6 +104,21 @@ class Recipe(models.Model):
     tags=models.ManyToManyField('Tag')
     ingredients=models.ManyToManyField('Ingredient')
     image1=models.ImageField(null=True)
+    # Storage paths of resized copies of image1 ({size: {format: path}}),
+    # filled in by recipe.images after an upload; null while pending.
+    image_variants = models.JSONField(null=True, blank=True, editable=False)
+    # Number of ingredients, kept in step with the ingredients relation by
+    # core.signals, so pantry matching (recipe.pantry) can rank coverage
+    # from the links of the pantry's ingredients alone.
+    ingredient_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Per-user listing and keyset pagination in id order.
+            models.Index(fields=['user', 'id'], name='core_recipe_user_id_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -73,6 +132,14 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_tag_unique_user_name',
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -86,6 +153,14 @@ class Ingredient(models.Model):
 
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_ingredient_unique_user_name',
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
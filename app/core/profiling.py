@@ -0,0 +1,71 @@
+"""
+Request profiles kept in a bounded directory
+
+ProfilingMiddleware saves each captured request as ``<id>.prof`` (cProfile
+data, readable with pstats or snakeviz) next to ``<id>.json`` with the
+request line and its database and serializer time. Ids sort by capture
+time; once the directory holds more than ``max_profiles`` the oldest are
+removed, so it works as a ring buffer shared by all workers.
+"""
+import json
+import os
+import time
+from pathlib import Path
+
+
+DEFAULT_DIRECTORY = '/tmp/recipe-api-profiles'
+
+
+class ProfileStore:
+    """The profiles in ``directory``, newest kept up to ``max_profiles``"""
+
+    def __init__(self, directory, max_profiles=100):
+        self.directory = Path(directory)
+        self.max_profiles = max_profiles
+
+    def save(self, profiler, info):
+        """Store a finished cProfile.Profile with its request ``info``"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profile_id = f'{time.time_ns():020d}-{os.getpid()}'
+        info = {'id': profile_id, 'created': time.time(), **info}
+        profiler.dump_stats(self.directory / f'{profile_id}.prof')
+        # The metadata is written last, so listed profiles are complete.
+        temporary = self.directory / f'.{profile_id}.json.tmp'
+        temporary.write_text(json.dumps(info))
+        os.replace(temporary, self.directory / f'{profile_id}.json')
+        self.prune()
+        return profile_id
+
+    def prune(self):
+        for path in self._paths()[:-self.max_profiles or None]:
+            path.unlink(missing_ok=True)
+            path.with_suffix('.prof').unlink(missing_ok=True)
+
+    def list(self):
+        """Metadata of the stored profiles, newest first"""
+        profiles = []
+        for path in reversed(self._paths()):
+            try:
+                profiles.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def get(self, profile_id):
+        """(metadata, path of the .prof file), or None if it is gone"""
+        path = self.directory / f'{profile_id}.json'
+        try:
+            info = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+        return info, path.with_suffix('.prof')
+
+    def clear(self):
+        for path in self._paths():
+            path.unlink(missing_ok=True)
+            path.with_suffix('.prof').unlink(missing_ok=True)
+
+    def _paths(self):
+        if not self.directory.is_dir():
+            return []
+        return sorted(self.directory.glob('*.json'))
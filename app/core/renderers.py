@@ -0,0 +1,40 @@
+"""
+Renderers shared by the api apps
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer with the same output, encoded with orjson when installed.
+
+    Compact UTF-8 output, the default, is encoded by orjson; values it does
+    not handle natively (dates, Decimal, lazy strings) go through DRF's
+    encoder as before. Indented output, e.g. for the browsable API, and the
+    rare values orjson rejects (integers over 64 bits) use the standard
+    library. Floats in exponent form are written in shortest form (``1e16``
+    rather than ``1e+16``); the api's serializers emit none.
+    """
+    # orjson does not escape these, JSONRenderer does for JavaScript.
+    _escapes = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None or orjson is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        for character, escape in self._escapes:
+            ret = ret.replace(character, escape)
+        return ret
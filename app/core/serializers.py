@@ -0,0 +1,24 @@
+"""
+Serializer helpers shared by the api apps
+"""
+from rest_framework.serializers import ListSerializer
+
+from core import metrics
+
+
+class TimedSerializerMixin:
+    """Count the time spent serializing towards the request's metrics.
+
+    Only the outermost serializer is timed (each item of it, for
+    ``many=True``); nested serializers are part of their parent's time.
+    """
+
+    def to_representation(self, instance):
+        parent = self.parent
+        outermost = parent is None or (
+            isinstance(parent, ListSerializer) and parent.parent is None
+        )
+        if not outermost:
+            return super().to_representation(instance)
+        with metrics.timed('serializer'):
+            return super().to_representation(instance)
@@ -0,0 +1,113 @@
+"""
+Signal handlers tracking changes to a user's recipe data
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.utils import timezone
+
+from core.models import Recipe, Tag, Ingredient
+
+
+def notify_user_data_changed(user_id):
+    """Record that a user's recipes, tags or ingredients changed.
+
+    Model signals call this on every save, delete and relation change. Code
+    that writes with bulk_create, queryset.update or raw SQL must call it
+    itself. Inside a transaction the users are stamped once, on commit,
+    however many rows changed.
+    """
+    notify_users_data_changed([user_id])
+
+
+def notify_users_data_changed(user_ids):
+    """notify_user_data_changed for several users in one query"""
+    connection = transaction.get_connection()
+    pending = connection.__dict__.setdefault('_data_changed_user_ids', set())
+    pending.update(user_ids)
+    # A hook per call: one registered in a savepoint that is rolled back is
+    # dropped, and the first that runs stamps every pending user.
+    transaction.on_commit(lambda: _stamp(pending))
+
+
+def _stamp(pending):
+    if not pending:
+        return
+    user_ids = list(pending)
+    pending.clear()
+    get_user_model().objects.filter(pk__in=user_ids).update(
+        data_version=F('data_version') + 1,
+        data_modified_at=timezone.now(),
+    )
+
+
+def _saved_or_deleted(sender, instance, **kwargs):
+    notify_user_data_changed(instance.user_id)
+
+
+def _relation_changed(sender, instance, action, pk_set=None, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if action != 'post_clear' and not pk_set:
+        return
+    notify_user_data_changed(instance.user_id)
+
+
+def _ingredients_changed(sender, instance, action, reverse, pk_set=None, **kwargs):
+    """Keep Recipe.ingredient_count in step with the ingredients relation"""
+    if reverse and action == 'pre_clear':
+        # recipe_set.clear() on an ingredient: note the recipes it leaves.
+        instance._cleared_recipe_ids = list(instance.recipe_set.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        recipe_ids = [instance.pk]
+    elif action == 'post_clear':
+        recipe_ids = instance.__dict__.pop('_cleared_recipe_ids', [])
+    else:
+        recipe_ids = pk_set
+    if recipe_ids:
+        Recipe.objects.filter(pk__in=recipe_ids).refresh_ingredient_counts()
+
+
+def _ingredient_deleting(sender, instance, **kwargs):
+    # The cascade removes the links without m2m_changed.
+    instance._linked_recipe_ids = list(instance.recipe_set.values_list('pk', flat=True))
+
+
+def _ingredient_deleted(sender, instance, **kwargs):
+    recipe_ids = instance.__dict__.pop('_linked_recipe_ids', [])
+    if recipe_ids:
+        Recipe.objects.filter(pk__in=recipe_ids).refresh_ingredient_counts()
+
+
+def connect():
+    """Connect the handlers, called from CoreConfig.ready()"""
+    for model in (Recipe, Tag, Ingredient):
+        post_save.connect(
+            _saved_or_deleted, sender=model,
+            dispatch_uid=f'core.data_version.save.{model.__name__}',
+        )
+        post_delete.connect(
+            _saved_or_deleted, sender=model,
+            dispatch_uid=f'core.data_version.delete.{model.__name__}',
+        )
+    for through in (Recipe.tags.through, Recipe.ingredients.through):
+        m2m_changed.connect(
+            _relation_changed, sender=through,
+            dispatch_uid=f'core.data_version.m2m.{through.__name__}',
+        )
+    m2m_changed.connect(
+        _ingredients_changed, sender=Recipe.ingredients.through,
+        dispatch_uid='core.ingredient_count.m2m',
+    )
+    pre_delete.connect(
+        _ingredient_deleting, sender=Ingredient,
+        dispatch_uid='core.ingredient_count.pre_delete',
+    )
+    post_delete.connect(
+        _ingredient_deleted, sender=Ingredient,
+        dispatch_uid='core.ingredient_count.post_delete',
+    )
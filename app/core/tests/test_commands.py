@@ -1,14 +1,26 @@
 """
 Test the custom management commands.
 """
+import cProfile
+import os
+import tempfile
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as psycopg2Error
 
+from io import StringIO
+
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count
 from django.db.utils import OperationalError
 
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.management.commands import seed_data
+from core.models import Recipe, Tag
+from core.profiling import ProfileStore
 
 @patch('core.management.commands.wait_for_db.Command.check')
 class CommandTests(SimpleTestCase):
@@ -32,4 +44,152 @@ class CommandTests(SimpleTestCase):
         patched_check.assert_called_with(databases=['default'])
 
 
+class SeedDataCommandTests(TestCase):
+    """Test the seed_data command"""
+
+    def seed(self, **options):
+        options.setdefault('users', 3)
+        options.setdefault('recipes', 20)
+        options.setdefault('tags', 10)
+        options.setdefault('ingredients', 15)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('seed_data', stdout=StringIO(), **options)
+
+    def snapshot(self):
+        return [
+            (recipe.user.email, recipe.title, recipe.price,
+             sorted(tag.name for tag in recipe.tags.all()),
+             sorted(ingredient.name for ingredient in recipe.ingredients.all()))
+            for recipe in Recipe.objects.select_related('user')
+            .prefetch_related('tags', 'ingredients').order_by('id')
+        ]
+
+    def test_creates_users_recipes_and_links(self):
+        """Test the requested numbers of rows are created"""
+        self.seed(tags_per_recipe=2, ingredients_per_recipe=4)
+
+        users = get_user_model().objects.filter(email__startswith='seed-0-')
+        self.assertEqual(users.count(), 3)
+        self.assertEqual(Recipe.objects.count(), 60)
+        self.assertEqual(Tag.objects.count(), 30)
+        self.assertEqual(Recipe.tags.through.objects.count(), 120)
+        self.assertEqual(Recipe.ingredients.through.objects.count(), 240)
+        self.assertTrue(all(user.data_version == 1 for user in users))
+        self.assertTrue(users[0].check_password('seedpass123'))
+
+    def test_same_seed_same_data(self):
+        """Test a seed always produces the same rows"""
+        self.seed(seed=3)
+        first = self.snapshot()
+        get_user_model().objects.all().delete()
+
+        self.seed(seed=3)
+
+        self.assertEqual(self.snapshot(), first)
+
+    def test_tags_are_zipf_distributed(self):
+        """Test popular tags are used far more than rare ones"""
+        self.seed(users=1, recipes=400, tags=20, tags_per_recipe=1)
+
+        counts = dict(Tag.objects.annotate(uses=Count('recipe')).values_list('name', 'uses'))
+        self.assertGreater(counts['vegan'], 5 * counts['budget'])
+
+    def test_existing_users_rejected(self):
+        """Test seeding the same users twice fails"""
+        self.seed(users=1, recipes=1)
+
+        with self.assertRaises(CommandError):
+            self.seed(users=1, recipes=1)
+
+    def test_multi_row_insert(self):
+        """Test the PostgreSQL link path without COPY writes every row"""
+        self.seed(users=1, recipes=3, tags_per_recipe=0)
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        tag_ids = list(Tag.objects.values_list('id', flat=True)[:2])
+        command = seed_data.Command()
+        command.options = {'batch_size': 4}
+
+        command.insert_rows(
+            Recipe.tags.through._meta.db_table, ['recipe_id', 'tag_id'],
+            [(recipe_id, tag_id) for recipe_id in recipe_ids for tag_id in tag_ids],
+        )
+
+        self.assertEqual(Recipe.tags.through.objects.count(), 6)
+
+    def test_any_existing_user_rejected(self):
+        """Test a clash in the middle of the range is caught before writing"""
+        get_user_model().objects.create_user('seed-0-1@example.com', 'testpass123')
+
+        with self.assertRaises(CommandError):
+            self.seed(users=3, recipes=1)
+
+        self.assertEqual(get_user_model().objects.count(), 1)
+        self.assertFalse(Recipe.objects.exists())
+
+
+class ImportRecipesCommandTests(TestCase):
+    """Test the import_recipes command"""
+
+    def test_import_file(self):
+        """Test recipes are imported and invalid rows reported"""
+        user = get_user_model().objects.create_user('user@example.com', 'testpass123')
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as file:
+            file.write('title,time_minutes,price,tags\nSoup,20,4.50,vegan|quick\nBad,x,1\n')
+        self.addCleanup(os.unlink, file.name)
+        out = StringIO()
+
+        call_command('import_recipes', file.name, user='user@example.com', stdout=out)
+
+        self.assertIn('Imported 1 recipes, skipped 1', out.getvalue())
+        self.assertIn('Row 2:', out.getvalue())
+        self.assertEqual(Recipe.objects.get(user=user).tags.count(), 2)
+
+    def test_unknown_user(self):
+        """Test importing for a missing user fails"""
+        with self.assertRaises(CommandError):
+            call_command('import_recipes', '-', user='nobody@example.com', stdout=StringIO())
+
+
+class ProfilesCommandTests(SimpleTestCase):
+    """Test the profiles command"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        settings_override = override_settings(PROFILING_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        sorted(range(1000), key=str)
+        profiler.disable()
+        self.profile_id = ProfileStore(self.directory).save(profiler, {
+            'method': 'GET', 'path': '/api/recipe/recipes/', 'view': 'filter_recipes',
+            'status': 200, 'trigger': 'header', 'duration': 0.2,
+            'db_queries': 4, 'db_duration': 0.05, 'serializer_duration': 0.1,
+        })
+
+    def run_command(self, *args):
+        out = StringIO()
+        call_command('profiles', *args, stdout=out)
+        return out.getvalue()
+
+    def test_list(self):
+        """Test listing shows the request and its timings"""
+        output = self.run_command()
+
+        self.assertIn(self.profile_id, output)
+        self.assertIn('GET /api/recipe/recipes/ 200', output)
+
+    def test_summarize(self):
+        """Test a summary shows the phases and the top functions"""
+        output = self.run_command(self.profile_id, '--limit', '5')
+
+        self.assertIn('database', output)
+        self.assertIn('50.0%', output)
+        self.assertIn('function calls', output)
 
+    def test_unknown_profile(self):
+        """Test an unknown id is an error"""
+        with self.assertRaises(CommandError):
+            self.run_command('missing')
@@ -0,0 +1,137 @@
+"""
+Tests for response compression
+"""
+import gzip
+import json
+
+import brotli
+
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import compression, metrics
+from core.middleware import CompressionMiddleware
+
+from recipe.tests.test_recipe_api import create_user, create_recipe
+
+
+RECIPES_URL = reverse('filter_recipes')
+EXPORT_URL = reverse('recipe-export')
+
+
+class NegotiateTests(SimpleTestCase):
+    """Test choosing the encoding"""
+
+    def test_server_preference(self):
+        """Test the server order wins between equally accepted encodings"""
+        self.assertEqual(compression.negotiate('gzip, deflate, br', ('br', 'gzip')), 'br')
+
+    def test_quality(self):
+        """Test q-values rank and refuse encodings"""
+        self.assertEqual(compression.negotiate('br;q=0.5, gzip', ('br', 'gzip')), 'gzip')
+        self.assertEqual(compression.negotiate('br;q=0, *', ('br', 'gzip')), 'gzip')
+        self.assertIsNone(compression.negotiate('identity', ('br', 'gzip')))
+        self.assertIsNone(compression.negotiate('', ('br', 'gzip')))
+
+
+class CompressionMiddlewareTests(TestCase):
+    """Test compressing api responses"""
+
+    def setUp(self):
+        caches['api'].clear()
+        compression.stats.reset()
+        metrics.registry.reset()
+        self.user = create_user()
+        for i in range(20):
+            create_recipe(self.user, title=f'Recipe {i}', description='Slow cooked ' * 10)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_gzip(self):
+        """Test JSON is gzipped when the client accepts it"""
+        plain = self.client.get(RECIPES_URL)
+
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', res['Vary'])
+        self.assertEqual(gzip.decompress(res.content), plain.content)
+        self.assertEqual(int(res['Content-Length']), len(res.content))
+        self.assertLess(len(res.content), len(plain.content))
+
+    def test_brotli_preferred(self):
+        """Test brotli is chosen when both are accepted"""
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING='gzip, br')
+
+        self.assertEqual(res['Content-Encoding'], 'br')
+        self.assertEqual(len(json.loads(brotli.decompress(res.content))), 20)
+
+    def test_small_response_not_compressed(self):
+        """Test bodies under the threshold are sent as they are"""
+        with self.settings(COMPRESSION_MIN_SIZE=10 ** 6):
+            res = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+    def test_html_not_compressed(self):
+        """Test HTML pages, which carry CSRF tokens, are never compressed"""
+        middleware = CompressionMiddleware(
+            lambda request: HttpResponse('<p>csrf</p>' * 1000, content_type='text/html'),
+        )
+
+        res = middleware(RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip'))
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+    def test_streaming(self):
+        """Test streaming exports are compressed chunk by chunk"""
+        plain = b''.join(self.client.get(EXPORT_URL, {'type': 'jsonl'}).streaming_content)
+
+        res = self.client.get(EXPORT_URL, {'type': 'jsonl'}, HTTP_ACCEPT_ENCODING='gzip')
+        body = b''.join(res.streaming_content)
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(body), plain)
+        self.assertEqual(compression.stats.snapshot(), {
+            'input': {'gzip': len(plain)}, 'output': {'gzip': len(body)},
+        })
+
+    def test_etag_weakened(self):
+        """Test compressed responses carry a weak ETag that still revalidates"""
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertTrue(res['ETag'].startswith('W/"'))
+        again = self.client.get(
+            RECIPES_URL, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=res['ETag'],
+        )
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], res['ETag'])
+        self.assertIn('Accept-Encoding', again['Vary'])
+
+    def test_not_modified_strong_etag_uncompressed(self):
+        """Test a 304 keeps the strong ETag when the client takes no coding"""
+        res = self.client.get(RECIPES_URL)
+
+        again = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], res['ETag'])
+        self.assertTrue(res['ETag'].startswith('"'))
+
+    def test_metrics(self):
+        """Test the bytes and compression time are exported"""
+        self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        text = metrics.render(metrics.registry.snapshot())
+
+        self.assertIn('recipe_api_compression_input_bytes_total{encoding="gzip"}', text)
+        self.assertIn('recipe_api_compression_output_bytes_total{encoding="gzip"}', text)
+        self.assertIn(
+            'recipe_api_compression_duration_seconds_count'
+            '{view="filter_recipes",encoding="gzip"} 1',
+            text,
+        )
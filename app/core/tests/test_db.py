@@ -0,0 +1,56 @@
+"""
+Tests for connection reuse sizing and statistics
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import SimpleTestCase, TestCase
+
+from core import db
+
+
+class ConnectionBudgetTests(SimpleTestCase):
+    """Test sizing workers to the database connection limit"""
+
+    def test_connections_per_worker(self):
+        """Test request and background threads each hold a connection"""
+        self.assertEqual(db.connections_per_worker(), 1)
+        self.assertEqual(db.connections_per_worker(threads=4, background_threads=2), 6)
+        self.assertEqual(db.connections_per_worker(threads=0), 1)
+
+    def test_max_workers(self):
+        """Test the worker cap keeps reserved connections free"""
+        self.assertIsNone(db.max_workers(0, 3))
+        self.assertEqual(db.max_workers(97, 3, reserved=3), 31)
+        self.assertEqual(db.max_workers(5, 8), 1)
+
+    def test_settings_enable_reuse(self):
+        """Test the default database keeps connections with health checks"""
+        database = settings.DATABASES['default']
+
+        self.assertEqual(database['CONN_MAX_AGE'], settings.DB_CONN_MAX_AGE)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+
+
+class ConnectionStatsTests(TestCase):
+    """Test the connection reuse counters"""
+
+    def setUp(self):
+        db.stats.reset()
+
+    def test_request_reusing_connection(self):
+        """Test a request finding an open connection counts as reuse"""
+        connection.ensure_connection()
+
+        self.client.get('/api/schema/')
+
+        snapshot = db.stats.snapshot()
+        self.assertEqual(snapshot['requests'], 1)
+        self.assertEqual(snapshot['reused'], 1)
+        self.assertEqual(snapshot['reuse_ratio'], 1.0)
+
+    def test_new_connection_counted(self):
+        """Test opening a connection is counted"""
+        connection_created.send(sender=connection.__class__, connection=connection)
+
+        self.assertEqual(db.stats.snapshot()['opened'], 1)
@@ -0,0 +1,186 @@
+"""
+Tests for request metrics and the /metrics endpoint
+"""
+import json
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import metrics
+from recipe.tests.test_recipe_api import create_user, create_recipe
+
+
+METRICS_URL = reverse('metrics')
+
+
+class HistogramTests(SimpleTestCase):
+    """Test the histogram and the text format"""
+
+    def test_render_cumulative_buckets(self):
+        """Test buckets are rendered cumulative with sum and count"""
+        histogram = metrics.Histogram('demo_seconds', 'Demo.', (0.1, 1.0), ('view',))
+        histogram.observe(0.05, view='a')
+        histogram.observe(0.5, view='a')
+        histogram.observe(3, view='a')
+
+        text = metrics.render({'demo_seconds': histogram.snapshot()})
+
+        self.assertIn('# TYPE demo_seconds histogram', text)
+        self.assertIn('demo_seconds_bucket{view="a",le="0.1"} 1', text)
+        self.assertIn('demo_seconds_bucket{view="a",le="1.0"} 2', text)
+        self.assertIn('demo_seconds_bucket{view="a",le="+Inf"} 3', text)
+        self.assertIn('demo_seconds_sum{view="a"} 3.55', text)
+        self.assertIn('demo_seconds_count{view="a"} 3', text)
+
+    def test_merge_adds_series(self):
+        """Test snapshots of several workers add up"""
+        histogram = metrics.Histogram('demo', 'Demo.', (1,), ('view',))
+        histogram.observe(0.5, view='a')
+        snapshot = {'demo': histogram.snapshot()}
+
+        merged = metrics.merge(metrics.merge({}, snapshot), snapshot)
+
+        series = merged['demo']['series'][json.dumps(['a'])]
+        self.assertEqual(series['count'], 2)
+        self.assertEqual(series['buckets'], [2, 0])
+
+
+class ExporterTests(SimpleTestCase):
+    """Test aggregation through the metrics directory"""
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        metrics.registry.reset()
+        metrics.REQUEST_DURATION.observe(0.2, view='v', method='GET', status=200)
+
+    def count(self, snapshot):
+        key = json.dumps(['v', 'GET', '200'])
+        return snapshot['recipe_api_request_duration_seconds']['series'][key]['count']
+
+    def test_collect_merges_other_workers(self):
+        """Test files written by other workers are included"""
+        other = self.directory / '99999.json'
+        other.write_text(json.dumps(metrics.registry.snapshot()))
+
+        snapshot = metrics.FileExporter(self.directory).collect()
+
+        self.assertEqual(self.count(snapshot), 2)
+
+    def test_retired_worker_kept_once(self):
+        """Test an exited worker's numbers stay in the totals exactly once"""
+        exporter = metrics.FileExporter(self.directory)
+        exporter.flush(force=True)
+        exporter.retire()
+
+        self.assertFalse(exporter.path.exists())
+        with patch('os.getpid', return_value=12345):
+            metrics.registry.reset()
+            snapshot = metrics.FileExporter(self.directory).collect()
+        self.assertEqual(self.count(snapshot), 1)
+
+    def test_killed_worker_archived(self):
+        """Test the master folds in the last snapshot of a killed worker"""
+        (self.directory / '99999.json').write_text(json.dumps(metrics.registry.snapshot()))
+        metrics.registry.reset()
+
+        metrics.retire_pid(self.directory, 99999)
+        metrics.retire_pid(self.directory, 99999)
+
+        self.assertFalse((self.directory / '99999.json').exists())
+        with patch('os.getpid', return_value=12345):
+            snapshot = metrics.FileExporter(self.directory).collect()
+        self.assertEqual(self.count(snapshot), 1)
+
+
+class MetricsMiddlewareTests(TestCase):
+    """Test requests are recorded and exposed"""
+
+    def setUp(self):
+        caches['api'].clear()
+        metrics.registry.reset()
+        self.directory = tempfile.mkdtemp()
+        settings_override = override_settings(
+            MIDDLEWARE=['core.middleware.MetricsMiddleware'] + settings.MIDDLEWARE,
+            METRICS_ENABLED=True,
+            METRICS_DIR=self.directory,
+            METRICS_TOKEN='secret',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        patcher = patch.object(metrics, '_exporter', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = create_user()
+        create_recipe(self.user, tags=['vegan'])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def scrape(self):
+        return self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer secret').content.decode()
+
+    def test_request_recorded_per_view(self):
+        """Test duration, queries, serializer time and size are recorded"""
+        self.client.get(reverse('filter_recipes'))
+
+        text = self.scrape()
+
+        self.assertIn(
+            'recipe_api_request_duration_seconds_count'
+            '{view="filter_recipes",method="GET",status="200"} 1',
+            text,
+        )
+        self.assertIn('recipe_api_db_queries_sum{view="filter_recipes"} 4', text)
+        self.assertIn('recipe_api_serializer_duration_seconds_count{view="filter_recipes"} 1', text)
+        self.assertIn('recipe_api_response_size_bytes_count{view="filter_recipes"} 1', text)
+        self.assertIn('recipe_api_response_cache_total{result="miss"}', text)
+
+    def test_serializer_time_counted(self):
+        """Test serializing adds to the serializer histogram"""
+        self.client.get(reverse('filter_recipes'))
+
+        snapshot = metrics.SERIALIZER_DURATION.snapshot()
+        self.assertGreater(snapshot['series'][json.dumps(['filter_recipes'])]['sum'], 0)
+
+    @override_settings(SERVER_TIMING=True)
+    def test_server_timing_header(self):
+        """Test the Server-Timing header when enabled"""
+        res = self.client.get(reverse('filter_recipes'))
+
+        self.assertIn('db;dur=', res['Server-Timing'])
+        self.assertIn('desc="4 queries"', res['Server-Timing'])
+        self.assertIn('serializer;dur=', res['Server-Timing'])
+
+    def test_unknown_method_grouped(self):
+        """Test made-up request methods share one OTHER series"""
+        self.client.generic('BREW', reverse('filter_recipes'))
+        self.client.generic('PROPFIND', reverse('filter_recipes'))
+
+        text = self.scrape()
+
+        self.assertIn('method="OTHER",status="405"} 2', text)
+        self.assertNotIn('BREW', text)
+
+    def test_token_required(self):
+        """Test the endpoint requires the token"""
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 401)
+
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer secret')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+    def test_hidden_without_token(self):
+        """Test the endpoint does not exist without a token or when disabled"""
+        with self.settings(METRICS_TOKEN=''):
+            self.assertEqual(self.client.get(METRICS_URL).status_code, 404)
+        with self.settings(METRICS_ENABLED=False):
+            res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION='Bearer secret')
+            self.assertEqual(res.status_code, 404)
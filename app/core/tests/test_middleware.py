@@ -0,0 +1,129 @@
+"""
+Tests for the api middleware
+"""
+import tempfile
+from unittest import mock
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.profiling import ProfileStore
+
+from recipe.tests.test_recipe_api import create_user, create_recipe
+
+
+@override_settings(
+    MIDDLEWARE=['core.middleware.QueryCountMiddleware'] + settings.MIDDLEWARE
+)
+class QueryCountMiddlewareTests(TestCase):
+    """Test the query count headers"""
+
+    def test_headers_report_queries(self):
+        """Test the headers count the queries of the request"""
+        caches['api'].clear()
+        user = create_user()
+        create_recipe(user, tags=['vegan'])
+        client = APIClient()
+        client.force_authenticate(user)
+
+        with self.assertNumQueries(4):
+            res = client.get(reverse('filter_recipes'))
+
+        self.assertEqual(res['X-DB-Queries'], '4')
+        self.assertGreaterEqual(float(res['X-DB-Time']), 0)
+
+
+class ProfilingMiddlewareTests(TestCase):
+    """Test on-demand profiling"""
+
+    def setUp(self):
+        caches['api'].clear()
+        self.directory = tempfile.mkdtemp()
+        settings_override = override_settings(
+            # Placed as settings.py does, inside MetricsMiddleware.
+            MIDDLEWARE=[
+                'core.middleware.MetricsMiddleware', 'core.middleware.ProfilingMiddleware',
+            ] + settings.MIDDLEWARE,
+            PROFILING_DIR=self.directory,
+            PROFILING_TOKEN='secret',
+            PROFILING_MAX_PROFILES=2,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = create_user()
+        create_recipe(self.user, tags=['vegan'])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.store = ProfileStore(self.directory)
+
+    def test_not_profiled_by_default(self):
+        """Test requests without the header are not profiled"""
+        res = self.client.get(reverse('filter_recipes'))
+
+        self.assertNotIn('X-Profile-Id', res)
+        self.assertEqual(self.store.list(), [])
+
+    def test_token_header_profiles_request(self):
+        """Test the token captures a profile with its phases"""
+        res = self.client.get(reverse('filter_recipes'), HTTP_X_PROFILE='secret')
+
+        [info] = self.store.list()
+        self.assertEqual(res['X-Profile-Id'], info['id'])
+        self.assertEqual(info['view'], 'filter_recipes')
+        self.assertEqual(info['db_queries'], 4)
+        self.assertGreater(info['serializer_duration'], 0)
+        _, path = self.store.get(info['id'])
+        self.assertTrue(path.exists())
+
+    def test_header_ignored_for_non_staff(self):
+        """Test a wrong token from a regular user keeps no profile"""
+        res = self.client.get(reverse('filter_recipes'), HTTP_X_PROFILE='guess')
+
+        self.assertNotIn('X-Profile-Id', res)
+        self.assertEqual(self.store.list(), [])
+
+    def test_header_accepted_for_staff(self):
+        """Test staff users can profile without the token"""
+        self.user.is_staff = True
+        self.user.save()
+        token = Token.objects.create(user=self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        res = client.get(reverse('filter_recipes'), HTTP_X_PROFILE='1')
+
+        self.assertIn('X-Profile-Id', res)
+
+    def test_anonymous_header_not_profiled(self):
+        """Test an unauthenticated X-Profile request never starts the profiler"""
+        with mock.patch('core.middleware.cProfile.Profile') as profile:
+            res = APIClient().get(reverse('filter_recipes'), HTTP_X_PROFILE='1')
+
+        profile.assert_not_called()
+        self.assertEqual(res.status_code, 401)
+        self.assertNotIn('X-Profile-Id', res)
+
+    def test_ring_buffer_keeps_newest(self):
+        """Test only PROFILING_MAX_PROFILES profiles are kept"""
+        ids = [
+            self.client.get(reverse('filter_recipes'), HTTP_X_PROFILE='secret')['X-Profile-Id']
+            for _ in range(3)
+        ]
+
+        self.assertEqual([info['id'] for info in self.store.list()], ids[:0:-1])
+        self.assertEqual(len(list(Path(self.directory).glob('*.prof'))), 2)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0)
+    def test_sampled_requests_profiled(self):
+        """Test sampling profiles requests without the header"""
+        res = self.client.get(reverse('filter_recipes'))
+
+        self.assertEqual(self.store.list()[0]['trigger'], 'sample')
+        self.assertIn('X-Profile-Id', res)
@@ -0,0 +1,66 @@
+"""
+Test data migrations
+"""
+from django.db import IntegrityError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class MergeDuplicateNamesTests(TransactionTestCase):
+    """Test 0007 merges duplicate tags before 0008 adds the constraint"""
+
+    migrate_from = [('core', '0006_recipe_image1')]
+    migrate_to = [('core', '0008_tag_ingredient_unique_name')]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicates_merged_and_links_kept(self):
+        """Test recipes linked to a duplicate end up on the kept tag"""
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        apps = executor.loader.project_state(self.migrate_from).apps
+        User = apps.get_model('core', 'User')
+        Recipe = apps.get_model('core', 'Recipe')
+        Tag = apps.get_model('core', 'Tag')
+
+        user = User.objects.create(email='user@example.com')
+        keep = Tag.objects.create(user=user, name='vegan')
+        dup1 = Tag.objects.create(user=user, name='vegan')
+        dup2 = Tag.objects.create(user=user, name='vegan')
+        both = Recipe.objects.create(user=user, title='a', time_minutes=1, price=1)
+        both.tags.add(keep, dup1, dup2)
+        only_dup = Recipe.objects.create(user=user, title='b', time_minutes=1, price=1)
+        only_dup.tags.add(dup2)
+
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.migrate_to)
+        apps = executor.loader.project_state(self.migrate_to).apps
+        Recipe = apps.get_model('core', 'Recipe')
+        Tag = apps.get_model('core', 'Tag')
+
+        self.assertEqual(list(Tag.objects.values_list('id', flat=True)), [keep.id])
+        for recipe_id in (both.id, only_dup.id):
+            tags = Recipe.objects.get(id=recipe_id).tags.values_list('id', flat=True)
+            self.assertEqual(list(tags), [keep.id])
+        with self.assertRaises(IntegrityError):
+            Tag.objects.create(user_id=user.id, name='vegan')
+
+    def test_indexes_reversible(self):
+        """Test the index migration unapplies and reapplies cleanly"""
+        executor = MigrationExecutor(connection)
+        executor.migrate([('core', '0007_merge_duplicate_names')])
+
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, 'core_tag')
+        self.assertNotIn('core_tag_unique_user_name', constraints)
+
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.migrate_to)
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, 'core_tag')
+        self.assertTrue(constraints['core_tag_unique_user_name']['unique'])
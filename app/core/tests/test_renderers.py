@@ -0,0 +1,50 @@
+"""
+Tests for the api renderers
+"""
+import datetime
+import uuid
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import FastJSONRenderer
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test FastJSONRenderer writes the same bytes as JSONRenderer"""
+
+    def assertSameOutput(self, data, accepted_media_type=None):
+        self.assertEqual(
+            FastJSONRenderer().render(data, accepted_media_type),
+            JSONRenderer().render(data, accepted_media_type),
+        )
+
+    def test_plain_values(self):
+        """Test strings, numbers and nesting"""
+        self.assertSameOutput({
+            'text': 'quote " backslash \\ tab \t newline \n \x01 é 中 😀',
+            'separators': 'a\u2028b\u2029c',
+            'numbers': [0, -1, 2 ** 63 - 1, 1.5, 0.1, True, None],
+            'nested': {'list': [{}, []], 1: 'int key'},
+        })
+
+    def test_values_for_the_encoder(self):
+        """Test values handled by DRF's encoder"""
+        self.assertSameOutput({
+            'datetime': datetime.datetime(2024, 1, 2, 3, 4, 5, 123456, tzinfo=datetime.timezone.utc),
+            'date': datetime.date(2024, 1, 2),
+            'time': datetime.time(3, 4, 5),
+            'decimal': Decimal('1.10'),
+            'uuid': uuid.UUID(int=1),
+            'lazy': gettext_lazy('Hello'),
+        })
+
+    def test_big_integer(self):
+        """Test integers orjson rejects fall back to the standard library"""
+        self.assertSameOutput({'big': 2 ** 70})
+
+    def test_indent(self):
+        """Test indented output is unchanged"""
+        self.assertSameOutput({'a': [1, 2]}, 'application/json; indent=4')
@@ -0,0 +1,50 @@
+"""
+Tests for the data stamp kept by core.signals
+"""
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Tag
+
+from recipe.tests.test_recipe_api import create_user, create_recipe
+
+
+class DataStampTests(TestCase):
+    """Test users are stamped once per transaction"""
+
+    def setUp(self):
+        self.user = create_user()
+
+    def data_version(self):
+        self.user.refresh_from_db(fields=['data_version'])
+        return self.user.data_version
+
+    def test_one_update_per_transaction(self):
+        """Test many writes in a transaction stamp the user once, on commit"""
+        before = self.data_version()
+
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                create_recipe(self.user, tags=['vegan', 'quick'], ingredients=['salt'])
+                self.assertEqual(self.data_version(), before)
+
+        stamps = [q for q in queries if q['sql'].startswith('UPDATE "core_user"')]
+        self.assertEqual(len(stamps), 1)
+        self.assertGreater(len(callbacks), 1)
+        self.assertEqual(self.data_version(), before + 1)
+
+    def test_rolled_back_savepoint(self):
+        """Test writes after a rolled back savepoint are still stamped"""
+        before = self.data_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Tag.objects.create(user=self.user, name='gone')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            Tag.objects.create(user=self.user, name='kept')
+
+        self.assertEqual(self.data_version(), before + 1)
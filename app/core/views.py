@@ -0,0 +1,26 @@
+"""
+Views for the core app
+"""
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+from core import metrics
+
+
+def metrics_view(request):
+    """Prometheus metrics of all workers.
+
+    Scrapers must send METRICS_TOKEN as a bearer token; without metrics or
+    a token the endpoint does not exist.
+    """
+    token = settings.METRICS_TOKEN
+    if not settings.METRICS_ENABLED or not token:
+        raise Http404
+    supplied = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode()):
+        return HttpResponse(status=401)
+
+    body = metrics.render(metrics.get_exporter().collect())
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
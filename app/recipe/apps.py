@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class RecipeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipe'
+
+    def ready(self):
+        from core import metrics
+        from recipe.cache import stats
+        metrics.registry.register_collector(
+            'recipe_api_response_cache_total',
+            'Lookups in the list response cache.',
+            lambda: {('hit',): stats.hits, ('miss',): stats.misses},
+            labelnames=('result',),
+        )
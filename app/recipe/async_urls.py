@@ -0,0 +1,9 @@
+from django.urls import path
+from .async_views import filter_recipes, recipe_detail, tag_list, ingredient_list
+
+urlpatterns = [
+    path('recipes/', filter_recipes, name='async-filter-recipes'),
+    path('recipes/<int:pk>', recipe_detail, name='async-recipe-detail'),
+    path('tags/', tag_list, name='async-tag-list'),
+    path('ingredients/', ingredient_list, name='async-ingredient-list'),
+]
@@ -0,0 +1,176 @@
+"""
+Async variants of the recipe api read endpoints
+
+They answer the same requests as their counterparts in recipe.views with
+the same response bodies, but as ``async def`` views: served by an ASGI
+worker, a request waiting on the database no longer blocks the worker from
+accepting others. Authentication, the data stamp lookup and every query go
+through Django's async ORM interfaces, so each of them runs on the request's
+own executor thread while the event loop stays free.
+
+Only GET and HEAD are supported; writes stay on the sync views.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+
+from core.models import Ingredient, Recipe, Tag
+from core.renderers import FastJSONRenderer
+from recipe.cache import CACHE_ALIAS, cache_key, get_data_stamp, stats
+from recipe.conditional import compute_etag, set_validators
+from recipe.fieldsets import recipe_columns, recipe_relations, selected_fields
+from recipe.filters import RecipeFilter
+from recipe.pagination import KeysetPagination
+from recipe.representations import NAME_FIELDS, RECIPE_FIELDS
+from recipe.serializers import IngredientSerializer, RecipeDetailSerializer, TagSerializer
+from user.authentication import CachedTokenAuthentication
+
+
+_authenticator = CachedTokenAuthentication()
+_renderer = FastJSONRenderer()
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    """Render ``data`` like the sync views do and keep it on the response"""
+    response = HttpResponse(
+        _renderer.render(data), status=status, content_type='application/json'
+    )
+    response.data = data
+    return response
+
+
+def _handle_exception(request, exc):
+    drf_response = exception_handler(exc, {'request': request})
+    if drf_response is None:
+        raise exc
+    response = json_response(drf_response.data, status=drf_response.status_code)
+    for header, value in drf_response.items():
+        if header.lower() != 'content-type':
+            response[header] = value
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        response.status_code = status.HTTP_401_UNAUTHORIZED
+        response['WWW-Authenticate'] = _authenticator.authenticate_header(request)
+    return response
+
+
+def _authenticate(request):
+    user_auth = _authenticator.authenticate(request)
+    if user_auth is None:
+        raise exceptions.NotAuthenticated()
+    request.user, request.auth = user_auth
+    return get_data_stamp(request)
+
+
+def async_read_view(view_name, cache=False):
+    """Wrap an async GET view with token auth, conditional GET and caching.
+
+    Equivalent to ``@api_view(['GET'])`` with CachedTokenAuthentication,
+    IsAuthenticated, ``@conditional_on_data_version(view_name)`` and, if
+    ``cache`` is true, ``@cache_response(view_name)``. ETags match those of
+    the sync view of the same name; cache entries are not shared, as they
+    are keyed on the full URL for the absolute links in paginated bodies.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(django_request, *args, **kwargs):
+            request = Request(django_request)
+            if request.method not in ('GET', 'HEAD'):
+                return _handle_exception(request, exceptions.MethodNotAllowed(request.method))
+
+            try:
+                # One thread hop for the token lookup and the data stamp.
+                version, modified_at = await sync_to_async(_authenticate)(request)
+            except exceptions.APIException as exc:
+                return _handle_exception(request, exc)
+
+            etag = compute_etag(view_name, request, version, kwargs)
+            last_modified = (
+                int(modified_at.timestamp()) if modified_at is not None else None
+            )
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified,
+            )
+            if response is not None:
+                return set_validators(response, etag, modified_at)
+
+            key = cache_key(view_name, request, version) if cache else None
+            data = await caches[CACHE_ALIAS].aget(key) if cache else None
+            if data is not None:
+                stats.record(hit=True)
+                response = json_response(data)
+            else:
+                if cache:
+                    stats.record(hit=False)
+                try:
+                    response = await view(request, *args, **kwargs)
+                except exceptions.APIException as exc:
+                    return _handle_exception(request, exc)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                if cache:
+                    await caches[CACHE_ALIAS].aset(key, response.data)
+            if cache:
+                response['X-Cache'] = 'MISS' if data is None else 'HIT'
+            return set_validators(response, etag, modified_at)
+        return wrapper
+    return decorator
+
+
+async def _paginated(queryset, request, ordering, serializer_class, fields):
+    paginator = KeysetPagination(ordering=ordering)
+    if paginator.is_requested(request):
+        rows = [row async for row in paginator.page_queryset(queryset, request)]
+        page = paginator.finish_page(rows)
+        serializer = serializer_class(page, many=True, fields=fields)
+        return json_response({
+            'next': paginator.get_next_link(),
+            'results': serializer.data,
+        })
+
+    rows = [row async for row in queryset]
+    return json_response(serializer_class(rows, many=True, fields=fields).data)
+
+
+@async_read_view('filter_recipes', cache=True)
+async def filter_recipes(request):
+    """Async variant of recipe.views.filter_recipes"""
+    recipe_filter = RecipeFilter.from_query_params(request.user, request.query_params)
+    fields = selected_fields(request.query_params, RECIPE_FIELDS)
+    recipes = recipe_filter.apply(Recipe.objects.all()).only(*recipe_columns(fields))
+    recipes = recipes.with_related(recipe_relations(fields)).order_by('id')
+    return await _paginated(recipes, request, ('id',), RecipeDetailSerializer, fields)
+
+
+@async_read_view('recipe_detail')
+async def recipe_detail(request, pk):
+    """Async variant of GET on recipe.views.recipe_detail"""
+    fields = selected_fields(request.query_params, RECIPE_FIELDS)
+    recipes = Recipe.objects.filter(user=request.user).only(*recipe_columns(fields))
+    recipes = recipes.with_related(recipe_relations(fields))
+    try:
+        recipe = await recipes.aget(pk=pk)
+    except Recipe.DoesNotExist:
+        return json_response({"error": "Recipe not found"}, status=status.HTTP_404_NOT_FOUND)
+    return json_response(RecipeDetailSerializer(recipe, fields=fields).data)
+
+
+@async_read_view('tag_list', cache=True)
+async def tag_list(request):
+    """Async variant of GET on recipe.views.tag_list"""
+    fields = selected_fields(request.query_params, NAME_FIELDS)
+    tags = Tag.objects.filter(user=request.user).order_by('name', 'id')
+    return await _paginated(tags, request, ('name', 'id'), TagSerializer, fields)
+
+
+@async_read_view('ingredient_list', cache=True)
+async def ingredient_list(request):
+    """Async variant of GET on recipe.views.ingredient_list"""
+    fields = selected_fields(request.query_params, NAME_FIELDS)
+    ingredients = Ingredient.objects.filter(user=request.user).order_by('name', 'id')
+    return await _paginated(ingredients, request, ('name', 'id'), IngredientSerializer, fields)
@@ -0,0 +1,117 @@
+"""
+Per-user response cache for the recipe list endpoints
+
+Entries are keyed on the user, their ``data_version`` and the normalized
+query. Any write to the user's recipes, tags or ingredients bumps
+``data_version`` (see core.signals), so stale entries are never read again
+and simply age out of the cache. Because the version lives in the database,
+invalidation is seen by every worker whichever cache backend is configured.
+"""
+import functools
+import hashlib
+import threading
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+from recipe.filters import parse_names
+
+
+CACHE_ALIAS = 'api'
+NAME_LIST_PARAMS = ('tags', 'ingredients')
+
+
+class CacheStats:
+    """Process-local hit/miss counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+stats = CacheStats()
+
+
+def normalize_query(params):
+    """Canonical form of the query string so equivalent requests share a key"""
+    items = []
+    for key in sorted(params.keys()):
+        for value in sorted(params.getlist(key)):
+            if key in NAME_LIST_PARAMS:
+                value = ','.join(sorted(parse_names(value)))
+            items.append((key, value))
+    return urlencode(items)
+
+
+def get_data_stamp(request):
+    """Return the user's (data_version, data_modified_at), once per request"""
+    stamp = getattr(request, '_data_stamp', None)
+    if stamp is None:
+        stamp = (
+            get_user_model().objects
+            .filter(pk=request.user.pk)
+            .values_list('data_version', 'data_modified_at')
+            .first()
+        )
+        request._data_stamp = stamp
+    return stamp
+
+
+def cache_key(view_name, request, version):
+    # The full url is part of the key because paginated responses carry
+    # absolute ``next`` links.
+    query = normalize_query(request.query_params)
+    digest = hashlib.sha1(
+        f'{request.scheme}://{request.get_host()}{request.path}?{query}'.encode()
+    ).hexdigest()
+    return f'recipe-api:{view_name}:{request.user.pk}:{version}:{digest}'
+
+
+def cache_response(view_name):
+    """Cache successful GET responses of a function view per user.
+
+    Apply it directly above the view function, below ``@api_view`` and the
+    authentication decorators, so ``request.user`` is already resolved.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+
+            cache = caches[CACHE_ALIAS]
+            # Read the version before the data: a write racing with this
+            # request then lands under an older key nobody reads again.
+            version, _ = get_data_stamp(request)
+            key = cache_key(view_name, request, version)
+            data = cache.get(key)
+            if data is not None:
+                stats.record(hit=True)
+                response = Response(data)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            stats.record(hit=False)
+            response = view(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(key, response.data)
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,69 @@
+"""
+Conditional GET support for the recipe api views
+
+Every response a user can see from these views is derived from their own
+recipes, tags and ingredients, so the per-user ``data_version`` stamp is a
+valid validator for all of them. It is read with a single primary key
+lookup before the view runs; matching If-None-Match / If-Modified-Since
+requests get a 304 without touching the recipe tables or serializers.
+"""
+import functools
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from recipe.cache import get_data_stamp, normalize_query
+
+
+def compute_etag(view_name, request, version, kwargs):
+    # The JSON and browsable API renderings of a resource differ byte for
+    # byte, so the negotiated media type is part of the tag. The async
+    # views skip negotiation and always render plain JSON.
+    media_type = getattr(request, 'accepted_media_type', 'application/json')
+    resource = (
+        f'{view_name}:{sorted(kwargs.items())}:{normalize_query(request.query_params)}'
+        f':{media_type}'
+    )
+    digest = hashlib.sha1(resource.encode()).hexdigest()[:16]
+    return quote_etag(f'{request.user.pk}-{version}-{digest}')
+
+
+def set_validators(response, etag, modified_at):
+    response['ETag'] = etag
+    if modified_at is not None:
+        response['Last-Modified'] = http_date(modified_at.timestamp())
+    # Responses are per user: let clients revalidate but keep shared
+    # caches from storing them.
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def conditional_on_data_version(view_name):
+    """Answer conditional GET/HEAD requests from the user's data stamp.
+
+    Apply it below ``@api_view`` and the authentication decorators and above
+    any ``@cache_response``.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            version, modified_at = get_data_stamp(request)
+            etag = compute_etag(view_name, request, version, kwargs)
+            last_modified = (
+                int(modified_at.timestamp()) if modified_at is not None else None
+            )
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified,
+            )
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            return set_validators(response, etag, modified_at)
+        return wrapper
+    return decorator
@@ -0,0 +1,96 @@
+"""
+Streaming export of a user's recipes as JSON Lines or CSV
+
+The rows are read in chunks of ``chunk_size`` recipes, each chunk with its
+tags and ingredients prefetched in one query per relation, and written out
+as they are serialized. Only one chunk is held in memory at a time, so a
+worker's memory does not grow with the size of the collection.
+"""
+import csv
+import io
+import json
+
+from django.db import connection
+from rest_framework.utils.encoders import JSONEncoder
+
+from recipe.serializers import RecipeDetailSerializer
+
+
+EXPORT_TYPES = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+CSV_COLUMNS = [
+    'id', 'title', 'description', 'time_minutes', 'price', 'link',
+    'tags', 'ingredients', 'image1',
+]
+# Output is sent in pieces of about this many bytes rather than per row.
+BUFFER_SIZE = 64 * 1024
+
+
+def iter_recipes(queryset, chunk_size):
+    """Recipes of ``queryset`` (ordered by id) read ``chunk_size`` at a time"""
+    if not connection.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        # A server-side cursor on PostgreSQL, fetchmany() elsewhere.
+        yield from queryset.iterator(chunk_size=chunk_size)
+        return
+    # Behind a transaction pooler a cursor cannot outlive a transaction and
+    # Django would fetch the whole result at once: read by id ranges.
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        yield from chunk
+        last_id = chunk[-1].id
+
+
+def _buffered(pieces):
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= BUFFER_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def _jsonl_lines(recipes, serializer):
+    for recipe in recipes:
+        data = serializer.to_representation(recipe)
+        yield json.dumps(data, cls=JSONEncoder, ensure_ascii=False) + '\n'
+
+
+def _csv_lines(recipes, serializer):
+    line = io.StringIO()
+    writer = csv.writer(line)
+
+    def render(row):
+        writer.writerow(row)
+        text = line.getvalue()
+        line.seek(0)
+        line.truncate()
+        return text
+
+    yield render(CSV_COLUMNS)
+    for recipe in recipes:
+        data = serializer.to_representation(recipe)
+        # Names may contain any character, so the lists are JSON arrays.
+        for field in ('tags', 'ingredients'):
+            data[field] = json.dumps([item['name'] for item in data[field]], ensure_ascii=False)
+        yield render([
+            '' if data[column] is None else data[column] for column in CSV_COLUMNS
+        ])
+
+
+def export_lines(queryset, export_type, request, chunk_size):
+    """The export of ``queryset`` as an iterator of text pieces"""
+    serializer = RecipeDetailSerializer(context={'request': request})
+    recipes = iter_recipes(queryset, chunk_size)
+    if export_type == 'csv':
+        return _buffered(_csv_lines(recipes, serializer))
+    return _buffered(_jsonl_lines(recipes, serializer))
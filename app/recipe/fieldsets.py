@@ -0,0 +1,62 @@
+"""
+Sparse fieldsets for the recipe, tag and ingredient read views
+
+``?fields=id,title`` returns only the listed fields of each object and
+``?omit=description`` leaves fields out. The views use the selection to
+trim the output and also the SELECT: recipe columns that are not returned
+are not loaded, and tags or ingredients that are not returned are not
+prefetched.
+"""
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import serializers
+
+from recipe.filters import parse_names
+
+
+RECIPE_RELATIONS = ('tags', 'ingredients')
+
+FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        name='fields',
+        type={'type': 'array', 'items': {'type': 'string'}},
+        location=OpenApiParameter.QUERY,
+        description='Comma-separated fields to return (e.g., ?fields=id,title,image1)',
+        explode=False,
+        required=False,
+    ),
+    OpenApiParameter(
+        name='omit',
+        type={'type': 'array', 'items': {'type': 'string'}},
+        location=OpenApiParameter.QUERY,
+        description='Comma-separated fields to leave out (e.g., ?omit=description)',
+        explode=False,
+        required=False,
+    ),
+]
+
+
+def selected_fields(params, available):
+    """The fields of ``available``, in its order, chosen by ?fields= / ?omit="""
+    fields = parse_names(params.get('fields'))
+    omit = parse_names(params.get('omit'))
+    for param, names in (('fields', fields), ('omit', omit)):
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise serializers.ValidationError({
+                param: f"Unknown fields: {', '.join(unknown)}. "
+                       f"Choose from: {', '.join(available)}."
+            })
+    return tuple(
+        name for name in available
+        if (not fields or name in fields) and name not in omit
+    )
+
+
+def recipe_columns(fields):
+    """Recipe model columns needed for ``fields``"""
+    return [name for name in fields if name not in RECIPE_RELATIONS]
+
+
+def recipe_relations(fields):
+    """Recipe relations to prefetch for ``fields``"""
+    return [name for name in RECIPE_RELATIONS if name in fields]
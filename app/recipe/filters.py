@@ -0,0 +1,84 @@
+"""
+Query compiler for the recipe list filters
+"""
+from django.db.models import Count, Exists, OuterRef
+from rest_framework import serializers
+
+from core.models import Recipe
+
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_CHOICES = (MATCH_ANY, MATCH_ALL)
+
+
+def parse_names(value):
+    """Split a comma-separated query value into distinct non-empty names"""
+    if not value:
+        return []
+    names = (name.strip() for name in value.split(','))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+class RecipeFilter:
+    """Compile ?tags= / ?ingredients= into semi-joins on the through tables.
+
+    With ``match=any`` a recipe is kept if an EXISTS subquery finds one of
+    the names on it; with ``match=all`` the through rows are grouped per
+    recipe and only recipes matching every name are kept. Names are looked
+    up among the requesting user's tags and ingredients only, and neither
+    mode joins the recipe rows themselves, so no DISTINCT is needed.
+    """
+    relations = (
+        ('tags', 'tag'),
+        ('ingredients', 'ingredient'),
+    )
+
+    def __init__(self, user, tags=(), ingredients=(), match=MATCH_ANY):
+        self.user = user
+        self.names = {'tags': list(tags), 'ingredients': list(ingredients)}
+        self.match = match
+
+    @classmethod
+    def from_query_params(cls, user, params):
+        match = params.get('match', MATCH_ANY)
+        if match not in MATCH_CHOICES:
+            raise serializers.ValidationError(
+                {'match': f'Must be one of: {", ".join(MATCH_CHOICES)}.'}
+            )
+        return cls(
+            user,
+            tags=parse_names(params.get('tags')),
+            ingredients=parse_names(params.get('ingredients')),
+            match=match,
+        )
+
+    def _postings(self, relation, target, names):
+        """Through rows linking the user's named tags/ingredients to recipes"""
+        through = getattr(Recipe, relation).through
+        return through.objects.filter(**{
+            f'{target}__user': self.user,
+            f'{target}__name__in': names,
+        })
+
+    def apply(self, queryset):
+        queryset = queryset.filter(user=self.user)
+        for relation, target in self.relations:
+            names = self.names[relation]
+            if not names:
+                continue
+            postings = self._postings(relation, target, names)
+            if self.match == MATCH_ALL:
+                matching = (
+                    postings
+                    .values('recipe_id')
+                    .annotate(matched=Count(f'{target}_id'))
+                    .filter(matched=len(names))
+                    .values('recipe_id')
+                )
+                queryset = queryset.filter(pk__in=matching)
+            else:
+                queryset = queryset.filter(
+                    Exists(postings.filter(recipe_id=OuterRef('pk')))
+                )
+        return queryset
@@ -0,0 +1,139 @@
+"""
+Background generation of resized recipe image variants
+
+Uploads are stored as-is on the request path; resizing happens afterwards on
+a small thread pool. Each variant is written as WebP and JPEG with EXIF and
+other metadata dropped, and the resulting storage paths are saved on
+``Recipe.image_variants``.
+"""
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from core.models import Recipe
+from core.signals import notify_user_data_changed
+
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels; images are never upscaled.
+VARIANT_SIZES = {
+    'thumbnail': 200,
+    'medium': 800,
+}
+
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process-wide worker pool, creating it on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_PROCESSING_WORKERS,
+                thread_name_prefix='recipe-images',
+            )
+        return _executor
+
+
+def reset_executor():
+    """Drop the pool, e.g. in a freshly forked worker process"""
+    global _executor
+    with _executor_lock:
+        _executor = None
+
+
+def delete_variant_files(variants):
+    """Remove the files of a {size: {format: path}} mapping from storage"""
+    for paths in (variants or {}).values():
+        for path in paths.values():
+            default_storage.delete(path)
+
+
+def schedule_image_variants(recipe_id, replaced=None):
+    """Generate variants for a recipe once the current transaction commits.
+
+    ``replaced`` are the variants of the previous image, deleted at the same
+    time. With IMAGE_PROCESSING_WORKERS = 0 the work runs inline instead.
+    """
+    def submit():
+        delete_variant_files(replaced)
+        if settings.IMAGE_PROCESSING_WORKERS <= 0:
+            process_recipe_image(recipe_id)
+        else:
+            get_executor().submit(_run_in_worker, recipe_id)
+
+    transaction.on_commit(submit)
+
+
+def _run_in_worker(recipe_id):
+    close_old_connections()
+    try:
+        process_recipe_image(recipe_id)
+    except Exception:
+        logger.exception('Generating image variants failed for recipe %s', recipe_id)
+    finally:
+        close_old_connections()
+
+
+def _encode(image, pil_format, options):
+    if pil_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    # No exif/icc_profile arguments: the encoded file carries pixels only.
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def process_recipe_image(recipe_id):
+    """Write every variant of the recipe's current image to storage"""
+    recipe = Recipe.objects.filter(pk=recipe_id).only('user_id', 'image1', 'image_variants').first()
+    if recipe is None or not recipe.image1:
+        return None
+    source = recipe.image1.name
+
+    with recipe.image1.open('rb') as image_file:
+        original = Image.open(image_file)
+        original = ImageOps.exif_transpose(original)
+        original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'A' in original.getbands() else 'RGB')
+
+    prefix = f'recipes/{recipe_id}/{uuid.uuid4().hex}'
+    variants = {}
+    for name, size in VARIANT_SIZES.items():
+        resized = original.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        resized.info = {}
+        variants[name] = {}
+        for extension, (pil_format, options) in VARIANT_FORMATS.items():
+            path = default_storage.save(
+                f'{prefix}/{name}.{extension}',
+                ContentFile(_encode(resized, pil_format, options)),
+            )
+            variants[name][extension] = path
+
+    # Only attach the variants if the image was not replaced meanwhile.
+    updated = Recipe.objects.filter(pk=recipe_id, image1=source).update(
+        image_variants=variants
+    )
+    delete_variant_files(recipe.image_variants if updated else variants)
+    if updated:
+        notify_user_data_changed(recipe.user_id)
+        return variants
+    return None
@@ -0,0 +1,196 @@
+"""
+Bulk import of recipes from JSON Lines or CSV
+
+Accepts the formats written by recipe.export, so an export can be imported
+again. Rows are validated one by one and the valid ones are written in
+batches of ``batch_size``: one bulk insert for the recipes, one set-wise
+resolution of the batch's tag and ingredient names and one bulk insert per
+relation. Invalid rows are reported by row number and skipped; the other
+rows of the import are still created. If the database still rejects a
+batch, its rows are retried one at a time to find and report the culprit.
+"""
+import csv
+import io
+import json
+
+from django.db import DatabaseError, connection, transaction
+from rest_framework.exceptions import ValidationError
+
+from core.models import Recipe, Tag, Ingredient
+from core.signals import notify_user_data_changed
+from recipe.resolvers import resolve_names
+from recipe.serializers import RecipeImportSerializer
+
+
+IMPORT_TYPES = ('jsonl', 'csv')
+DEFAULT_BATCH_SIZE = 1000
+# Row errors listed in the result; the rest are only counted.
+MAX_REPORTED_ERRORS = 100
+# Hand-written CSV cells may list names separated by this instead of as
+# the JSON array the export writes.
+CSV_LIST_SEPARATOR = '|'
+
+_INVALID_JSON = object()
+
+
+class _Unreadable:
+    """Stands in for the row where the file stopped being readable"""
+
+    def __init__(self, reason):
+        self.reason = reason
+
+
+def read_rows(stream, import_type):
+    """(row number, row) for each record of a binary ``stream``.
+
+    A file that cannot be decoded or parsed further ends with an
+    ``_Unreadable`` row; the rows before it are still imported.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    number = 0
+    try:
+        if import_type == 'csv':
+            for number, row in enumerate(csv.DictReader(text), 1):
+                yield number, row
+            return
+        for line in text:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                yield number, _INVALID_JSON
+    except UnicodeDecodeError:
+        yield number + 1, _Unreadable('The file is not UTF-8 encoded.')
+    except csv.Error as e:
+        yield number + 1, _Unreadable(f'Invalid CSV: {e}.')
+
+
+def _names(value):
+    """Names from a list of strings or {'name': ...} objects, or a CSV cell"""
+    if isinstance(value, str):
+        if not value.lstrip().startswith('['):
+            return [name.strip() for name in value.split(CSV_LIST_SEPARATOR) if name.strip()]
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return value
+    if isinstance(value, list):
+        return [item.get('name') if isinstance(item, dict) else item for item in value]
+    return value
+
+
+def validate_row(serializer, row):
+    """(validated data, None) or (None, errors) for one row.
+
+    ``serializer`` is an unbound RecipeImportSerializer, reused for every
+    row: building its fields costs more than validating a row.
+    """
+    if row is _INVALID_JSON:
+        return None, {'non_field_errors': ['Invalid JSON.']}
+    if isinstance(row, _Unreadable):
+        return None, {'non_field_errors': [
+            f'{row.reason} Reading stopped here; only the valid rows before it were imported.'
+        ]}
+    if not isinstance(row, dict):
+        return None, {'non_field_errors': ['Expected an object.']}
+    row = {key: value for key, value in row.items() if key is not None}
+    for field in ('tags', 'ingredients'):
+        if field in row:
+            row[field] = _names(row[field])
+    try:
+        return serializer.run_validation(row), None
+    except ValidationError as e:
+        return None, e.detail
+
+
+class ImportResult:
+    """Counts of an import and the first MAX_REPORTED_ERRORS row errors"""
+
+    def __init__(self):
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, number, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': number, 'errors': errors})
+
+    def as_dict(self):
+        return {'created': self.created, 'failed': self.failed, 'errors': self.errors}
+
+
+def import_recipes(user, rows, batch_size=DEFAULT_BATCH_SIZE):
+    """Create the valid recipes of ``rows`` (see read_rows) for ``user``"""
+    result = ImportResult()
+    serializer = RecipeImportSerializer()
+    batch = []
+    for number, row in rows:
+        data, errors = validate_row(serializer, row)
+        if errors:
+            result.add_error(number, errors)
+            continue
+        batch.append((number, data))
+        if len(batch) >= batch_size:
+            _create(user, batch, result)
+            batch = []
+    if batch:
+        _create(user, batch, result)
+    return result
+
+
+def _create(user, batch, result):
+    try:
+        result.created += create_batch(user, [data for _, data in batch])
+        return
+    except DatabaseError:
+        pass
+    # The batch was rolled back; a row the validation let through, e.g. one
+    # over a database specific limit, broke it.
+    for number, data in batch:
+        try:
+            result.created += create_batch(user, [data])
+        except DatabaseError:
+            result.add_error(number, {'non_field_errors': ['The database rejected this row.']})
+
+
+def create_batch(user, batch):
+    """Insert validated rows with their tags and ingredients"""
+    with transaction.atomic():
+        # PostgreSQL and SQLite 3.35+ set the ids of bulk inserted rows.
+        # ingredient_count is set here as the raw links skip the signals
+        # that maintain it; names and ingredient rows map one to one.
+        recipes = Recipe.objects.bulk_create([
+            Recipe(user=user, ingredient_count=len(set(data.get('ingredients', ()))), **{
+                key: value for key, value in data.items()
+                if key not in ('tags', 'ingredients')
+            })
+            for data in batch
+        ])
+        _link(user, recipes, batch, Tag, 'tags', 'tag_id')
+        _link(user, recipes, batch, Ingredient, 'ingredients', 'ingredient_id')
+        # Bulk inserts skip the model signals that maintain the data stamp.
+        notify_user_data_changed(user.id)
+    return len(recipes)
+
+
+def _link(user, recipes, batch, model, field, target_column):
+    names = [name for data in batch for name in data.get(field, ())]
+    if not names:
+        return
+    ids = resolve_names(model, user, names)
+    links = [
+        (recipe.id, target_id)
+        for recipe, data in zip(recipes, batch)
+        for target_id in dict.fromkeys(ids[name] for name in data.get(field, ()))
+    ]
+    # Plain executemany: a model instance per link would dominate the import.
+    quote = connection.ops.quote_name
+    sql = (
+        f"INSERT INTO {quote(getattr(Recipe, field).through._meta.db_table)} "
+        f"({quote('recipe_id')}, {quote(target_column)}) VALUES (%s, %s)"
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, links)
@@ -0,0 +1,201 @@
+"""
+Keyset (cursor) pagination for recipe api list views
+"""
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+PAGINATION_PARAMETERS = [
+    OpenApiParameter(
+        name='cursor',
+        type=str,
+        location=OpenApiParameter.QUERY,
+        description='Opaque cursor taken from the `next` link of a previous page.',
+        required=False,
+    ),
+    OpenApiParameter(
+        name='page_size',
+        type=int,
+        location=OpenApiParameter.QUERY,
+        description=(
+            'Number of results per page. Passing this or `cursor` switches '
+            'the response to `{"next": <url or null>, "results": [...]}`.'
+        ),
+        required=False,
+    ),
+]
+
+
+class KeysetPagination:
+    """Paginate a queryset on a unique ordering of indexed columns.
+
+    Each page continues after the last row of the previous one with a
+    ``WHERE (name, id) > (...)`` style filter instead of an OFFSET, so deep
+    pages cost the same as the first one. Pagination is opt-in: it is only
+    applied when the request carries a ``cursor`` or ``page_size`` parameter.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering):
+        self.ordering = tuple(ordering)
+        self.next_position = None
+        self.request = None
+
+    def is_requested(self, request):
+        """Return True if the client asked for a paginated response"""
+        return (
+            self.cursor_query_param in request.query_params
+            or self.page_size_query_param in request.query_params
+        )
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return settings.API_PAGE_SIZE
+        if page_size <= 0:
+            return settings.API_PAGE_SIZE
+        return min(page_size, settings.API_MAX_PAGE_SIZE)
+
+    def encode_cursor(self, position):
+        data = json.dumps(position, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            position = json.loads(base64.urlsafe_b64decode(padded))
+        except (binascii.Error, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def coerce_position(self, model, position):
+        """Convert a decoded cursor to the types of the ordering fields.
+
+        The cursor comes from the client, so a forged one must not reach
+        the ORM with values it cannot compare against the columns.
+        """
+        values = []
+        try:
+            for name, value in zip(self.ordering, position):
+                if value is None or isinstance(value, (bool, dict, list)):
+                    raise TypeError(f'Unusable cursor value for {name}')
+                values.append(model._meta.get_field(name).to_python(value))
+        except (ValueError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def _after(self, position):
+        """Build the filter selecting rows ordered after ``position``"""
+        fields = list(zip(self.ordering, position))
+        field, value = fields[-1]
+        condition = Q(**{f'{field}__gt': value})
+        for field, value in reversed(fields[:-1]):
+            condition = Q(**{f'{field}__gt': value}) | (
+                Q(**{field: value}) & condition
+            )
+        leading, value = fields[0]
+        return Q(**{f'{leading}__gte': value}) & condition
+
+    def page_queryset(self, queryset, request):
+        """Return the unevaluated queryset of the requested page.
+
+        It holds one row more than the page size; pass the evaluated rows to
+        ``finish_page``. ``paginate_queryset`` does both.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            position = self.coerce_position(queryset.model, position)
+            queryset = queryset.filter(self._after(position))
+        return queryset[:self.page_size + 1]
+
+    def finish_page(self, rows):
+        """Trim the look-ahead row and remember where the next page starts"""
+        page = rows[:self.page_size]
+        if len(rows) > self.page_size:
+            last = page[-1]
+            if isinstance(last, dict):
+                # .values() rows
+                self.next_position = [last[field] for field in self.ordering]
+            else:
+                self.next_position = [getattr(last, field) for field in self.ordering]
+        else:
+            self.next_position = None
+        return page
+
+    def paginate_queryset(self, queryset, request):
+        """Return the rows of the requested page as a list"""
+        return self.finish_page(list(self.page_queryset(queryset, request)))
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.next_position)
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+class RankedPagination(KeysetPagination):
+    """Cursor pagination for results ordered by a computed rank.
+
+    Search results are ordered by relevance, which is not a column that can
+    be used as a key, so the cursor carries an offset instead. Unlike
+    KeysetPagination it is always applied.
+    """
+
+    def __init__(self):
+        super().__init__(ordering=('offset',))
+
+    def paginate(self, request, fetch):
+        """Return one page from ``fetch(limit, offset)``"""
+        self.request = request
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+        offset = position[0] if position is not None else 0
+        if not isinstance(offset, int) or offset < 0:
+            raise NotFound(self.invalid_cursor_message)
+
+        rows = fetch(page_size + 1, offset)
+        if len(rows) > page_size:
+            self.next_position = [offset + page_size]
+        else:
+            self.next_position = None
+        return rows[:page_size]
+
+
+def parse_limit(params, default, maximum):
+    """The ?limit= of a top-K view, ``default`` if missing and at most ``maximum``"""
+    try:
+        limit = int(params['limit'])
+    except (KeyError, ValueError):
+        return default
+    if limit <= 0:
+        return default
+    return min(limit, maximum)
@@ -0,0 +1,120 @@
+"""
+"What can I cook": rank recipes by how much of them a pantry covers
+
+The ingredient side of the recipe-ingredient through table, indexed on
+(ingredient_id, recipe_id) since migration core 0008, is an inverted index
+from ingredient to recipes. Matching reads the postings of the pantry's
+ingredients only and counts them per recipe; ``Recipe.ingredient_count``,
+kept current by core.signals, turns the count into coverage without
+looking at the recipes' other ingredients. The work grows with the number
+of recipes using the pantry's ingredients, not with the collection.
+Missing ingredients are then listed for the top recipes alone.
+"""
+from django.db import connection
+from drf_spectacular.utils import OpenApiParameter
+
+from core.models import Ingredient, Recipe
+
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+PANTRY_PARAMETERS = [
+    OpenApiParameter(
+        name='ingredients',
+        type={'type': 'array', 'items': {'type': 'string'}},
+        location=OpenApiParameter.QUERY,
+        description='Comma-separated ingredient names you have (e.g., ?ingredients=tomato,basil)',
+        explode=False,
+        required=True,
+    ),
+    OpenApiParameter(
+        name='limit',
+        type=int,
+        location=OpenApiParameter.QUERY,
+        description=f'Number of recipes (default {DEFAULT_LIMIT}, at most {MAX_LIMIT}).',
+        required=False,
+    ),
+    OpenApiParameter(
+        name='max_missing',
+        type=int,
+        location=OpenApiParameter.QUERY,
+        description='Only recipes missing at most this many ingredients.',
+        required=False,
+    ),
+]
+
+
+def pantry_ingredient_ids(user, names):
+    """Ids of the user's ingredients named in ``names``"""
+    return list(
+        Ingredient.objects.filter(user=user, name__in=names).values_list('id', flat=True)
+    )
+
+
+def match_recipes(user, ingredient_ids, limit=DEFAULT_LIMIT, max_missing=None):
+    """Top recipes using ``ingredient_ids``, best covered first.
+
+    Returns dicts with ``recipe_id``, ``matched`` (pantry ingredients used),
+    ``missing`` (other ingredients) and ``coverage`` (matched / all).
+    Recipes using none of the ingredients are never returned.
+    """
+    if not ingredient_ids:
+        return []
+    # Count the postings before touching core_recipe: joined first, the
+    # planner walks all of the user's recipes instead. A stale zero
+    # ingredient_count gives coverage 0, not NULL, which PostgreSQL would
+    # sort first.
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(ingredient_ids))
+    missing_clause = (
+        'AND recipe.ingredient_count - postings.matched <= %s' if max_missing is not None else ''
+    )
+    sql = f"""
+        SELECT postings.recipe_id, postings.matched,
+               recipe.ingredient_count - postings.matched AS missing,
+               COALESCE(
+                   1.0 * postings.matched / NULLIF(recipe.ingredient_count, 0), 0
+               ) AS coverage
+        FROM (
+            SELECT recipe_id, COUNT(*) AS matched
+            FROM {quote(Recipe.ingredients.through._meta.db_table)}
+            WHERE ingredient_id IN ({placeholders})
+            GROUP BY recipe_id
+        ) AS postings
+        JOIN {quote(Recipe._meta.db_table)} AS recipe ON recipe.id = postings.recipe_id
+        WHERE recipe.user_id = %s {missing_clause}
+        ORDER BY coverage DESC, missing, postings.recipe_id
+        LIMIT %s
+    """
+    params = [*ingredient_ids, user.pk]
+    if max_missing is not None:
+        params.append(max_missing)
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    return [
+        {
+            'recipe_id': recipe_id,
+            'matched': matched,
+            'missing': missing,
+            'coverage': float(coverage),
+        }
+        for recipe_id, matched, missing, coverage in rows
+    ]
+
+
+def missing_ingredients(recipe_ids, ingredient_ids):
+    """{recipe id: [names of its ingredients not in ``ingredient_ids``]}"""
+    missing = {recipe_id: [] for recipe_id in recipe_ids}
+    links = (
+        Recipe.ingredients.through.objects
+        .filter(recipe_id__in=recipe_ids)
+        .exclude(ingredient_id__in=ingredient_ids)
+        .order_by('ingredient__name')
+        .values_list('recipe_id', 'ingredient__name')
+    )
+    for recipe_id, name in links:
+        missing[recipe_id].append(name)
+    return missing
@@ -0,0 +1,104 @@
+"""
+Read-only fast path for the recipe, tag and ingredient lists
+
+Builds the same data as RecipeDetailSerializer, TagSerializer and
+IngredientSerializer with ``many=True``, but from ``.values()`` rows and
+one query per relation: no model instances are created and no serializer
+fields run per row. The output must stay identical to the serializers';
+tests/test_representations.py compares the two, so add new serializer
+fields here as well. Both take the fields selected with ?fields= / ?omit=
+(recipe.fieldsets) and load only what those fields need.
+"""
+import functools
+
+from core import metrics
+from core.models import Recipe
+from recipe.fieldsets import recipe_columns, recipe_relations
+from recipe.serializers import RecipeDetailSerializer, image_variant_urls
+
+
+RECIPE_FIELDS = tuple(RecipeDetailSerializer.Meta.fields)
+NAME_FIELDS = ('id', 'name')
+
+
+def recipe_values(queryset, fields=RECIPE_FIELDS):
+    """``queryset`` reduced to the columns represent_recipes needs.
+
+    The id is always read: it keys the relations and pagination cursors.
+    """
+    return queryset.values(*dict.fromkeys(['id', *recipe_columns(fields)]))
+
+
+def name_values(queryset):
+    """Tag or ingredient rows with the columns pagination orders on"""
+    return queryset.values(*NAME_FIELDS)
+
+
+@functools.lru_cache(maxsize=None)
+def _field(name):
+    # The serializer's own field, so formatting (e.g. of prices) matches.
+    return RecipeDetailSerializer().fields[name]
+
+
+def _related(field, recipe_ids):
+    """{recipe id: [{'id', 'name'}, ...]} ordered by id, as with_related()"""
+    relation = getattr(Recipe, field)
+    through = relation.through
+    target = relation.field.m2m_reverse_field_name()
+    rows = (
+        through.objects
+        .filter(recipe_id__in=recipe_ids)
+        .order_by(f'{target}_id')
+        .values_list('recipe_id', f'{target}_id', f'{target}__name')
+    )
+    related = {}
+    for recipe_id, pk, name in rows:
+        related.setdefault(recipe_id, []).append({'id': pk, 'name': name})
+    return related
+
+
+def represent_recipes(rows, request=None, fields=RECIPE_FIELDS):
+    """RecipeDetailSerializer(many=True, fields=fields).data for recipe_values rows"""
+    with metrics.timed('serializer'):
+        rows = list(rows)
+        if not rows:
+            return []
+        recipe_ids = [row['id'] for row in rows]
+        related = {
+            relation: _related(relation, recipe_ids)
+            for relation in recipe_relations(fields)
+        }
+        storage = Recipe._meta.get_field('image1').storage
+
+        def image_url(name):
+            if not name:
+                return None
+            url = storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+
+        convert = {
+            'price': _field('price').to_representation,
+            'image1': image_url,
+            'image_variants': lambda paths: image_variant_urls(paths, request),
+        }
+        plan = [(name, related.get(name), convert.get(name)) for name in fields]
+        data = []
+        for row in rows:
+            item = {}
+            for name, relation, function in plan:
+                if relation is not None:
+                    item[name] = relation.get(row['id'], [])
+                elif function is not None:
+                    item[name] = function(row[name])
+                else:
+                    item[name] = row[name]
+            data.append(item)
+        return data
+
+
+def represent_names(rows, fields=NAME_FIELDS):
+    """TagSerializer / IngredientSerializer(many=True).data for name_values rows"""
+    with metrics.timed('serializer'):
+        if tuple(fields) == NAME_FIELDS:
+            return list(rows)
+        return [{name: row[name] for name in fields} for row in rows]
@@ -0,0 +1,40 @@
+"""
+Set-based resolution of tag and ingredient names
+"""
+
+
+def _lookup_names(model, user, names):
+    """Return {name: pk} for the rows of ``user`` matching ``names``"""
+    rows = (
+        model.objects
+        .filter(user=user, name__in=names)
+        .order_by('id')
+        .values_list('id', 'name')
+    )
+    found = {}
+    for pk, name in rows:
+        found.setdefault(name, pk)
+    return found
+
+
+def resolve_names(model, user, names):
+    """Return {name: pk} for ``names``, creating the missing rows in bulk.
+
+    ``model`` is Tag or Ingredient. Existing rows are read with one SELECT and
+    missing ones are inserted with a single ``bulk_create``. Conflicting
+    inserts from concurrent requests are ignored by the (user, name) unique
+    constraint and picked up by re-reading the missing names afterwards.
+    """
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+
+    resolved = _lookup_names(model, user, names)
+    missing = [name for name in names if name not in resolved]
+    if missing:
+        model.objects.bulk_create(
+            [model(user=user, name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        resolved.update(_lookup_names(model, user, missing))
+    return resolved
@@ -0,0 +1,91 @@
+"""
+Full-text search over recipe titles and descriptions
+
+The search document is maintained by the database itself (see migration
+core 0009): a trigger-maintained tsvector column on PostgreSQL and an FTS5 table fed
+by triggers on SQLite. Other backends fall back to substring matching.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from core.models import Recipe
+
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _postgres_search(user, query, limit, offset):
+    sql = """
+        SELECT id
+        FROM core_recipe, websearch_to_tsquery('english', %s) AS query
+        WHERE user_id = %s AND search_vector @@ query
+        ORDER BY ts_rank(search_vector, query) DESC, id
+        LIMIT %s OFFSET %s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [query, user.pk, limit, offset])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _sqlite_search(user, query, limit, offset):
+    tokens = TOKEN_RE.findall(query)
+    if not tokens:
+        return []
+    # Quote every token so user input is never parsed as FTS5 syntax.
+    match = ' '.join('"%s"' % token for token in tokens)
+    sql = """
+        SELECT recipe.id
+        FROM core_recipe_fts
+        JOIN core_recipe AS recipe ON recipe.id = core_recipe_fts.rowid
+        WHERE core_recipe_fts MATCH %s AND recipe.user_id = %s
+        ORDER BY bm25(core_recipe_fts, 10.0, 1.0), recipe.id
+        LIMIT %s OFFSET %s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, user.pk, limit, offset])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fallback_search(user, query, limit, offset):
+    tokens = TOKEN_RE.findall(query)
+    if not tokens:
+        return []
+    recipes = Recipe.objects.filter(user=user)
+    for token in tokens:
+        recipes = recipes.filter(
+            Q(title__icontains=token) | Q(description__icontains=token)
+        )
+    recipes = recipes.annotate(
+        title_match=Case(
+            When(title__icontains=tokens[0], then=Value(0)),
+            default=Value(1),
+            output_field=IntegerField(),
+        )
+    ).order_by('title_match', 'id')
+    return list(recipes.values_list('id', flat=True)[offset:offset + limit])
+
+
+BACKENDS = {
+    'postgresql': _postgres_search,
+    'sqlite': _sqlite_search,
+}
+
+
+def search_recipe_ids(user, query, limit, offset=0):
+    """Return ids of the user's recipes matching ``query``, best first"""
+    backend = BACKENDS.get(connection.vendor, _fallback_search)
+    return backend(user, query, limit, offset)
+
+
+def search_recipes(user, query, limit, offset=0, queryset=None):
+    """Return the matching recipes in rank order with relations prefetched.
+
+    ``queryset`` may narrow the columns and prefetches that are loaded.
+    """
+    if queryset is None:
+        queryset = Recipe.objects.with_related()
+    ids = search_recipe_ids(user, query, limit, offset)
+    recipes = queryset.filter(pk__in=ids).in_bulk()
+    return [recipes[pk] for pk in ids if pk in recipes]
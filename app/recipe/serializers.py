@@ -2,18 +2,68 @@
 serializers for recipe api
 """
 from rest_framework import serializers
+from drf_spectacular.utils import extend_schema_field
 from core.models import (
     Recipe,
     Tag,
     Ingredient
 )
+from core.serializers import TimedSerializerMixin
+from recipe.resolvers import resolve_names
+from recipe.images import schedule_image_variants
 
 import os
 import uuid
 from django.core.files.storage import default_storage
 from django.conf import settings
 
-class TagSerializer(serializers.ModelSerializer):
+def image_variant_urls(image_variants, request=None):
+    """{size: {format: url}} for the stored paths of Recipe.image_variants"""
+    if not image_variants:
+        return None
+    variants = {}
+    for size, paths in image_variants.items():
+        variants[size] = {}
+        for image_format, path in paths.items():
+            url = default_storage.url(path)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            variants[size][image_format] = url
+    return variants
+
+
+class SparseFieldsMixin:
+    """Accept ``fields=[...]`` to keep only those fields (recipe.fieldsets)"""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class UniqueNameMixin:
+    """Reject a name the requesting user already uses.
+
+    Only applies when the serializer is used on its own; nested tags and
+    ingredients on a recipe are resolved to existing rows instead.
+    """
+
+    def validate_name(self, value):
+        request = self.context.get('request')
+        if request is None or self.parent is not None:
+            return value
+        queryset = self.Meta.model.objects.filter(user=request.user, name=value)
+        if self.instance is not None:
+            queryset = queryset.exclude(pk=self.instance.pk)
+        if queryset.exists():
+            raise serializers.ValidationError(
+                f'{self.Meta.model._meta.verbose_name} with this name already exists.'
+            )
+        return value
+
+
+class TagSerializer(TimedSerializerMixin, SparseFieldsMixin, UniqueNameMixin, serializers.ModelSerializer):
     """serializer for Tag model"""
 
     class Meta:
@@ -29,7 +79,7 @@ class TagSerializer(serializers.ModelSerializer):
 
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, SparseFieldsMixin, UniqueNameMixin, serializers.ModelSerializer):
     """serializer for Ingeredients"""
     class Meta:
         model= Ingredient
@@ -38,15 +88,16 @@ class IngredientSerializer(serializers.ModelSerializer):
 
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for recipes"""
 
     tags= TagSerializer(many=True, required=False)
     ingredients= IngredientSerializer(many=True,required=False)
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model= Recipe
-        fields= ['id','title','time_minutes','price','link','tags','ingredients','image1',]
+        fields= ['id','title','time_minutes','price','link','tags','ingredients','image1','image_variants',]
         read_only_fields= ['id']
 
         extra_kwargs = {
@@ -67,14 +118,27 @@ class RecipeSerializer(serializers.ModelSerializer):
 
 
 
+    @extend_schema_field({
+        'type': 'object',
+        'nullable': True,
+        'additionalProperties': {
+            'type': 'object',
+            'additionalProperties': {'type': 'string', 'format': 'uri'},
+        },
+        'description': 'URLs of resized copies of image1 by size and format, '
+                       'null while they are being generated.',
+    })
+    def get_image_variants(self, recipe):
+        """Return {size: {format: url}} for the generated image variants"""
+        return image_variant_urls(recipe.image_variants, self.context.get('request'))
+
     def _get_or_create_tags(self, tags, recipe):
         """Handle getting or creating tags"""
-        auth_user = self.context['request'].user
         if not tags:
             return
-        for tag in tags:
-            tag_obj, _ = Tag.objects.get_or_create(user=auth_user, **tag)
-            recipe.tags.add(tag_obj)
+        auth_user = self.context['request'].user
+        tag_ids = resolve_names(Tag, auth_user, [tag['name'] for tag in tags])
+        recipe.tags.add(*tag_ids.values())
 
 
     def _get_or_create_ingredients(self, ingredients, recipe):
@@ -82,9 +146,22 @@ class RecipeSerializer(serializers.ModelSerializer):
         if not ingredients:
             return
         auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient_obj, _=Ingredient.objects.get_or_create(user=auth_user, **ingredient)
-            recipe.ingredients.add(ingredient_obj)
+        ingredient_ids = resolve_names(
+            Ingredient, auth_user, [ingredient['name'] for ingredient in ingredients]
+        )
+        recipe.ingredients.add(*ingredient_ids.values())
+
+    def _sync_related(self, manager, model, items):
+        """Make a tag/ingredient relation match items with minimal writes"""
+        auth_user = self.context['request'].user
+        wanted = set(
+            resolve_names(model, auth_user, [item['name'] for item in items]).values()
+        )
+        current = set(manager.values_list('id', flat=True))
+        if current - wanted:
+            manager.remove(*(current - wanted))
+        if wanted - current:
+            manager.add(*(wanted - current))
 
     def create(self, validated_data):
         """Create a recipe with associated tags"""
@@ -93,6 +170,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(**validated_data)
         self._get_or_create_tags(tags,recipe)
         self._get_or_create_ingredients(ingredients,recipe)
+        if recipe.image1:
+            schedule_image_variants(recipe.pk)
         return recipe
 
     def update(self, instance, validated_data):
@@ -100,17 +179,24 @@ class RecipeSerializer(serializers.ModelSerializer):
         tags = validated_data.pop('tags', None)
         ingredients=validated_data.pop('ingredients',None)
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
-        if Ingredient is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients,instance)
+            self._sync_related(instance.tags, Tag, tags)
+        if ingredients is not None:
+            self._sync_related(instance.ingredients, Ingredient, ingredients)
+            # The m2m signal updated the count in the database; the save
+            # below must not write the stale value back.
+            instance.refresh_from_db(fields=['ingredient_count'])
 
         # Use Django's update method for efficiency
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
 
+        replaced_variants = instance.image_variants
+        new_image = 'image1' in validated_data
+        if new_image:
+            instance.image_variants = None
         instance.save()
+        if new_image:
+            schedule_image_variants(instance.pk, replaced=replaced_variants)
         return instance
 
 
@@ -123,3 +209,22 @@ class RecipeDetailSerializer(RecipeSerializer):
     class Meta(RecipeSerializer.Meta):
         fields=RecipeSerializer.Meta.fields+ ['description']
 
+
+class RecipeImportSerializer(serializers.ModelSerializer):
+    """Validates one row of a bulk import (recipe.importer).
+
+    Tags and ingredients are plain lists of names; the importer creates the
+    rows itself, so this serializer is never saved.
+    """
+
+    tags = serializers.ListField(
+        child=serializers.CharField(max_length=255), required=False,
+    )
+    ingredients = serializers.ListField(
+        child=serializers.CharField(max_length=255), required=False,
+    )
+
+    class Meta:
+        model = Recipe
+        fields = ['title', 'description', 'time_minutes', 'price', 'link', 'tags', 'ingredients']
+
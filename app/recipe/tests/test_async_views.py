@@ -0,0 +1,132 @@
+"""
+Tests for the async read endpoints
+"""
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipe.tests.test_recipe_api import create_user, create_recipe, detail_url
+
+
+RECIPES_URL = reverse('filter_recipes')
+ASYNC_RECIPES_URL = reverse('async-filter-recipes')
+ASYNC_TAGS_URL = reverse('async-tag-list')
+ASYNC_INGREDIENTS_URL = reverse('async-ingredient-list')
+
+
+def async_detail_url(recipe_id):
+    """Return the async detail url for a recipe"""
+    return reverse('async-recipe-detail', args=[recipe_id])
+
+
+class AsyncReadViewTests(TestCase):
+    """Test the async views answer like the sync ones"""
+
+    def setUp(self):
+        caches['api'].clear()
+        self.user = create_user()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_requires_token(self):
+        """Test unauthenticated requests are rejected like the sync views"""
+        res = APIClient().get(ASYNC_RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res['WWW-Authenticate'], 'Token')
+
+    def test_invalid_token(self):
+        """Test an unknown token is rejected"""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token nope')
+
+        res = client.get(ASYNC_TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_writes_not_allowed(self):
+        """Test the async endpoints are read only"""
+        res = self.client.post(ASYNC_TAGS_URL, {'name': 'vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_recipe_list_matches_sync(self):
+        """Test the filtered recipe list has the sync response body"""
+        create_recipe(self.user, tags=['vegan'], ingredients=['tofu'], title='A')
+        create_recipe(self.user, tags=['quick'], title='B')
+        create_recipe(create_user('other@example.com'), tags=['vegan'])
+        params = {'tags': 'vegan,quick', 'match': 'any'}
+
+        sync_res = self.client.get(RECIPES_URL, params)
+        caches['api'].clear()
+        res = self.client.get(ASYNC_RECIPES_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(res.content, sync_res.content)
+        self.assertEqual(len(res.json()), 2)
+
+    def test_recipe_list_pagination(self):
+        """Test keyset pagination works on the async list"""
+        for title in 'ABC':
+            create_recipe(self.user, title=title)
+
+        res = self.client.get(ASYNC_RECIPES_URL, {'page_size': 2})
+        body = res.json()
+        self.assertEqual([r['title'] for r in body['results']], ['A', 'B'])
+        self.assertIn('/api/async/recipe/recipes/', body['next'])
+
+        res = self.client.get(body['next'])
+        body = res.json()
+        self.assertEqual([r['title'] for r in body['results']], ['C'])
+        self.assertIsNone(body['next'])
+
+    def test_invalid_parameters(self):
+        """Test filter and cursor errors use the sync error responses"""
+        res = self.client.get(ASYNC_RECIPES_URL, {'match': 'some'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(ASYNC_TAGS_URL, {'cursor': '!!'})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(res.json(), {'detail': 'Invalid cursor'})
+
+    def test_recipe_detail(self):
+        """Test the detail view returns the sync body and hides other users"""
+        recipe = create_recipe(self.user, tags=['vegan'], description='Soup')
+        other = create_recipe(create_user('other@example.com'))
+
+        res = self.client.get(async_detail_url(recipe.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.content, self.client.get(detail_url(recipe.id)).content)
+
+        res = self.client.get(async_detail_url(other.id))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cache_and_validators(self):
+        """Test async responses are cached and carry the sync validators"""
+        create_recipe(self.user, tags=['vegan'], ingredients=['tofu'])
+        sync_res = self.client.get(reverse('ingredient_list'))
+
+        res = self.client.get(ASYNC_INGREDIENTS_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        res = self.client.get(ASYNC_INGREDIENTS_URL)
+        self.assertEqual(res['X-Cache'], 'HIT')
+        self.assertEqual(res['ETag'], sync_res['ETag'])
+        self.assertEqual(res.json(), [{'id': sync_res.json()[0]['id'], 'name': 'tofu'}])
+
+        res = self.client.get(ASYNC_INGREDIENTS_URL, HTTP_IF_NONE_MATCH=sync_res['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_async_client(self):
+        """Test the views run natively on the async request path"""
+        res = await self.async_client.get(
+            ASYNC_TAGS_URL, headers={'Authorization': f'Token {self.token.key}'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), [])
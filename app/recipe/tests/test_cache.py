@@ -0,0 +1,109 @@
+"""
+Tests for the per-user response cache
+"""
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag
+from core.signals import notify_user_data_changed
+from recipe import cache
+from recipe.tests.test_recipe_api import create_user, create_recipe
+
+
+RECIPES_URL = reverse('filter_recipes')
+TAGS_URL = reverse('tag-list')
+
+
+class ResponseCacheTests(TestCase):
+    """Test caching of list responses"""
+
+    def setUp(self):
+        caches[cache.CACHE_ALIAS].clear()
+        cache.stats.reset()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, url, params=None):
+        res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res
+
+    def test_repeated_request_is_hit(self):
+        """Test the second identical request is served from cache"""
+        create_recipe(self.user, tags=['vegan'])
+
+        first = self.get(RECIPES_URL, {'tags': 'vegan'})
+        with self.assertNumQueries(1):
+            second = self.get(RECIPES_URL, {'tags': 'vegan'})
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.data, second.data)
+        self.assertEqual((cache.stats.hits, cache.stats.misses), (1, 1))
+
+    def test_equivalent_queries_share_entry(self):
+        """Test name order and spacing do not change the key"""
+        self.get(RECIPES_URL, {'tags': 'a,b'})
+        res = self.get(RECIPES_URL, {'tags': 'b, a'})
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+
+    def test_entries_are_per_user(self):
+        """Test another user never sees a cached response"""
+        create_recipe(self.user)
+        self.get(RECIPES_URL)
+        self.client.force_authenticate(create_user('other@example.com'))
+
+        res = self.get(RECIPES_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data, [])
+
+    def test_invalidated_by_relation_change(self):
+        """Test adding a tag through the M2M table refreshes the list"""
+        recipe = create_recipe(self.user)
+        self.get(RECIPES_URL, {'tags': 'vegan'})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.tags.add(Tag.objects.create(user=self.user, name='vegan'))
+        res = self.get(RECIPES_URL, {'tags': 'vegan'})
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.data), 1)
+
+    def test_invalidated_by_tag_rename(self):
+        """Test renaming a tag refreshes the tag list"""
+        tag = Tag.objects.create(user=self.user, name='old')
+        self.get(TAGS_URL)
+
+        tag.name = 'new'
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.save()
+        res = self.get(TAGS_URL)
+
+        self.assertEqual(res.data[0]['name'], 'new')
+
+    def test_explicit_hook_invalidates(self):
+        """Test notify_user_data_changed drops cached entries"""
+        self.get(TAGS_URL)
+        Tag.objects.bulk_create([Tag(user=self.user, name='bulk')])
+        with self.captureOnCommitCallbacks(execute=True):
+            notify_user_data_changed(self.user.id)
+
+        res = self.get(TAGS_URL)
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_other_users_writes_keep_entry(self):
+        """Test writes by someone else do not invalidate"""
+        self.get(TAGS_URL)
+        Tag.objects.create(user=create_user('other@example.com'), name='x')
+
+        res = self.get(TAGS_URL)
+
+        self.assertEqual(res['X-Cache'], 'HIT')
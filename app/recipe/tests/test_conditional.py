@@ -0,0 +1,93 @@
+"""
+Tests for conditional GET handling
+"""
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag
+from recipe.tests.test_recipe_api import create_user, create_recipe, detail_url
+
+
+RECIPES_URL = reverse('filter_recipes')
+TAGS_URL = reverse('tag-list')
+
+
+class ConditionalGetTests(TestCase):
+    """Test ETag and Last-Modified validators"""
+
+    def setUp(self):
+        caches['api'].clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # The data stamp is set when the write commits.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe = create_recipe(self.user, tags=['vegan'])
+
+    def test_validators_present(self):
+        """Test responses carry ETag and Last-Modified"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['ETag'])
+        self.assertTrue(res['Last-Modified'])
+        self.assertIn('private', res['Cache-Control'])
+
+    def test_if_none_match_returns_304(self):
+        """Test a matching ETag is answered before the view runs"""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(
+                detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=etag
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_if_modified_since_returns_304(self):
+        """Test an up to date Last-Modified is answered with 304"""
+        last_modified = self.client.get(TAGS_URL)['Last-Modified']
+
+        res = self.client.get(TAGS_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_write_changes_etag(self):
+        """Test a tag rename invalidates the recipe list ETag"""
+        etag = self.client.get(RECIPES_URL)['ETag']
+        tag = Tag.objects.get(name='vegan')
+        tag.name = 'plant'
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.save()
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['tags'][0]['name'], 'plant')
+
+    def test_etag_differs_between_resources(self):
+        """Test different queries do not share an ETag"""
+        first = self.client.get(RECIPES_URL, {'tags': 'vegan'})['ETag']
+        second = self.client.get(RECIPES_URL, {'tags': 'quick'})['ETag']
+
+        self.assertNotEqual(first, second)
+
+    # The browsable API links static files, which have no manifest in tests.
+    @override_settings(
+        STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage'
+    )
+    def test_etag_differs_between_renderers(self):
+        """Test the JSON and browsable API renderings do not share an ETag"""
+        json_etag = self.client.get(RECIPES_URL)['ETag']
+        html = self.client.get(RECIPES_URL, HTTP_ACCEPT='text/html')
+        indented = self.client.get(RECIPES_URL, HTTP_ACCEPT='application/json; indent=4')
+
+        self.assertEqual(html['Content-Type'], 'text/html; charset=utf-8')
+        self.assertEqual(len({json_etag, html['ETag'], indented['ETag']}), 3)
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT='text/html', HTTP_IF_NONE_MATCH=json_etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,105 @@
+"""
+Tests for the streaming recipe export
+"""
+import csv
+import io
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe import export
+from recipe.tests.test_recipe_api import create_user, create_recipe
+
+
+EXPORT_URL = reverse('recipe-export')
+
+
+class ExportTests(TestCase):
+    """Test exporting a user's recipes"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def download(self, **params):
+        res = self.client.get(EXPORT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        return b''.join(res.streaming_content).decode()
+
+    def test_jsonl_export(self):
+        """Test each recipe is a JSON object on its own line"""
+        first = create_recipe(self.user, tags=['vegan'], ingredients=['tomato'])
+        second = create_recipe(self.user, title='Soup', description='Hot\nsoup')
+        create_recipe(create_user('other@example.com'))
+
+        lines = self.download().splitlines()
+
+        records = [json.loads(line) for line in lines]
+        self.assertEqual([record['id'] for record in records], [first.id, second.id])
+        self.assertEqual(records[0]['tags'][0]['name'], 'vegan')
+        self.assertEqual(records[0]['price'], '5.25')
+        self.assertEqual(records[1]['description'], 'Hot\nsoup')
+
+    def test_csv_export(self):
+        """Test the csv export has a header and one row per recipe"""
+        create_recipe(self.user, title='Chili, hot', tags=['spicy', 'quick'])
+
+        res = self.client.get(EXPORT_URL, {'type': 'csv'})
+        rows = list(csv.DictReader(io.StringIO(b''.join(res.streaming_content).decode())))
+
+        self.assertTrue(res['Content-Type'].startswith('text/csv'))
+        self.assertIn('.csv"', res['Content-Disposition'])
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'Chili, hot')
+        self.assertEqual(json.loads(rows[0]['tags']), ['spicy', 'quick'])
+        self.assertEqual(Decimal(rows[0]['price']), Decimal('5.25'))
+
+    def test_invalid_type(self):
+        """Test an unknown type is rejected"""
+        res = self.client.get(EXPORT_URL, {'type': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_queries_per_chunk(self):
+        """Test tags and ingredients are prefetched once per chunk"""
+        for n in range(5):
+            create_recipe(self.user, title=f'Recipe {n}', tags=['vegan'], ingredients=['salt'])
+
+        res = self.client.get(EXPORT_URL)
+        with CaptureQueriesContext(connection) as queries:
+            lines = b''.join(res.streaming_content).splitlines()
+
+        self.assertEqual(len(lines), 5)
+        # A recipe read per chunk of 2 plus a tag and an ingredient prefetch.
+        self.assertLessEqual(len(queries), 3 * 3)
+
+    def test_keyset_reads_without_server_side_cursors(self):
+        """Test the id range fallback returns every recipe in order"""
+        ids = [create_recipe(self.user, title=f'Recipe {n}').id for n in range(5)]
+        recipes = Recipe.objects.filter(user=self.user).with_related().order_by('id')
+
+        with patch.dict(connection.settings_dict, DISABLE_SERVER_SIDE_CURSORS=True):
+            with CaptureQueriesContext(connection) as queries:
+                exported = [recipe.id for recipe in export.iter_recipes(recipes, 2)]
+
+        self.assertEqual(exported, ids)
+        # Three chunks and the empty read that ends the loop, no relations.
+        self.assertEqual(len(queries), 4 + 3 * 2)
+
+    def test_export_requires_auth(self):
+        """Test anonymous users cannot export"""
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,115 @@
+"""
+Tests for ?fields= / ?omit= on the recipe, tag and ingredient views
+"""
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipe.tests.test_recipe_api import create_user, create_recipe, detail_url
+
+
+RECIPES_URL = reverse('filter_recipes')
+SEARCH_URL = reverse('recipe-search')
+TAGS_URL = reverse('tag-list')
+ASYNC_RECIPES_URL = reverse('async-filter-recipes')
+
+
+class FieldsetTests(TestCase):
+    """Test sparse fieldsets"""
+
+    def setUp(self):
+        caches['api'].clear()
+        self.user = create_user()
+        self.recipe = create_recipe(
+            self.user, title='Tomato soup', description='Long text',
+            tags=['vegan'], ingredients=['tomato'],
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_fields_trim_output_and_queries(self):
+        """Test only the listed fields are returned and loaded"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title,image1'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data, [{'id': self.recipe.id, 'title': 'Tomato soup', 'image1': None}],
+        )
+        # Data version and recipes; no tag or ingredient queries.
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('description', queries[-1]['sql'])
+
+    def test_omit(self):
+        """Test omitted fields are left out and the order is kept"""
+        res = self.client.get(RECIPES_URL, {'omit': 'description,ingredients'})
+
+        self.assertEqual(
+            list(res.data[0]),
+            ['id', 'title', 'time_minutes', 'price', 'link', 'tags', 'image1', 'image_variants'],
+        )
+
+    def test_unknown_field(self):
+        """Test unknown field names are rejected"""
+        res = self.client.get(RECIPES_URL, {'fields': 'id,secret'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('secret', str(res.data['fields']))
+
+    def test_paginated(self):
+        """Test fields apply to pages and the cursor still works without id"""
+        create_recipe(self.user, title='Second')
+
+        res = self.client.get(RECIPES_URL, {'fields': 'title', 'page_size': 1})
+        following = self.client.get(res.data['next'])
+
+        self.assertEqual(res.data['results'], [{'title': 'Tomato soup'}])
+        self.assertEqual(following.data['results'], [{'title': 'Second'}])
+
+    def test_detail(self):
+        """Test the detail view skips relations that are not requested"""
+        with self.assertNumQueries(2):
+            res = self.client.get(detail_url(self.recipe.id), {'fields': 'title,description'})
+
+        self.assertEqual(res.data, {'title': 'Tomato soup', 'description': 'Long text'})
+
+    def test_search(self):
+        """Test search results honour the fields"""
+        res = self.client.get(SEARCH_URL, {'q': 'tomato', 'fields': 'id,tags'})
+
+        self.assertEqual(
+            res.data['results'],
+            [{'id': self.recipe.id, 'tags': [{'id': self.recipe.tags.get().id, 'name': 'vegan'}]}],
+        )
+
+    def test_tags(self):
+        """Test the tag list returns only the names"""
+        res = self.client.get(TAGS_URL, {'fields': 'name'})
+
+        self.assertEqual(res.data, [{'name': 'vegan'}])
+
+    def test_different_fields_cached_separately(self):
+        """Test cached responses are not shared between fieldsets"""
+        self.client.get(RECIPES_URL, {'fields': 'id'})
+
+        res = self.client.get(RECIPES_URL, {'fields': 'title'})
+
+        self.assertEqual(res.data, [{'title': 'Tomato soup'}])
+
+    def test_async_fields(self):
+        """Test the async list supports fields too"""
+        token = Token.objects.create(user=self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        res = client.get(ASYNC_RECIPES_URL, {'omit': 'tags,ingredients,description'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('tags', res.json()[0])
+        self.assertEqual(res.json()[0]['title'], 'Tomato soup')
@@ -0,0 +1,89 @@
+"""
+Tests for filtering recipes by tags and ingredients
+"""
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipe.filters import RecipeFilter, MATCH_ALL
+from core.models import Recipe
+from recipe.tests.test_recipe_api import create_user, create_recipe
+
+
+RECIPES_URL = reverse('filter_recipes')
+
+
+class RecipeFilterTests(TestCase):
+    """Test the recipe filter engine"""
+
+    def setUp(self):
+        caches['api'].clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.curry = create_recipe(
+            self.user, title='Curry', tags=['vegan', 'spicy'],
+            ingredients=['rice', 'chili'],
+        )
+        self.salad = create_recipe(
+            self.user, title='Salad', tags=['vegan'], ingredients=['lettuce'],
+        )
+        self.steak = create_recipe(
+            self.user, title='Steak', tags=['spicy'], ingredients=['beef', 'chili'],
+        )
+
+    def titles(self, params):
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['title'] for recipe in res.data]
+
+    def test_match_any_tags(self):
+        """Test recipes with any of the tags are returned once each"""
+        self.assertEqual(
+            self.titles({'tags': 'vegan,spicy'}), ['Curry', 'Salad', 'Steak']
+        )
+
+    def test_match_all_tags(self):
+        """Test match=all requires every tag"""
+        self.assertEqual(
+            self.titles({'tags': 'vegan,spicy', 'match': 'all'}), ['Curry']
+        )
+
+    def test_tags_and_ingredients_combined(self):
+        """Test tag and ingredient filters must both hold"""
+        self.assertEqual(
+            self.titles({'tags': 'spicy', 'ingredients': 'rice'}), ['Curry']
+        )
+
+    def test_match_all_unknown_name(self):
+        """Test match=all with a name the user lacks returns nothing"""
+        self.assertEqual(
+            self.titles({'ingredients': 'chili,saffron', 'match': 'all'}), []
+        )
+
+    def test_other_users_names_ignored(self):
+        """Test names are resolved among the requesting user's rows only"""
+        other = create_user(email='other@example.com')
+        create_recipe(other, title='Other', tags=['vegan'])
+
+        self.assertEqual(self.titles({'tags': 'vegan'}), ['Curry', 'Salad'])
+
+    def test_invalid_match(self):
+        """Test an unknown match mode is rejected"""
+        res = self.client.get(RECIPES_URL, {'tags': 'vegan', 'match': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_compiled_sql_has_no_distinct(self):
+        """Test filters compile to semi-joins rather than DISTINCT joins"""
+        recipe_filter = RecipeFilter(
+            self.user, tags=['vegan'], ingredients=['rice', 'chili'],
+            match=MATCH_ALL,
+        )
+        sql = str(recipe_filter.apply(Recipe.objects.all()).query).upper()
+
+        self.assertNotIn('DISTINCT', sql)
+        self.assertIn('HAVING', sql)
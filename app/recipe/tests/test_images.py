@@ -0,0 +1,127 @@
+"""
+Tests for recipe image uploads and variant generation
+"""
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe.tests.test_recipe_api import create_user, create_recipe
+
+
+def upload_url(recipe_id):
+    return reverse('upload_recipe_photos', args=[recipe_id])
+
+
+def make_image(size=(1600, 1200), exif=True):
+    """Return an in-memory JPEG upload, optionally carrying EXIF data"""
+    image = Image.new('RGB', size, color=(200, 30, 30))
+    data = Image.Exif()
+    data[0x010F] = 'CameraMaker'
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', exif=data.tobytes() if exif else b'')
+    buffer.seek(0)
+    buffer.name = 'photo.jpg'
+    return buffer
+
+
+@override_settings(IMAGE_PROCESSING_WORKERS=0)
+class ImageUploadTests(TestCase):
+    """Test uploading images to a recipe"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(self.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def upload(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.patch(
+                upload_url(self.recipe.id), {'image1': make_image()}, format='multipart'
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        return res
+
+    def test_upload_generates_variants(self):
+        """Test resized WebP and JPEG variants are written"""
+        self.upload()
+
+        variants = self.recipe.image_variants
+        self.assertEqual(set(variants), {'thumbnail', 'medium'})
+        with default_storage.open(variants['thumbnail']['webp']) as f:
+            image = Image.open(f)
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(max(image.size), 200)
+        with default_storage.open(variants['medium']['jpeg']) as f:
+            image = Image.open(f)
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(max(image.size), 800)
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_variant_urls_exposed(self):
+        """Test the detail view returns variant URLs"""
+        self.upload()
+
+        res = self.client.get(reverse('recipe-detail', args=[self.recipe.id]))
+
+        url = res.data['image_variants']['thumbnail']['webp']
+        self.assertTrue(url.startswith('/media/recipes/'))
+        self.assertTrue(url.endswith('.webp'))
+
+    def test_variants_pending_until_processed(self):
+        """Test the upload response does not wait for processing"""
+        res = self.client.patch(
+            upload_url(self.recipe.id), {'image1': make_image()}, format='multipart'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data['image_variants'])
+
+    def test_reupload_replaces_old_variants(self):
+        """Test variants of a replaced image are deleted"""
+        self.upload()
+        old = self.recipe.image_variants['thumbnail']['jpeg']
+
+        self.upload()
+
+        self.assertFalse(default_storage.exists(old))
+
+    def test_other_users_recipe_rejected(self):
+        """Test uploading to someone else's recipe returns 404"""
+        other = create_recipe(create_user('other@example.com'))
+
+        res = self.client.patch(
+            upload_url(other.id), {'image1': make_image()}, format='multipart'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_command_fills_missing_variants(self):
+        """Test generate_image_variants processes pending recipes"""
+        self.client.patch(
+            upload_url(self.recipe.id), {'image1': make_image()}, format='multipart'
+        )
+
+        call_command('generate_image_variants', stdout=StringIO())
+
+        self.recipe.refresh_from_db()
+        self.assertIsNotNone(self.recipe.image_variants)
+        self.assertEqual(Recipe.objects.filter(image_variants__isnull=True).count(), 0)
@@ -0,0 +1,218 @@
+"""
+Tests for the bulk recipe import
+"""
+import io
+import json
+from unittest.mock import patch
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DataError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe import importer
+from recipe.tests.test_recipe_api import create_user, create_recipe
+
+
+IMPORT_URL = reverse('recipe-import')
+EXPORT_URL = reverse('recipe-export')
+
+
+def jsonl(*rows):
+    return '\n'.join(json.dumps(row) for row in rows).encode()
+
+
+class ImportApiTests(TestCase):
+    """Test importing recipes through the api"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, content, name='recipes.jsonl', import_type=None):
+        url = IMPORT_URL if import_type is None else f'{IMPORT_URL}?type={import_type}'
+        file = SimpleUploadedFile(name, content)
+        return self.client.post(url, {'file': file}, format='multipart')
+
+    def test_import_jsonl(self):
+        """Test recipes are created with their tags and ingredients"""
+        Tag.objects.create(user=self.user, name='vegan')
+        content = jsonl(
+            {'title': 'Soup', 'time_minutes': 20, 'price': '4.50',
+             'tags': ['vegan', 'quick'], 'ingredients': ['tomato']},
+            {'title': 'Salad', 'time_minutes': 5, 'price': 3, 'tags': ['vegan']},
+        )
+
+        res = self.upload(content)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'created': 2, 'failed': 0, 'errors': []})
+        soup = Recipe.objects.get(user=self.user, title='Soup')
+        self.assertEqual(sorted(tag.name for tag in soup.tags.all()), ['quick', 'vegan'])
+        self.assertEqual([i.name for i in soup.ingredients.all()], ['tomato'])
+        self.assertEqual(Tag.objects.filter(user=self.user, name='vegan').count(), 1)
+
+    def test_invalid_rows_reported(self):
+        """Test bad rows are listed by number and the others still created"""
+        content = b'\n'.join([
+            jsonl({'title': 'Good', 'time_minutes': 10, 'price': '1.00'}),
+            b'{not json',
+            jsonl({'title': 'No price', 'time_minutes': 10}),
+            jsonl({'title': 'Too expensive', 'time_minutes': 10, 'price': '123456'}),
+        ])
+
+        res = self.upload(content)
+
+        self.assertEqual(res.data['created'], 1)
+        self.assertEqual(res.data['failed'], 3)
+        self.assertEqual([error['row'] for error in res.data['errors']], [2, 3, 4])
+        self.assertIn('price', res.data['errors'][1]['errors'])
+
+    def test_import_csv(self):
+        """Test a csv file with | separated names"""
+        content = (
+            'title,time_minutes,price,tags,ingredients\n'
+            '"Chili, hot",30,7.25,spicy|quick,beans\n'
+        ).encode()
+
+        res = self.upload(content, name='recipes.csv')
+
+        self.assertEqual(res.data['created'], 1)
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.title, 'Chili, hot')
+        self.assertEqual(sorted(tag.name for tag in recipe.tags.all()), ['quick', 'spicy'])
+
+    def test_import_csv_json_names(self):
+        """Test csv cells holding JSON arrays keep names with | and commas"""
+        content = (
+            'title,time_minutes,price,tags\n'
+            'Chili,30,7.25,"[""hot|cold"", ""a, b""]"\n'
+        ).encode()
+
+        res = self.upload(content, name='recipes.csv')
+
+        self.assertEqual(res.data['created'], 1)
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(sorted(tag.name for tag in recipe.tags.all()), ['a, b', 'hot|cold'])
+
+    def test_not_utf8(self):
+        """Test Latin-1 and UTF-16 files are reported, not a server error"""
+        latin1 = 'title,time_minutes,price\nCr\u00e8me br\u00fbl\u00e9e,30,4\n'.encode('latin-1')
+        utf16 = jsonl({'title': 'Soup', 'time_minutes': 20, 'price': 1}).decode().encode('utf-16')
+
+        for content, name in ((latin1, 'recipes.csv'), (utf16, 'recipes.jsonl')):
+            res = self.upload(content, name=name)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual((res.data['created'], res.data['failed']), (0, 1))
+            self.assertIn('UTF-8', res.data['errors'][0]['errors']['non_field_errors'][0])
+
+    def test_oversized_csv_field(self):
+        """Test reading stops at a field over the csv limit, keeping earlier rows"""
+        content = (
+            'title,time_minutes,price,description\n'
+            'Soup,20,4.50,Warm\n'
+            f'Stew,30,5.00,{"x" * 200000}\n'
+            'Salad,5,3.00,Cold\n'
+        ).encode()
+
+        res = self.upload(content, name='recipes.csv')
+
+        self.assertEqual((res.data['created'], res.data['failed']), (1, 1))
+        self.assertEqual(res.data['errors'][0]['row'], 2)
+        self.assertIn('field limit', res.data['errors'][0]['errors']['non_field_errors'][0])
+        self.assertEqual(list(Recipe.objects.values_list('title', flat=True)), ['Soup'])
+
+    def test_export_round_trip(self):
+        """Test an export imports back to the same recipes"""
+        create_recipe(self.user, title='Soup', tags=['vegan|raw'], ingredients=['salt'])
+        for export_type in ('jsonl', 'csv'):
+            export = self.client.get(EXPORT_URL, {'type': export_type})
+            content = b''.join(export.streaming_content)
+            other = create_user(f'{export_type}@example.com')
+            self.client.force_authenticate(other)
+
+            res = self.upload(content, import_type=export_type)
+
+            self.assertEqual(res.data['created'], 1)
+            recipe = Recipe.objects.get(user=other)
+            self.assertEqual(recipe.title, 'Soup')
+            self.assertEqual([tag.name for tag in recipe.tags.all()], ['vegan|raw'])
+            self.client.force_authenticate(self.user)
+
+    def test_import_changes_data_version(self):
+        """Test cached responses are invalidated by an import"""
+        before = self.client.get(reverse('filter_recipes'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload(jsonl({'title': 'Soup', 'time_minutes': 20, 'price': '4.50'}))
+
+        after = self.client.get(reverse('filter_recipes'))
+
+        self.assertNotEqual(before['ETag'], after['ETag'])
+        self.assertEqual(len(after.data), 1)
+
+    def test_missing_file(self):
+        """Test a request without a file is rejected"""
+        res = self.client.post(IMPORT_URL, {}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(IMPORT_MAX_UPLOAD_SIZE=100)
+    def test_upload_too_large(self):
+        """Test uploads over IMPORT_MAX_UPLOAD_SIZE are refused"""
+        res = self.upload(jsonl(*[{'title': 'Soup', 'time_minutes': 1, 'price': 1}] * 5))
+
+        self.assertEqual(res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertFalse(Recipe.objects.exists())
+
+
+class ImporterTests(TestCase):
+    """Test the batching of recipe.importer"""
+
+    def test_queries_per_batch(self):
+        """Test each batch is written with a constant number of queries"""
+        user = create_user()
+        rows = importer.read_rows(io.BytesIO(jsonl(*[
+            {'title': f'Recipe {n}', 'time_minutes': 5, 'price': '1.00',
+             'tags': [f'tag {n % 3}'], 'ingredients': ['salt']}
+            for n in range(10)
+        ])), 'jsonl')
+
+        # Per batch: a savepoint pair, the recipes and 2 x (lookup, links);
+        # the first batch also inserts and re-reads the names. The user is
+        # stamped once, on commit.
+        with self.assertNumQueries(2 * 7 + 2 * 2 + 1):
+            with self.captureOnCommitCallbacks(execute=True):
+                result = importer.import_recipes(user, rows, batch_size=5)
+
+        self.assertEqual(result.created, 10)
+        self.assertEqual(Recipe.objects.filter(user=user, tags__name='tag 0').count(), 4)
+
+    def test_database_error_reported_per_row(self):
+        """Test a row the database rejects fails alone, not the import"""
+        user = create_user()
+        rows = importer.read_rows(io.BytesIO(jsonl(*[
+            {'title': title, 'time_minutes': 5, 'price': '1.00', 'tags': ['x']}
+            for title in ('First', 'Broken', 'Last')
+        ])), 'jsonl')
+        link = importer._link
+
+        def link_or_fail(user, recipes, batch, *args):
+            if any(data['title'] == 'Broken' for data in batch):
+                raise DataError('invalid byte sequence')
+            return link(user, recipes, batch, *args)
+
+        with patch.object(importer, '_link', link_or_fail):
+            result = importer.import_recipes(user, rows)
+
+        self.assertEqual((result.created, result.failed), (2, 1))
+        self.assertEqual(result.errors[0]['row'], 2)
+        self.assertEqual(
+            sorted(Recipe.objects.filter(user=user).values_list('title', flat=True)),
+            ['First', 'Last'],
+        )
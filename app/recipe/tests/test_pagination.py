@@ -0,0 +1,106 @@
+"""
+Tests for keyset pagination of the list endpoints
+"""
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import Recipe, Tag
+from recipe.pagination import KeysetPagination
+from recipe.tests.test_recipe_api import create_user, create_recipe
+
+
+RECIPES_URL = reverse('filter_recipes')
+TAGS_URL = reverse('tag-list')
+
+
+class KeysetPaginationTests(TestCase):
+    """Test paginated list responses"""
+
+    def setUp(self):
+        caches['api'].clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url, page_size):
+        """Follow next links and return every page"""
+        pages = []
+        res = self.client.get(url, {'page_size': page_size})
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append(res.data['results'])
+            if res.data['next'] is None:
+                return pages
+            res = self.client.get(res.data['next'])
+
+    def test_unpaginated_by_default(self):
+        """Test the full list is returned without pagination params"""
+        create_recipe(self.user)
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(res.data, list)
+
+    def test_recipes_paginated_by_id(self):
+        """Test recipes are paged in id order without gaps"""
+        recipes = [create_recipe(self.user, title=f'r{i}') for i in range(5)]
+
+        pages = self.walk(RECIPES_URL, page_size=2)
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        ids = [item['id'] for page in pages for item in page]
+        self.assertEqual(ids, [recipe.id for recipe in recipes])
+
+    def test_tags_paginated_by_name(self):
+        """Test tags are paged in name order"""
+        for name in ['d', 'b', 'a', 'e', 'c']:
+            Tag.objects.create(user=self.user, name=name)
+
+        pages = self.walk(TAGS_URL, page_size=2)
+
+        names = [item['name'] for page in pages for item in page]
+        self.assertEqual(names, ['a', 'b', 'c', 'd', 'e'])
+
+    def test_composite_keys_page_through_ties(self):
+        """Test the id tie-breaker pages correctly through equal values"""
+        for title in ['b', 'a', 'b', 'c', 'b']:
+            create_recipe(self.user, title=title)
+        paginator = KeysetPagination(ordering=('title', 'id'))
+        request = Request(APIRequestFactory().get('/', {'page_size': 2}))
+
+        titles = []
+        while True:
+            page = paginator.paginate_queryset(Recipe.objects.all(), request)
+            titles += [recipe.title for recipe in page]
+            if paginator.next_position is None:
+                break
+            request = Request(APIRequestFactory().get(paginator.get_next_link()))
+
+        self.assertEqual(titles, ['a', 'b', 'b', 'b', 'c'])
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor is rejected"""
+        res = self.client.get(TAGS_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_forged_cursor_values(self):
+        """Test cursors with values of the wrong type are rejected"""
+        paginator = KeysetPagination(ordering=('id',))
+        forged = [
+            (RECIPES_URL, ['abc']),
+            (RECIPES_URL, [{'a': 1}]),
+            (RECIPES_URL, [None]),
+            (TAGS_URL, ['x', 'y']),
+            (TAGS_URL, [1, None]),
+        ]
+        for url, position in forged:
+            with self.subTest(url=url, position=position):
+                res = self.client.get(url, {'cursor': paginator.encode_cursor(position)})
+
+                self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,194 @@
+"""
+Tests for pantry matching and the ingredient counts behind it
+"""
+import io
+import json
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe
+from recipe import pantry
+from recipe.importer import import_recipes
+
+from recipe.tests.test_recipe_api import create_user, create_recipe, detail_url
+
+
+PANTRY_URL = reverse('recipe-pantry')
+
+
+class IngredientCountTests(TestCase):
+    """Test Recipe.ingredient_count follows the ingredients"""
+
+    def setUp(self):
+        self.user = create_user()
+
+    def assertCount(self, recipe, count):
+        recipe.refresh_from_db(fields=['ingredient_count'])
+        self.assertEqual(recipe.ingredient_count, count)
+
+    def test_add_remove_clear(self):
+        """Test linking and unlinking from the recipe side"""
+        recipe = create_recipe(self.user, ingredients=['tomato', 'basil'])
+        self.assertCount(recipe, 2)
+
+        recipe.ingredients.remove(Ingredient.objects.get(name='basil'))
+        self.assertCount(recipe, 1)
+
+        recipe.ingredients.clear()
+        self.assertCount(recipe, 0)
+
+    def test_reverse_side_and_delete(self):
+        """Test changes made from the ingredient side and deleting ingredients"""
+        first = create_recipe(self.user, ingredients=['tomato', 'salt'])
+        second = create_recipe(self.user, ingredients=['tomato'])
+        salt = Ingredient.objects.get(name='salt')
+
+        salt.recipe_set.add(second)
+        self.assertCount(second, 2)
+
+        salt.recipe_set.clear()
+        self.assertCount(first, 1)
+        self.assertCount(second, 1)
+
+        Ingredient.objects.get(name='tomato').delete()
+        self.assertCount(first, 0)
+        self.assertCount(second, 0)
+
+    def test_bulk_paths(self):
+        """Test the importer and seed_data set the count of raw inserted links"""
+        import_recipes(self.user, [(1, {
+            'title': 'Salsa', 'time_minutes': 5, 'price': '2.00',
+            'ingredients': ['tomato', 'onion', 'tomato'],
+        })])
+        call_command(
+            'seed_data', users=1, recipes=3, ingredients_per_recipe=4,
+            stdout=io.StringIO(),
+        )
+
+        self.assertEqual(Recipe.objects.get(title='Salsa').ingredient_count, 2)
+        seeded = Recipe.objects.exclude(user=self.user)
+        self.assertEqual(
+            [recipe.ingredient_count for recipe in seeded],
+            [recipe.ingredients.count() for recipe in seeded],
+        )
+
+
+class PantryApiTests(TestCase):
+    """Test the pantry endpoint"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.salad = create_recipe(
+            self.user, title='Salad', ingredients=['tomato', 'basil', 'olive oil', 'salt'],
+        )
+        self.bruschetta = create_recipe(
+            self.user, title='Bruschetta', ingredients=['tomato', 'basil', 'bread'],
+        )
+        self.stew = create_recipe(self.user, title='Stew', ingredients=['beef', 'carrot'])
+
+    def test_ranked_by_coverage(self):
+        """Test recipes come best covered first with their missing ingredients"""
+        res = self.client.get(PANTRY_URL, {
+            'ingredients': 'tomato,basil,salt', 'fields': 'id,title',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {
+                'recipe': {'id': self.salad.id, 'title': 'Salad'},
+                'coverage': 0.75, 'matched': 3, 'missing': ['olive oil'],
+            },
+            {
+                'recipe': {'id': self.bruschetta.id, 'title': 'Bruschetta'},
+                'coverage': 2 / 3, 'matched': 2, 'missing': ['bread'],
+            },
+        ])
+
+    def test_limit_and_max_missing(self):
+        """Test limit keeps the top recipes and max_missing drops the rest"""
+        top = self.client.get(PANTRY_URL, {'ingredients': 'tomato,basil', 'limit': 1})
+        close = self.client.get(PANTRY_URL, {'ingredients': 'tomato,basil', 'max_missing': 1})
+
+        self.assertEqual([row['recipe']['title'] for row in top.data], ['Bruschetta'])
+        self.assertEqual([row['recipe']['title'] for row in close.data], ['Bruschetta'])
+
+    def test_stale_count_ranked_last(self):
+        """Test a recipe with a zero ingredient count gets coverage 0, last"""
+        Recipe.objects.filter(pk=self.salad.pk).update(ingredient_count=0)
+
+        res = self.client.get(PANTRY_URL, {'ingredients': 'tomato,basil'})
+
+        self.assertEqual(
+            [(row['recipe']['title'], row['coverage']) for row in res.data],
+            [('Bruschetta', 2 / 3), ('Salad', 0.0)],
+        )
+
+    def test_recipe_deleted_after_matching(self):
+        """Test a matched recipe deleted before it is read is left out"""
+        match_recipes = pantry.match_recipes
+
+        def match_then_delete(*args, **kwargs):
+            matches = match_recipes(*args, **kwargs)
+            self.salad.delete()
+            return matches
+
+        with patch.object(pantry, 'match_recipes', match_then_delete):
+            res = self.client.get(PANTRY_URL, {'ingredients': 'tomato,basil'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['recipe']['title'] for row in res.data], ['Bruschetta'])
+
+    def test_edited_recipes(self):
+        """Test coverage follows ingredients replaced with PUT"""
+        self.client.put(detail_url(self.bruschetta.id), {
+            'title': 'Bruschetta', 'time_minutes': 10, 'price': '3.00',
+            'ingredients': [{'name': 'tomato'}, {'name': 'bread'}, {'name': 'garlic'},
+                            {'name': 'basil'}],
+        }, format='json')
+        self.client.put(detail_url(self.salad.id), {
+            'title': 'Tomato salad', 'time_minutes': 5, 'price': '2.00',
+            'ingredients': [{'name': 'tomato'}],
+        }, format='json')
+
+        res = self.client.get(PANTRY_URL, {'ingredients': 'tomato,basil'})
+
+        self.assertEqual(
+            [(row['recipe']['title'], row['coverage'], row['missing']) for row in res.data],
+            [('Tomato salad', 1.0, []), ('Bruschetta', 0.5, ['bread', 'garlic'])],
+        )
+
+    def test_other_users_ingredients_ignored(self):
+        """Test names are only looked up among the user's ingredients"""
+        create_recipe(create_user('other@example.com'), ingredients=['caviar'])
+
+        res = self.client.get(PANTRY_URL, {'ingredients': 'caviar'})
+
+        self.assertEqual(res.data, [])
+
+    def test_bad_parameters(self):
+        """Test missing ingredients and a malformed max_missing are rejected"""
+        missing = self.client.get(PANTRY_URL)
+        malformed = self.client.get(PANTRY_URL, {'ingredients': 'tomato', 'max_missing': 'x'})
+
+        self.assertEqual(missing.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(malformed.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_queries_do_not_grow_with_results(self):
+        """Test the response is built with a fixed number of queries"""
+        for i in range(5):
+            create_recipe(self.user, title=f'Soup {i}', ingredients=['tomato', 'water'])
+
+        # Data version, pantry ids, matches, recipes, their tags and
+        # ingredients, missing ingredients.
+        with self.assertNumQueries(7):
+            res = self.client.get(PANTRY_URL, {'ingredients': 'tomato'})
+
+        self.assertEqual(len(json.loads(res.content)), 7)
@@ -0,0 +1,192 @@
+"""
+Tests for the recipe API
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+RECIPES_URL = reverse('filter_recipes')
+CREATE_URL = reverse('recipe-list')
+
+
+def detail_url(recipe_id):
+    """Return the detail url for a recipe"""
+    return reverse('recipe-detail', args=[recipe_id])
+
+
+def create_user(email='user@example.com', password='testpass123'):
+    """Create and return a new user"""
+    return get_user_model().objects.create_user(email, password)
+
+
+def create_recipe(user, tags=(), ingredients=(), **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    recipe = Recipe.objects.create(user=user, **defaults)
+    for name in tags:
+        tag, _ = Tag.objects.get_or_create(user=user, name=name)
+        recipe.tags.add(tag)
+    for name in ingredients:
+        ingredient, _ = Ingredient.objects.get_or_create(user=user, name=name)
+        recipe.ingredients.add(ingredient)
+    return recipe
+
+
+class RecipeReadQueryTests(TestCase):
+    """Test the number of queries issued by recipe read views"""
+
+    def setUp(self):
+        caches['api'].clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_filter_recipes_constant_queries(self):
+        """Test listing recipes costs the same queries for any size"""
+        for i in range(20):
+            create_recipe(
+                self.user,
+                title=f'Recipe {i}',
+                tags=[f'tag{i}', 'shared'],
+                ingredients=[f'ingredient{i}', 'salt'],
+            )
+
+        # Cache version lookup, recipes, tags and ingredients.
+        with self.assertNumQueries(4):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 20)
+        self.assertEqual(
+            [tag['name'] for tag in res.data[0]['tags']],
+            ['tag0', 'shared'],
+        )
+
+    def test_recipe_detail_constant_queries(self):
+        """Test retrieving a recipe prefetches its relations"""
+        recipe = create_recipe(
+            self.user,
+            tags=['vegan', 'quick'],
+            ingredients=['tomato', 'onion', 'garlic'],
+        )
+
+        # Data version lookup, recipe, tags and ingredients.
+        with self.assertNumQueries(4):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['ingredients']), 3)
+
+
+class RecipeCreateTests(TestCase):
+    """Test creating recipes with tags and ingredients"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post_recipe(self, tag_count, ingredient_count):
+        payload = {
+            'title': 'Soup',
+            'time_minutes': 30,
+            'price': '4.50',
+            'tags': [{'name': f'tag{i}'} for i in range(tag_count)],
+            'ingredients': [
+                {'name': f'ingredient{i}'} for i in range(ingredient_count)
+            ],
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(CREATE_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return len(ctx.captured_queries)
+
+    def test_create_queries_independent_of_tag_count(self):
+        """Test create cost does not grow with tags and ingredients"""
+        small = self.post_recipe(tag_count=2, ingredient_count=2)
+        Recipe.objects.all().delete()
+        Tag.objects.all().delete()
+        Ingredient.objects.all().delete()
+        large = self.post_recipe(tag_count=30, ingredient_count=30)
+
+        self.assertEqual(small, large)
+
+    def test_create_reuses_existing_tags(self):
+        """Test existing tags are reused and duplicates collapsed"""
+        existing = Tag.objects.create(user=self.user, name='vegan')
+        other_user = create_user(email='other@example.com')
+        Tag.objects.create(user=other_user, name='quick')
+        payload = {
+            'title': 'Salad',
+            'time_minutes': 5,
+            'price': '3.00',
+            'tags': [{'name': 'vegan'}, {'name': 'quick'}, {'name': 'vegan'}],
+        }
+
+        res = self.client.post(CREATE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 2)
+        self.assertIn(existing, recipe.tags.all())
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+
+class RecipeUpdateTests(TestCase):
+    """Test updating recipe relations"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.payload = {'title': 'Stew', 'time_minutes': 60, 'price': '9.00'}
+
+    def test_update_only_touches_changed_tags(self):
+        """Test unchanged through rows survive an update"""
+        recipe = create_recipe(self.user, tags=['keep', 'drop'])
+        through = Recipe.tags.through
+        kept_row = through.objects.get(recipe=recipe, tag__name='keep')
+
+        payload = dict(self.payload, tags=[{'name': 'keep'}, {'name': 'new'}])
+        res = self.client.put(detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(recipe.tags.values_list('name', flat=True)), ['keep', 'new']
+        )
+        self.assertTrue(through.objects.filter(id=kept_row.id).exists())
+
+    def test_update_without_ingredients_keeps_them(self):
+        """Test omitted relations are left alone"""
+        recipe = create_recipe(self.user, ingredients=['flour', 'egg'])
+
+        res = self.client.put(detail_url(recipe.id), self.payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(recipe.ingredients.count(), 2)
+
+    def test_update_with_empty_tags_clears_them(self):
+        """Test an explicit empty list removes every tag"""
+        recipe = create_recipe(self.user, tags=['a', 'b'])
+
+        payload = dict(self.payload, tags=[])
+        res = self.client.put(detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(recipe.tags.count(), 0)
@@ -0,0 +1,74 @@
+"""
+Tests that the read fast path matches the serializers byte for byte
+"""
+from decimal import Decimal
+
+from django.test import RequestFactory, TestCase
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Recipe, Tag
+from core.renderers import FastJSONRenderer
+from recipe.representations import (
+    name_values, recipe_values, represent_names, represent_recipes,
+)
+from recipe.serializers import RecipeDetailSerializer, TagSerializer
+from recipe.tests.test_recipe_api import create_user, create_recipe
+
+
+class RepresentationTests(TestCase):
+    """Compare the fast path with the serializers it replaces"""
+
+    def setUp(self):
+        self.user = create_user()
+        create_recipe(
+            self.user, title='Crème brûlée   "quoted"', price=Decimal('12.5'),
+            tags=['dessert', 'french'], ingredients=['cream', 'sugar'],
+            description='Line one\nline two\té中',
+            link='https://example.com/a?b=c&d',
+        )
+        create_recipe(
+            self.user, title='Toast', price=Decimal('0'), image1='uploads/recipe/a.jpg',
+            image_variants={'thumbnail': {'webp': 'uploads/recipe/a-thumbnail.webp'}},
+            tags=['french'],
+        )
+        create_recipe(self.user, title='Plain', time_minutes=0)
+
+    def assertSameJSON(self, expected, actual):
+        self.assertEqual(FastJSONRenderer().render(actual), JSONRenderer().render(expected))
+
+    def test_recipes_match_serializer(self):
+        """Test the recipe dicts render to the serializer's bytes"""
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+
+        expected = RecipeDetailSerializer(recipes.with_related(), many=True).data
+        actual = represent_recipes(recipe_values(recipes))
+
+        self.assertSameJSON(expected, actual)
+
+    def test_recipes_match_serializer_with_request(self):
+        """Test absolute image urls match when a request is given"""
+        request = RequestFactory().get('/api/recipe/recipes/')
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+
+        expected = RecipeDetailSerializer(
+            recipes.with_related(), many=True, context={'request': request},
+        ).data
+        actual = represent_recipes(recipe_values(recipes), request)
+
+        self.assertSameJSON(expected, actual)
+        self.assertTrue(actual[1]['image1'].startswith('http://testserver/'))
+
+    def test_names_match_serializer(self):
+        """Test tag rows render to the serializer's bytes"""
+        tags = Tag.objects.filter(user=self.user).order_by('name', 'id')
+
+        self.assertSameJSON(
+            TagSerializer(tags, many=True).data, represent_names(name_values(tags)),
+        )
+
+    def test_queries(self):
+        """Test recipes, tags and ingredients are one query each"""
+        recipes = recipe_values(Recipe.objects.filter(user=self.user).order_by('id'))
+
+        with self.assertNumQueries(3):
+            represent_recipes(recipes)
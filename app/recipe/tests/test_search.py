@@ -0,0 +1,93 @@
+"""
+Tests for full-text recipe search
+"""
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipe import search
+from recipe.tests.test_recipe_api import create_user, create_recipe
+
+
+SEARCH_URL = reverse('recipe-search')
+
+
+class RecipeSearchTests(TestCase):
+    """Test searching recipes"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def titles(self, params):
+        res = self.client.get(SEARCH_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['title'] for recipe in res.data['results']]
+
+    def test_title_match_ranks_first(self):
+        """Test a title hit outranks a description hit"""
+        create_recipe(self.user, title='Pasta bake', description='With tomato')
+        create_recipe(self.user, title='Tomato soup', description='Warming')
+        create_recipe(self.user, title='Pancakes', description='Sweet')
+
+        self.assertEqual(self.titles({'q': 'tomato'}), ['Tomato soup', 'Pasta bake'])
+
+    def test_all_words_required(self):
+        """Test every word in the query has to match"""
+        create_recipe(self.user, title='Tomato soup')
+        create_recipe(self.user, title='Tomato salad')
+
+        self.assertEqual(self.titles({'q': 'tomato soup'}), ['Tomato soup'])
+
+    def test_index_follows_writes(self):
+        """Test updated and deleted recipes are reflected in results"""
+        recipe = create_recipe(self.user, title='Lentil stew')
+        recipe.title = 'Bean stew'
+        recipe.save()
+        create_recipe(self.user, title='Lentil curry').delete()
+
+        self.assertEqual(self.titles({'q': 'lentil'}), [])
+        self.assertEqual(self.titles({'q': 'bean'}), ['Bean stew'])
+
+    def test_other_users_recipes_excluded(self):
+        """Test only the requesting user's recipes are searched"""
+        create_recipe(create_user('other@example.com'), title='Tomato soup')
+
+        self.assertEqual(self.titles({'q': 'tomato'}), [])
+
+    def test_paginated(self):
+        """Test results are paged with a next cursor"""
+        for i in range(3):
+            create_recipe(self.user, title=f'Curry {i}')
+
+        res = self.client.get(SEARCH_URL, {'q': 'curry', 'page_size': 2})
+        self.assertEqual(len(res.data['results']), 2)
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertIsNone(res.data['next'])
+
+    def test_query_syntax_is_not_interpreted(self):
+        """Test punctuation in the query does not break the search"""
+        create_recipe(self.user, title='Mac and cheese')
+
+        self.assertEqual(self.titles({'q': '"cheese (*'}), ['Mac and cheese'])
+
+    def test_missing_query(self):
+        """Test the q parameter is required"""
+        res = self.client.get(SEARCH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_fallback_backend(self):
+        """Test the substring fallback used on other databases"""
+        create_recipe(self.user, title='Pasta bake', description='With tomato')
+        tomato = create_recipe(self.user, title='Tomato soup')
+
+        ids = search._fallback_search(self.user, 'tomato', limit=10, offset=0)
+
+        self.assertEqual(ids[0], tomato.id)
+        self.assertEqual(len(ids), 2)
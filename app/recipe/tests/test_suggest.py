@@ -0,0 +1,91 @@
+"""
+Tests for the tag and ingredient suggestion endpoints
+"""
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Tag
+from recipe import suggest
+
+from recipe.tests.test_recipe_api import create_user, create_recipe
+
+
+TAG_SUGGEST_URL = reverse('tag-suggest')
+INGREDIENT_SUGGEST_URL = reverse('ingredient-suggest')
+
+
+class SuggestTests(TestCase):
+    """Test prefix suggestions"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_ranked_by_usage(self):
+        """Test names starting with q come most used first"""
+        create_recipe(self.user, tags=['Vegetarian', 'Vegan'])
+        create_recipe(self.user, tags=['Vegan'])
+        Tag.objects.create(user=self.user, name='vegetables')
+        Tag.objects.create(user=self.user, name='Dessert')
+
+        res = self.client.get(TAG_SUGGEST_URL, {'q': 'veg'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(row['name'], row['recipe_count']) for row in res.data],
+            [('Vegan', 2), ('Vegetarian', 1), ('vegetables', 0)],
+        )
+
+    def test_limit_and_user(self):
+        """Test the limit is applied and other users' names are not offered"""
+        for name in ('tomato', 'tofu', 'tarragon'):
+            Ingredient.objects.create(user=self.user, name=name)
+        Ingredient.objects.create(user=create_user('other@example.com'), name='toast')
+
+        res = self.client.get(INGREDIENT_SUGGEST_URL, {'q': 'to', 'limit': 1})
+        capped = self.client.get(INGREDIENT_SUGGEST_URL, {'q': 'to', 'limit': 1000})
+
+        self.assertEqual([row['name'] for row in res.data], ['tofu'])
+        self.assertEqual([row['name'] for row in capped.data], ['tofu', 'tomato'])
+
+    def test_wildcards_are_literal(self):
+        """Test % and _ in q only match themselves"""
+        Tag.objects.create(user=self.user, name='100% rye')
+        Tag.objects.create(user=self.user, name='1000 islands')
+
+        res = self.client.get(TAG_SUGGEST_URL, {'q': '100%'})
+
+        self.assertEqual([row['name'] for row in res.data], ['100% rye'])
+
+    def test_q_required(self):
+        """Test a missing q is rejected"""
+        res = self.client.get(TAG_SUGGEST_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_etag(self):
+        """Test suggestions revalidate against the data version"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        res = self.client.get(TAG_SUGGEST_URL, {'q': 'v'})
+
+        again = self.client.get(TAG_SUGGEST_URL, {'q': 'v'}, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(again.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_prefix_index_used(self):
+        """Test the lookup is a range scan of the prefix index"""
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite query plan')
+        queryset = suggest.suggest_queryset(Tag, self.user, 'veg')
+        sql, params = queryset.query.sql_with_params()
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+
+        self.assertIn('core_tag_user_name_prefix_idx', plan)
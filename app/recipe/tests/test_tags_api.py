@@ -0,0 +1,59 @@
+"""
+Tests for the tag and ingredient APIs
+"""
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+from recipe.tests.test_recipe_api import create_user
+
+
+TAGS_URL = reverse('tag-list')
+INGREDIENTS_URL = reverse('ingredient_list')
+
+
+class UniqueNameTests(TestCase):
+    """Test tag and ingredient names are unique per user"""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_create_duplicate_tag_rejected(self):
+        """Test creating a tag with an existing name fails"""
+        Tag.objects.create(user=self.user, name='vegan')
+
+        res = self.client.post(TAGS_URL, {'name': 'vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_same_name_for_other_user_allowed(self):
+        """Test names only need to be unique for one user"""
+        Ingredient.objects.create(user=create_user('o@example.com'), name='salt')
+
+        res = self.client.post(INGREDIENTS_URL, {'name': 'salt'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_rename_to_existing_name_rejected(self):
+        """Test renaming an ingredient onto another one fails"""
+        Ingredient.objects.create(user=self.user, name='salt')
+        Ingredient.objects.create(user=self.user, name='pepper')
+        url = reverse('ingredient_detail', args=['pepper'])
+
+        res = self.client.patch(url, {'name': 'salt'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_missing_ingredient_returns_404(self):
+        """Test retrieving an unknown ingredient returns 404"""
+        url = reverse('ingredient_detail', args=['nothing'])
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
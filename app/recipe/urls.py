@@ -1,15 +1,21 @@
 from django.urls  import path,include
-from .views import recipe_detail,tag_list,tag_detail,ingredient_list,ingredient_detail,upload_recipe_photos_view,filter_recipes,create_recipe
+from .views import recipe_detail,tag_list,tag_detail,ingredient_list,ingredient_detail,upload_recipe_photos_view,filter_recipes,create_recipe,search_recipes,export_recipes,import_recipes,tag_suggest,ingredient_suggest,pantry_recipes
 
 urlpatterns=[
 
     path('recipes/',filter_recipes,name='filter_recipes'),
+    path('recipes/search/', search_recipes, name='recipe-search'),
+    path('recipes/pantry/', pantry_recipes, name='recipe-pantry'),
+    path('recipes/export/', export_recipes, name='recipe-export'),
+    path('recipes/import/', import_recipes, name='recipe-import'),
     path('recipe/',  create_recipe, name='recipe-list'),
     path('recipes/<int:pk>', recipe_detail, name= 'recipe-detail'),
     path('recipes/<int:recipe_id>/upload-photos/',upload_recipe_photos_view, name='upload_recipe_photos'),
     path('tags/', tag_list, name='tag-list'),
+    path('tags/suggest/', tag_suggest, name='tag-suggest'),
     path('tags/<str:name>',tag_detail,name='tag-detail'),
     path('ingredients/',ingredient_list, name= 'ingredient_list'),
+    path('ingredients/suggest/', ingredient_suggest, name='ingredient-suggest'),
     path('ingredients/<str:name>',ingredient_detail,name='ingredient_detail'),
 
 
@@ -4,12 +4,28 @@ from rest_framework.decorators import (
 from rest_framework.parsers import MultiPartParser,FormParser
 from rest_framework.response import Response
 from rest_framework import status,serializers
-from rest_framework.authentication import TokenAuthentication
+from user.authentication import CachedTokenAuthentication
 from rest_framework.permissions import IsAuthenticated
-from drf_spectacular.utils import extend_schema, OpenApiResponse,OpenApiParameter
+from drf_spectacular.utils import extend_schema, OpenApiResponse,OpenApiParameter,inline_serializer
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer,TagSerializer,IngredientSerializer
+from recipe.pagination import KeysetPagination, RankedPagination, PAGINATION_PARAMETERS, parse_limit
+from recipe import pantry, search, suggest
+from recipe.export import EXPORT_TYPES, export_lines
+from recipe.representations import (
+    NAME_FIELDS, RECIPE_FIELDS, name_values, recipe_values, represent_names, represent_recipes,
+)
+from recipe.fieldsets import FIELDSET_PARAMETERS, recipe_columns, recipe_relations, selected_fields
+from recipe import importer
+from recipe.importer import IMPORT_TYPES
+from recipe.cache import cache_response
+from recipe.conditional import conditional_on_data_version
+from recipe.filters import RecipeFilter, MATCH_CHOICES, parse_names
 from core.models import Recipe,Tag,Ingredient
 from django.shortcuts import get_object_or_404
+from django.http import StreamingHttpResponse
+from django.conf import settings
+from drf_spectacular.types import OpenApiTypes
+from datetime import date
 
 
 @extend_schema(
@@ -30,34 +46,238 @@ from django.shortcuts import get_object_or_404
             explode=False,
             required=False,
         ),
-    ]
+        OpenApiParameter(
+            name='match',
+            type=str,
+            location=OpenApiParameter.QUERY,
+            description=(
+                'Whether a recipe needs any (default) or all of the listed '
+                'tags, and any or all of the listed ingredients.'
+            ),
+            enum=list(MATCH_CHOICES),
+            required=False,
+        ),
+        *PAGINATION_PARAMETERS,
+        *FIELDSET_PARAMETERS,
+    ],
+    responses=RecipeDetailSerializer(many=True),
 )
 @api_view(['GET'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
+@conditional_on_data_version('filter_recipes')
+@cache_response('filter_recipes')
 def filter_recipes(request):
     """
     Filter recipes by a list of tags and/or ingredients.
     Example:
-    /api/recipes/filter/?tags=vegan,quick&ingredients=tomato,onion
+    /api/recipe/recipes/?tags=vegan,quick&ingredients=tomato,onion&match=all
     """
-    tags_param = request.GET.get('tags')
-    ingredients_param = request.GET.get('ingredients')
-    recipes = Recipe.objects.filter(user=request.user)
+    recipe_filter = RecipeFilter.from_query_params(request.user, request.query_params)
+    fields = selected_fields(request.query_params, RECIPE_FIELDS)
+    recipes = recipe_filter.apply(Recipe.objects.all())
+    # Same output as RecipeDetailSerializer(many=True), see recipe.representations.
+    recipes = recipe_values(recipes.order_by('id'), fields)
 
-    if tags_param:
-        tag_names = tags_param.split(',')
-        tags = Tag.objects.filter(name__in=tag_names)
-        recipes = recipes.filter(tags__in=tags)
+    paginator = KeysetPagination(ordering=('id',))
+    if paginator.is_requested(request):
+        page = paginator.paginate_queryset(recipes, request)
+        return paginator.get_paginated_response(represent_recipes(page, fields=fields))
 
-    if ingredients_param:
-        ingredient_names = ingredients_param.split(',')
-        ingredients = Ingredient.objects.filter(name__in=ingredient_names)
-        recipes = recipes.filter(ingredients__in=ingredients)
+    return Response(represent_recipes(recipes, fields=fields))
 
-    recipes = recipes.distinct()
-    serializer = RecipeDetailSerializer(recipes, many=True)
-    return Response(serializer.data)
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            name='q',
+            type=str,
+            location=OpenApiParameter.QUERY,
+            description='Words to look for in recipe titles and descriptions.',
+            required=True,
+        ),
+        *PAGINATION_PARAMETERS,
+        *FIELDSET_PARAMETERS,
+    ],
+    responses=RecipeDetailSerializer(many=True),
+)
+@api_view(['GET'])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+@conditional_on_data_version('search_recipes')
+def search_recipes(request):
+    """
+    Full-text search of the user's recipes, best matches first.
+    Example:
+    /api/recipe/recipes/search/?q=tomato soup
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'q': 'This parameter is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    fields = selected_fields(request.query_params, RECIPE_FIELDS)
+    recipes = Recipe.objects.only(*recipe_columns(fields)).with_related(recipe_relations(fields))
+    paginator = RankedPagination()
+    page = paginator.paginate(
+        request,
+        lambda limit, offset: search.search_recipes(request.user, query, limit, offset, recipes),
+    )
+    serializer = RecipeDetailSerializer(page, many=True, fields=fields)
+    return paginator.get_paginated_response(serializer.data)
+
+@extend_schema(
+    parameters=[*pantry.PANTRY_PARAMETERS, *FIELDSET_PARAMETERS],
+    responses=inline_serializer('PantryMatch', {
+        'recipe': RecipeDetailSerializer(),
+        'coverage': serializers.FloatField(),
+        'matched': serializers.IntegerField(),
+        'missing': serializers.ListField(child=serializers.CharField()),
+    }, many=True),
+)
+@api_view(['GET'])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+@conditional_on_data_version('pantry_recipes')
+def pantry_recipes(request):
+    """
+    Recipes you can cook with the given ingredients, best covered first,
+    each with the share of its ingredients you have and the ones missing.
+    Example:
+    /api/recipe/recipes/pantry/?ingredients=tomato,basil,garlic&max_missing=2
+    """
+    names = parse_names(request.query_params.get('ingredients'))
+    if not names:
+        return Response(
+            {'ingredients': 'This parameter is required.'}, status=status.HTTP_400_BAD_REQUEST,
+        )
+    max_missing = request.query_params.get('max_missing')
+    if max_missing is not None:
+        try:
+            max_missing = int(max_missing)
+        except ValueError:
+            return Response(
+                {'max_missing': 'A valid integer is required.'}, status=status.HTTP_400_BAD_REQUEST,
+            )
+
+    fields = selected_fields(request.query_params, RECIPE_FIELDS)
+    limit = parse_limit(request.query_params, pantry.DEFAULT_LIMIT, pantry.MAX_LIMIT)
+    ingredient_ids = pantry.pantry_ingredient_ids(request.user, names)
+    matches = pantry.match_recipes(request.user, ingredient_ids, limit, max_missing)
+    recipe_ids = [match['recipe_id'] for match in matches]
+    rows = list(recipe_values(Recipe.objects.filter(pk__in=recipe_ids), fields))
+    recipes = dict(zip([row['id'] for row in rows], represent_recipes(rows, fields=fields)))
+    missing = pantry.missing_ingredients(recipe_ids, ingredient_ids)
+    # Recipes deleted since they were matched are left out.
+    return Response([
+        {
+            'recipe': recipes[match['recipe_id']],
+            'coverage': match['coverage'],
+            'matched': match['matched'],
+            'missing': missing[match['recipe_id']],
+        }
+        for match in matches
+        if match['recipe_id'] in recipes
+    ])
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            name='type',
+            type=str,
+            location=OpenApiParameter.QUERY,
+            description='jsonl (default): one recipe object per line; csv: one row per recipe.',
+            enum=list(EXPORT_TYPES),
+            required=False,
+        ),
+    ],
+    responses={(200, media_type): OpenApiTypes.STR for media_type in EXPORT_TYPES.values()},
+)
+@api_view(['GET'])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+@conditional_on_data_version('export_recipes')
+def export_recipes(request):
+    """
+    Download all of the user's recipes, streamed as they are read.
+    Example:
+    /api/recipe/recipes/export/?type=csv
+    """
+    export_type = request.query_params.get('type', 'jsonl')
+    if export_type not in EXPORT_TYPES:
+        return Response(
+            {'type': f"Must be one of: {', '.join(EXPORT_TYPES)}."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    recipes = Recipe.objects.filter(user=request.user).with_related().order_by('id')
+    response = StreamingHttpResponse(
+        export_lines(recipes, export_type, request, settings.EXPORT_CHUNK_SIZE),
+        content_type=EXPORT_TYPES[export_type],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="recipes-{date.today().isoformat()}.{export_type}"'
+    )
+    return response
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            name='type',
+            type=str,
+            location=OpenApiParameter.QUERY,
+            description='Format of the file; by default taken from its extension, else jsonl.',
+            enum=list(IMPORT_TYPES),
+            required=False,
+        ),
+    ],
+    request={
+        'multipart/form-data': {
+            'type': 'object',
+            'properties': {'file': {'type': 'string', 'format': 'binary'}},
+            'required': ['file'],
+        },
+    },
+    responses={
+        200: inline_serializer('RecipeImportResult', {
+            'created': serializers.IntegerField(),
+            'failed': serializers.IntegerField(),
+            'errors': serializers.ListField(child=serializers.DictField()),
+        }),
+        400: OpenApiResponse(description="Missing file or unknown type"),
+        413: OpenApiResponse(description="File larger than IMPORT_MAX_UPLOAD_SIZE"),
+    },
+)
+@api_view(['POST'])
+@parser_classes([MultiPartParser])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def import_recipes(request):
+    """
+    Create recipes from an uploaded JSON Lines or CSV file, as written by
+    the export. Invalid rows are reported and skipped.
+    """
+    limit = settings.IMPORT_MAX_UPLOAD_SIZE
+    too_large = {'file': f'The upload may be at most {limit} bytes.'}
+    # Refused before the body is read when the client declares its size.
+    declared = request.META.get('CONTENT_LENGTH', '')
+    if declared.isdigit() and int(declared) > limit:
+        return Response(too_large, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'file': 'No file was submitted.'}, status=status.HTTP_400_BAD_REQUEST)
+    if upload.size > limit:
+        return Response(too_large, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    import_type = request.query_params.get('type')
+    if import_type is None:
+        import_type = 'csv' if upload.name.lower().endswith('.csv') else 'jsonl'
+    if import_type not in IMPORT_TYPES:
+        return Response(
+            {'type': f"Must be one of: {', '.join(IMPORT_TYPES)}."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    rows = importer.read_rows(upload.file, import_type)
+    result = importer.import_recipes(request.user, rows)
+    return Response(result.as_dict())
 
 @extend_schema(
     methods=['POST'],
@@ -65,7 +285,7 @@ def filter_recipes(request):
     responses={201: RecipeSerializer}
 )
 @api_view(['POST'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
 def create_recipe(request):
     """
@@ -91,11 +311,15 @@ def create_recipe(request):
 )
 @api_view(['PATCH'])
 @parser_classes([MultiPartParser, FormParser])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
 def upload_recipe_photos_view(request, recipe_id):
     """
     Endpoint for uploading photos to specific image fields in the Recipe model.
+    The upload is stored as-is; resized variants are generated in the
+    background and show up in image_variants once ready.
     """
-    recipe = get_object_or_404(Recipe, pk=recipe_id)
+    recipe = get_object_or_404(Recipe, pk=recipe_id, user=request.user)
     serializer = RecipeSerializer(recipe, data=request.data, partial=True, context={'request': request})
     if serializer.is_valid():
         serializer.save()
@@ -103,6 +327,11 @@ def upload_recipe_photos_view(request, recipe_id):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@extend_schema(
+    methods=['GET'],
+    parameters=FIELDSET_PARAMETERS,
+    responses=RecipeDetailSerializer,
+)
 @extend_schema(
     methods=['PUT'],
     description="Update an existing recipe by providing all required fields.",
@@ -113,17 +342,22 @@ def upload_recipe_photos_view(request, recipe_id):
     },
 )
 @api_view(['PUT','GET','DELETE'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
+@conditional_on_data_version('recipe_detail')
 def recipe_detail(request,pk):
     """handle detail of recipe in id"""
+    recipes = Recipe.objects.filter(user=request.user)
+    if request.method == 'GET':
+        fields = selected_fields(request.query_params, RECIPE_FIELDS)
+        recipes = recipes.only(*recipe_columns(fields)).with_related(recipe_relations(fields))
     try:
-        recipe = Recipe.objects.get(pk=pk, user=request.user)
+        recipe = recipes.get(pk=pk)
     except Recipe.DoesNotExist:
         return Response({"error": "Recipe not found"}, status=status.HTTP_404_NOT_FOUND)
 
     if request.method == 'GET':
-        serializer =  RecipeDetailSerializer(recipe)
+        serializer =  RecipeDetailSerializer(recipe, fields=fields)
         return Response(serializer.data)
 
     elif request.method == 'PUT':
@@ -139,6 +373,11 @@ def recipe_detail(request,pk):
 
 
 
+@extend_schema(
+    methods=['GET'],
+    parameters=[*PAGINATION_PARAMETERS, *FIELDSET_PARAMETERS],
+    responses=TagSerializer(many=True),
+)
 @extend_schema(
     methods=['POST'],
     request=TagSerializer,
@@ -151,22 +390,33 @@ def recipe_detail(request,pk):
     },
 )
 @api_view(['GET','POST'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
+@conditional_on_data_version('tag_list')
+@cache_response('tag_list')
 def tag_list(request):
 
     if request.method == 'GET':
-        tag= Tag.objects.filter(user=request.user).order_by('name')
-        serializer= TagSerializer(tag, many=True)
-        return Response(serializer.data)
+        fields = selected_fields(request.query_params, NAME_FIELDS)
+        tag= name_values(Tag.objects.filter(user=request.user).order_by('name', 'id'))
+        paginator = KeysetPagination(ordering=('name', 'id'))
+        if paginator.is_requested(request):
+            page = paginator.paginate_queryset(tag, request)
+            return paginator.get_paginated_response(represent_names(page, fields))
+        return Response(represent_names(tag, fields))
 
     elif request.method == 'POST':
-        serializer= TagSerializer(data=request.data)
+        serializer= TagSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             serializer.save(user=request.user)
             return Response(serializer.data,status=status.HTTP_201_CREATED)
         return Response(serializer.errors,status=status.HTTP_400_BAD_REQUEST)
 
+@extend_schema(
+        methods=['GET'],
+        parameters=FIELDSET_PARAMETERS,
+        responses=TagSerializer
+)
 @extend_schema(
         methods=['PUT'],
         request=TagSerializer,
@@ -188,26 +438,27 @@ def tag_list(request):
 )
 @api_view(['GET','PUT','PATCH','DELETE'])
 @permission_classes([IsAuthenticated])
-@authentication_classes([TokenAuthentication])
-
+@authentication_classes([CachedTokenAuthentication])
+@conditional_on_data_version('tag_detail')
 def tag_detail(request,name):
     try:
         tag = Tag.objects.get(name=name, user=request.user)
     except Tag.DoesNotExist:
         return Response({"error": "Tag not found"}, status=status.HTTP_404_NOT_FOUND)
     if request.method == 'GET':
-        serializer = TagSerializer(tag)
+        fields = selected_fields(request.query_params, NAME_FIELDS)
+        serializer = TagSerializer(tag, fields=fields)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     elif request.method == 'PUT':
-        serializer = TagSerializer(tag, data=request.data)
+        serializer = TagSerializer(tag, data=request.data, context={'request': request})
         if serializer.is_valid():
             serializer.save(user=request.user)
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     elif request.method == 'PATCH':
-        serializer= TagSerializer(tag,data=request.data,partial=True)
+        serializer= TagSerializer(tag,data=request.data,partial=True,context={'request': request})
         if serializer.is_valid():
             serializer.save(user=request.user)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -218,54 +469,72 @@ def tag_detail(request,name):
         tag.delete()
         return Response({"message": "Tag deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
 
+@extend_schema(
+        methods=['GET'],
+        parameters=[*PAGINATION_PARAMETERS, *FIELDSET_PARAMETERS],
+        responses=IngredientSerializer(many=True)
+)
 @extend_schema(
         methods=['POST'],
         request=IngredientSerializer,
         responses=IngredientSerializer
 )
 @api_view(['POST','GET'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
+@conditional_on_data_version('ingredient_list')
+@cache_response('ingredient_list')
 def ingredient_list(request):
     """"""
 
     if request.method == 'GET':
-        ingredient=Ingredient.objects.filter(user=request.user).order_by('name')
-        serializer=IngredientSerializer(ingredient,many=True)
-        return Response(serializer.data)
+        fields = selected_fields(request.query_params, NAME_FIELDS)
+        ingredient= name_values(Ingredient.objects.filter(user=request.user).order_by('name', 'id'))
+        paginator = KeysetPagination(ordering=('name', 'id'))
+        if paginator.is_requested(request):
+            page = paginator.paginate_queryset(ingredient, request)
+            return paginator.get_paginated_response(represent_names(page, fields))
+        return Response(represent_names(ingredient, fields))
 
     elif request.method == 'POST':
-        serializer= IngredientSerializer(data=request.data)
+        serializer= IngredientSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             serializer.save(user=request.user)
             return Response(serializer.data,status=status.HTTP_201_CREATED)
         return Response(serializer.errors,status=status.HTTP_400_BAD_REQUEST)
 
+@extend_schema(
+        methods=['GET'],
+        parameters=FIELDSET_PARAMETERS,
+        responses=IngredientSerializer
+)
 @extend_schema(
         methods=['PUT','PATCH'],
         request=IngredientSerializer,
         responses=IngredientSerializer
 )
 @api_view(['GET','PUT','PATCH','DELETE'])
-@authentication_classes([TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([IsAuthenticated])
+@conditional_on_data_version('ingredient_detail')
 def ingredient_detail(request,name):
     try:
         ingredient= Ingredient.objects.get(user=request.user,name=name)
     except Ingredient.DoesNotExist:
-        Response({'error':'ingredient is not found'},status=status.HTTP_404_NOT_FOUND)
+        return Response({'error':'ingredient is not found'},status=status.HTTP_404_NOT_FOUND)
 
     if request.method == 'GET':
-        serializer= IngredientSerializer(ingredient)
+        fields = selected_fields(request.query_params, NAME_FIELDS)
+        serializer= IngredientSerializer(ingredient, fields=fields)
         return Response(serializer.data, status=status.HTTP_200_OK)
     elif request.method == 'PUT':
-        serializer= IngredientSerializer(ingredient,data=request.data)
+        serializer= IngredientSerializer(ingredient,data=request.data,context={'request': request})
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data,status=status.HTTP_200_OK)
         return Response(serializer.errors,status=status.HTTP_400_BAD_REQUEST)
     elif request.method == 'PATCH':
-        serializer= IngredientSerializer(ingredient,data=request.data,partial=True)
+        serializer= IngredientSerializer(ingredient,data=request.data,partial=True,context={'request': request})
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data,status=status.HTTP_200_OK)
@@ -275,3 +544,46 @@ def ingredient_detail(request,name):
         ingredient.delete()
         return Response({'message':'ingredient deleted succesfully'},status=status.HTTP_204_NO_CONTENT)
 
+
+
+SUGGESTION_RESPONSE = inline_serializer('NameSuggestion', {
+    'id': serializers.IntegerField(),
+    'name': serializers.CharField(),
+    'recipe_count': serializers.IntegerField(),
+}, many=True)
+
+
+def _suggestions(request, model):
+    prefix = request.query_params.get('q', '').strip()
+    if not prefix:
+        return Response({'q': 'This parameter is required.'}, status=status.HTTP_400_BAD_REQUEST)
+    limit = parse_limit(request.query_params, suggest.DEFAULT_LIMIT, suggest.MAX_LIMIT)
+    return Response(suggest.suggest_names(model, request.user, prefix, limit))
+
+
+@extend_schema(parameters=suggest.SUGGEST_PARAMETERS, responses=SUGGESTION_RESPONSE)
+@api_view(['GET'])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+@conditional_on_data_version('tag_suggest')
+def tag_suggest(request):
+    """
+    The user's tags starting with ?q=, most used first.
+    Example:
+    /api/recipe/tags/suggest/?q=veg&limit=5
+    """
+    return _suggestions(request, Tag)
+
+
+@extend_schema(parameters=suggest.SUGGEST_PARAMETERS, responses=SUGGESTION_RESPONSE)
+@api_view(['GET'])
+@authentication_classes([CachedTokenAuthentication])
+@permission_classes([IsAuthenticated])
+@conditional_on_data_version('ingredient_suggest')
+def ingredient_suggest(request):
+    """
+    The user's ingredients starting with ?q=, most used first.
+    Example:
+    /api/recipe/ingredients/suggest/?q=tom
+    """
+    return _suggestions(request, Ingredient)
@@ -0,0 +1,82 @@
+"""
+Token authentication with a cached token -> user lookup
+"""
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+AUTH_CACHE_ALIAS = 'auth'
+# Fields a cache hit loads; permission checks read the flags.
+CACHED_FIELDS = ('id', 'is_active', 'is_staff', 'is_superuser')
+
+# Cleared by disable_process_local_cache().
+_cache_enabled = True
+
+
+def token_cache_key(key):
+    """Cache key for a token; the raw token never reaches the cache"""
+    return 'auth-token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in TokenAuthentication that caches the token -> user resolution.
+
+    A hit skips the authtoken_token/core_user join entirely. Entries expire
+    after AUTH_CACHE_TIMEOUT and are deleted as soon as the token is
+    deleted or regenerated, or its user is saved or deleted (see
+    user.signals). Only active users are ever cached.
+
+    The cache holds nothing but the CACHED_FIELDS values: no password hash
+    or other user data leaves the database. A hit yields a user with just
+    those fields loaded; the others load from the database when read.
+
+    Deletions only reach every worker through a shared cache; with a
+    process-local one in several workers the cache is turned off (see
+    disable_process_local_cache) and every request reads the token.
+    """
+
+    def authenticate_credentials(self, key):
+        if not _cache_enabled:
+            return super().authenticate_credentials(key)
+        cache = caches[AUTH_CACHE_ALIAS]
+        cache_key = token_cache_key(key)
+        cached = cache.get(cache_key)
+        if cached is not None and cached[1]:
+            return cached_user(cached), Token(key=key, user_id=cached[0])
+
+        user, token = super().authenticate_credentials(key)
+        cache.set(cache_key, tuple(getattr(user, field) for field in CACHED_FIELDS))
+        return user, token
+
+
+def cached_user(values):
+    """A user instance with only the CACHED_FIELDS loaded"""
+    User = get_user_model()
+    by_name = dict(zip(CACHED_FIELDS, values))
+    # from_db takes the values in the model's field order.
+    names = [field.attname for field in User._meta.concrete_fields if field.attname in by_name]
+    return User.from_db(DEFAULT_DB_ALIAS, names, [by_name[name] for name in names])
+
+
+def disable_process_local_cache():
+    """Stop caching if the auth cache lives in this process only.
+
+    Called in each worker of a multi-worker server: a token deleted in one
+    worker would otherwise still be accepted by the others until their
+    entries expire. Returns whether caching was turned off.
+    """
+    global _cache_enabled
+    if isinstance(caches[AUTH_CACHE_ALIAS], LocMemCache):
+        _cache_enabled = False
+    return not _cache_enabled
+
+
+def invalidate_token(key):
+    """Forget the cached resolution of one token"""
+    caches[AUTH_CACHE_ALIAS].delete(token_cache_key(key))
@@ -7,7 +7,9 @@ from django.contrib.auth import (
 from django.utils.translation import gettext as _
 from rest_framework import serializers
 
-class UserSerializer(serializers.ModelSerializer):
+from core.serializers import TimedSerializerMixin
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """serializer for user object"""
 
 
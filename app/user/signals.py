@@ -0,0 +1,27 @@
+"""
+Signal handlers keeping the authentication cache consistent
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from rest_framework.authtoken.models import Token
+
+from user.authentication import invalidate_token
+
+
+def _token_changed(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+def _user_changed(sender, instance, **kwargs):
+    # Covers deactivation through manage_user or the admin.
+    for key in Token.objects.filter(user=instance).values_list('key', flat=True):
+        invalidate_token(key)
+
+
+def connect():
+    """Connect the handlers, called from UserConfig.ready()"""
+    post_save.connect(_token_changed, sender=Token, dispatch_uid='user.auth_cache.token_save')
+    post_delete.connect(_token_changed, sender=Token, dispatch_uid='user.auth_cache.token_delete')
+    post_save.connect(
+        _user_changed, sender=get_user_model(), dispatch_uid='user.auth_cache.user_save'
+    )
@@ -0,0 +1,111 @@
+"""
+Tests for cached token authentication
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user import authentication
+from user.authentication import AUTH_CACHE_ALIAS, token_cache_key
+
+
+ME_URL = reverse('me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test the token lookup cache"""
+
+    def setUp(self):
+        caches[AUTH_CACHE_ALIAS].clear()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123', name='User'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_second_request_skips_token_query(self):
+        """Test a cached token resolves without touching the token table"""
+        self.client.get(ME_URL)
+
+        # Only manage_user's own read of the user row.
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('authtoken_token', queries[0]['sql'])
+
+    def test_cache_holds_no_credentials(self):
+        """Test only the user id and flags are cached"""
+        self.client.get(ME_URL)
+
+        cached = caches[AUTH_CACHE_ALIAS].get(token_cache_key(self.token.key))
+
+        self.assertEqual(cached, (self.user.pk, True, False, False))
+
+    def test_cached_user_has_permission_flags(self):
+        """Test staff and superuser checks on a cache hit need no query"""
+        request = RequestFactory().get(ME_URL, HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        authentication.CachedTokenAuthentication().authenticate(request)
+
+        with self.assertNumQueries(0):
+            user, _ = authentication.CachedTokenAuthentication().authenticate(request)
+            self.assertEqual((user.is_staff, user.is_superuser), (False, False))
+
+    def test_process_local_cache_disabled(self):
+        """Test a worker of several stops caching in its own memory"""
+        with patch.object(authentication, '_cache_enabled', True):
+            self.assertTrue(authentication.disable_process_local_cache())
+            self.client.get(ME_URL)
+
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(ME_URL)
+
+        self.assertIn('authtoken_token', queries[0]['sql'])
+        self.assertIsNone(caches[AUTH_CACHE_ALIAS].get(token_cache_key(self.token.key)))
+
+    def test_deleted_token_rejected_immediately(self):
+        """Test deleting a token drops it from the cache"""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected_immediately(self):
+        """Test deactivating the user drops their tokens from the cache"""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_not_served_stale(self):
+        """Test manage_user sees its own update on the next request"""
+        self.client.put(ME_URL, {'name': 'Renamed'})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'Renamed')
+
+    def test_invalid_token_not_cached(self):
+        """Test an unknown token keeps failing"""
+        self.client.credentials(HTTP_AUTHORIZATION='Token nope')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
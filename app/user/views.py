@@ -1,12 +1,14 @@
 """views for user API - function-based version"""
 
+from django.contrib.auth import get_user_model
 from rest_framework.decorators import api_view, authentication_classes, permission_classes, renderer_classes
 from rest_framework.response import Response
-from rest_framework import status, authentication, permissions
+from rest_framework import status, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
 from rest_framework.settings import api_settings
 from user.serializers import UserSerializer, AuthTokenSerializer
+from user.authentication import CachedTokenAuthentication
 from drf_spectacular.utils import extend_schema
 
 @extend_schema(
@@ -46,11 +48,12 @@ def create_token(request):
         responses=UserSerializer
 )
 @api_view(['GET', 'PUT'])
-@authentication_classes([authentication.TokenAuthentication])
+@authentication_classes([CachedTokenAuthentication])
 @permission_classes([permissions.IsAuthenticated])
 def manage_user(request):
     """Retrieve or update the authenticated user"""
-    user = request.user
+    # The cached authentication only loads the id; read the whole row.
+    user = get_user_model().objects.get(pk=request.user.pk)
 
     if request.method == 'GET':
         serializer = UserSerializer(user)
@@ -0,0 +1,29 @@
+#!/usr/bin/env python
+"""
+ASGI config for Recipe API deployment.
+Serves the same project as wsgi.py; use it with an ASGI worker to run the
+async read endpoints under /api/async/recipe/ natively.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Add the app directory to Python path
+BASE_DIR = Path(__file__).resolve().parent
+app_dir = BASE_DIR / 'app'
+sys.path.insert(0, str(app_dir))
+
+# Change to the app directory
+os.chdir(str(app_dir))
+
+# Set the Django settings module
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+# Every request runs on a thread of its own; persistent connections would
+# be left behind with it.
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
+
+# Import the Django ASGI application
+from django.core.asgi import get_asgi_application
+
+application = get_asgi_application()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+"""
+Compare concurrent-client throughput of the sync and async read endpoints.
+
+Start the same project twice, once per deployment style, e.g.
+
+    GUNICORN_PROFILE=sync gunicorn -c gunicorn.conf.py -b 127.0.0.1:8001 -w 4
+    GUNICORN_PROFILE=asgi gunicorn -c gunicorn.conf.py -b 127.0.0.1:8002 -w 4
+
+then point this script at both with a user's token:
+
+    python benchmarks/async_vs_sync.py --token <key> \
+        --sync http://127.0.0.1:8001/api/recipe/recipes/ \
+        --async http://127.0.0.1:8002/api/async/recipe/recipes/ \
+        --concurrency 1,8,32,64 --duration 10
+
+The load generator is shared with the other scripts, see client.py.
+"""
+import argparse
+
+from client import HEADER, Target, format_row, run_load
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sync', required=True, help='url served by the sync deployment')
+    parser.add_argument('--async', dest='async_', required=True,
+                        help='url served by the ASGI deployment')
+    parser.add_argument('--token', help='api token sent as "Authorization: Token <key>"')
+    parser.add_argument('--concurrency', default='1,8,32',
+                        help='comma-separated numbers of concurrent clients')
+    parser.add_argument('--duration', type=float, default=10.0,
+                        help='seconds per run')
+    parser.add_argument('--bust-cache', action='store_true',
+                        help='make every request miss the response cache')
+    args = parser.parse_args(argv)
+
+    targets = [('sync', Target(args.sync, args.token)),
+               ('async', Target(args.async_, args.token))]
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    print(HEADER)
+    for concurrency in levels:
+        for label, target in targets:
+            result = run_load(target, concurrency, args.duration, args.bust_cache)
+            print(format_row(label, result), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+HTTP load generation shared by the benchmark scripts
+
+Every client is a thread with its own keep-alive connection issuing requests
+back to back. Only the standard library is used so the benchmarks run
+anywhere the project does.
+"""
+import http.client
+import itertools
+import statistics
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies):
+    """Latency statistics in milliseconds of a list of durations in seconds"""
+    return {
+        'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+class Target:
+    """One url to hit with GET requests"""
+
+    def __init__(self, url, token):
+        parts = urlsplit(url)
+        self.base_url = f'{parts.scheme}://{parts.netloc}'
+        self.token = token
+        self.path = parts.path or '/'
+        self.query = parts.query
+
+    def request_path(self, bust):
+        query = self.query
+        if bust is not None:
+            # An extra parameter gives every request its own cache key.
+            query = '&'.join(filter(None, [query, urlencode({'_': bust})]))
+        return f'{self.path}?{query}' if query else self.path
+
+
+class Session:
+    """A keep-alive connection to one server, for use by a single thread"""
+
+    def __init__(self, base_url, token=None, timeout=30):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.timeout = timeout
+        self.headers = {'Accept': 'application/json'}
+        if token:
+            self.headers['Authorization'] = f'Token {token}'
+        self._connection = None
+
+    def _connect(self):
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(self.netloc, timeout=self.timeout)
+
+    def request(self, method, path, body=None, headers=None):
+        """Return (status, response headers, body, seconds); status 0 on errors"""
+        if self._connection is None:
+            self._connection = self._connect()
+        all_headers = dict(self.headers, **(headers or {}))
+        began = time.perf_counter()
+        try:
+            self._connection.request(method, path, body=body, headers=all_headers)
+            response = self._connection.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            return 0, {}, b'', time.perf_counter() - began
+        elapsed = time.perf_counter() - began
+        return response.status, dict(response.getheaders()), content, elapsed
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def run_load(target, concurrency, duration, bust_cache=False, timeout=30):
+    """Hit ``target`` from ``concurrency`` clients for ``duration`` seconds"""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    counter = itertools.count()
+    start = threading.Barrier(concurrency + 1)
+    deadline = [0.0]
+
+    def client():
+        session = Session(target.base_url, target.token, timeout)
+        local_latencies, local_errors = [], 0
+        start.wait()
+        while time.perf_counter() < deadline[0]:
+            bust = next(counter) if bust_cache else None
+            status, _, _, elapsed = session.request('GET', target.request_path(bust))
+            if status == 200:
+                local_latencies.append(elapsed)
+            else:
+                local_errors += 1
+        session.close()
+        with lock:
+            latencies.extend(local_latencies)
+            errors.append(local_errors)
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    deadline[0] = time.perf_counter() + duration
+    started = time.perf_counter()
+    start.wait()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return dict(
+        summarize(latencies),
+        concurrency=concurrency,
+        requests=len(latencies),
+        errors=sum(errors),
+        throughput=len(latencies) / elapsed,
+    )
+
+
+HEADER = (
+    f"{'target':<12} {'conc':>5} {'requests':>9} {'errors':>6} "
+    f"{'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+)
+
+
+def format_row(label, result):
+    return (
+        f"{label:<12} {result['concurrency']:>5} {result['requests']:>9} "
+        f"{result['errors']:>6} {result['throughput']:>9.1f} "
+        f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f}"
+    )
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""
+Measure memory and throughput of each gunicorn profile.
+
+Starts the project with every GUNICORN_PROFILE in turn, drives it with
+concurrent clients and reports throughput, latency and the memory of the
+master plus its workers. Run it from the repository root against a
+database holding data for the token's user (see the seed_data command or
+create a few recipes by hand):
+
+    DATABASE_URL=... python benchmarks/gunicorn_profiles.py --token <key> \
+        --workers 2 --concurrency 1,8,32 --duration 10
+
+Memory is the proportional set size (shared pages split between the
+processes sharing them), which is what preload_app saves on; RSS is
+reported too. Both are read from /proc, so this only runs on Linux.
+"""
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from client import HEADER, Target, format_row, run_load
+
+
+ROOT = Path(__file__).resolve().parent.parent
+PROFILES = ('sync', 'gthread', 'asgi')
+
+
+def _children(pid):
+    children = []
+    for task in Path(f'/proc/{pid}/task').iterdir():
+        text = (task / 'children').read_text().split()
+        children.extend(int(child) for child in text)
+    return children
+
+
+def _memory_kb(pid, field):
+    source = 'smaps_rollup' if field == 'Pss' else 'status'
+    name = 'VmRSS' if field == 'Rss' else field
+    for line in Path(f'/proc/{pid}/{source}').read_text().splitlines():
+        if line.startswith(name + ':'):
+            return int(line.split()[1])
+    return 0
+
+
+def process_tree_memory(pid):
+    """Return (pss, rss) in MiB of ``pid`` and its child processes"""
+    pids = [pid] + _children(pid)
+    pss = sum(_memory_kb(p, 'Pss') for p in pids)
+    rss = sum(_memory_kb(p, 'Rss') for p in pids)
+    return pss / 1024, rss / 1024
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+def start_server(profile, port, workers, threads):
+    env = dict(os.environ, GUNICORN_PROFILE=profile, WEB_CONCURRENCY=str(workers))
+    if threads:
+        env['GUNICORN_THREADS'] = str(threads)
+    return subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+         '-b', f'127.0.0.1:{port}', '--access-logfile', '/dev/null'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--token', required=True, help='api token of the user to query as')
+    parser.add_argument('--profiles', default=','.join(PROFILES))
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=0,
+                        help='GUNICORN_THREADS for gthread (default: profile default)')
+    parser.add_argument('--path', default='/api/recipe/recipes/?page_size=20')
+    parser.add_argument('--async-path', default='/api/async/recipe/recipes/?page_size=20',
+                        help='also measured on the asgi profile')
+    parser.add_argument('--concurrency', default='1,8,32')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('--bust-cache', action='store_true',
+                        help='make every request miss the response cache')
+    args = parser.parse_args(argv)
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    print(HEADER + f" {'PSS MiB':>8} {'RSS MiB':>8}")
+    for profile in args.profiles.split(','):
+        server = start_server(profile, args.port, args.workers, args.threads)
+        try:
+            wait_for_port(args.port)
+            base = f'http://127.0.0.1:{args.port}'
+            paths = [(profile, args.path)]
+            if profile == 'asgi' and args.async_path:
+                paths.append(('asgi+async', args.async_path))
+            for label, path in paths:
+                target = Target(base + path, args.token)
+                run_load(target, 1, 1.0, args.bust_cache)  # warm up
+                for concurrency in levels:
+                    result = run_load(target, concurrency, args.duration, args.bust_cache)
+                    pss, rss = process_tree_memory(server.pid)
+                    print(format_row(label, result) + f' {pss:>8.1f} {rss:>8.1f}', flush=True)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python
+"""
+Load test the recipe and user api with a realistic mix of requests.
+
+Start a server with the query count headers enabled, then run the mix
+against it and save the results:
+
+    QUERY_COUNT_HEADER=true gunicorn -c gunicorn.conf.py -b 127.0.0.1:8000
+    python benchmarks/loadtest.py --base-url http://127.0.0.1:8000 \
+        --concurrency 16 --duration 30 --seed 1 \
+        --output loadtest-$(git rev-parse --short HEAD).json
+
+Compare two saved runs, e.g. before and after a commit:
+
+    python benchmarks/loadtest.py --compare before.json after.json
+
+The run first creates --users users (or reuses them) with --recipes
+recipes each through the api. Each client then signs in as one of them and
+issues requests drawn from the weighted mix in SCENARIOS. Every choice
+comes from a random generator seeded with --seed, so two runs against the
+same data send the same requests.
+"""
+import argparse
+import datetime
+import json
+import random
+import struct
+import subprocess
+import sys
+import threading
+import time
+import uuid
+import zlib
+from pathlib import Path
+
+from client import Session, summarize
+
+
+TAG_NAMES = ['vegan', 'quick', 'dinner', 'breakfast', 'spicy', 'dessert',
+             'healthy', 'italian', 'mexican', 'soup', 'salad', 'baking']
+INGREDIENT_NAMES = ['tomato', 'onion', 'garlic', 'rice', 'beans', 'cheese',
+                    'chicken', 'tofu', 'pepper', 'flour', 'egg', 'milk',
+                    'basil', 'lemon', 'potato', 'carrot']
+
+# name: weight. Reads dominate, like the app's traffic.
+SCENARIOS = {
+    'list': 25,
+    'filter': 20,
+    'detail': 25,
+    'tags': 5,
+    'create': 10,
+    'upload': 2,
+    'me': 8,
+    'token': 5,
+}
+
+
+def tiny_png(size=64):
+    """A valid RGB PNG of ``size`` x ``size`` pixels"""
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body))
+
+    row = b'\x00' + bytes(range(size)) * 3
+    pixels = zlib.compress(row * size)
+    header = struct.pack('>IIBBBBB', size, size, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', pixels) + chunk(b'IEND', b''))
+
+
+def multipart(field, filename, content, content_type):
+    """Encode one file field as multipart/form-data"""
+    boundary = uuid.uuid4().hex
+    body = (
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f'Content-Type: {content_type}\r\n\r\n'
+    ).encode() + content + f'\r\n--{boundary}--\r\n'.encode()
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+def recipe_payload(rng):
+    return {
+        'title': f'Load test recipe {rng.randrange(10 ** 6)}',
+        'time_minutes': rng.randint(5, 120),
+        'price': f'{rng.uniform(1, 50):.2f}',
+        'tags': [{'name': name} for name in rng.sample(TAG_NAMES, 2)],
+        'ingredients': [{'name': name} for name in rng.sample(INGREDIENT_NAMES, 3)],
+    }
+
+
+def post_json(session, path, data):
+    return session.request(
+        'POST', path, json.dumps(data).encode(), {'Content-Type': 'application/json'}
+    )
+
+
+class Account:
+    """A load test user with its token and recipe ids"""
+
+    def __init__(self, email, password, token, recipe_ids):
+        self.email = email
+        self.password = password
+        self.token = token
+        self.recipe_ids = recipe_ids
+
+
+def prepare_accounts(base_url, users, recipes, seed):
+    """Create (or reuse) the users and their recipes through the api"""
+    accounts = []
+    for index in range(users):
+        rng = random.Random(f'{seed}-setup-{index}')
+        email = f'loadtest-{seed}-{index}@example.com'
+        password = f'loadtest-{seed}-password'
+        session = Session(base_url)
+        post_json(session, '/api/user/create/', {
+            'email': email, 'password': password, 'name': f'Load test {index}',
+        })
+        status, _, body, _ = post_json(session, '/api/user/token/', {
+            'email': email, 'password': password,
+        })
+        if status != 200:
+            raise SystemExit(f'could not get a token for {email}: {status} {body[:200]!r}')
+        token = json.loads(body)['token']
+
+        session = Session(base_url, token)
+        status, _, body, _ = session.request('GET', '/api/recipe/recipes/')
+        recipe_ids = [recipe['id'] for recipe in json.loads(body)]
+        while len(recipe_ids) < recipes:
+            status, _, body, _ = post_json(session, '/api/recipe/recipe/', recipe_payload(rng))
+            if status != 201:
+                raise SystemExit(f'could not create a recipe: {status} {body[:200]!r}')
+            recipe_ids.append(json.loads(body)['id'])
+        session.close()
+        accounts.append(Account(email, password, token, recipe_ids))
+    return accounts
+
+
+def run_scenario(name, session, account, rng, image):
+    """Issue one request of scenario ``name``; return (status, headers, seconds)"""
+    if name == 'list':
+        request = ('GET', '/api/recipe/recipes/?page_size=20', None, None)
+    elif name == 'filter':
+        tags = ','.join(rng.sample(TAG_NAMES, rng.randint(1, 2)))
+        ingredients = rng.choice(INGREDIENT_NAMES)
+        match = rng.choice(['any', 'all'])
+        request = ('GET', f'/api/recipe/recipes/?tags={tags}&ingredients={ingredients}'
+                          f'&match={match}&page_size=20', None, None)
+    elif name == 'detail':
+        request = ('GET', f'/api/recipe/recipes/{rng.choice(account.recipe_ids)}', None, None)
+    elif name == 'tags':
+        request = ('GET', '/api/recipe/tags/', None, None)
+    elif name == 'create':
+        body = json.dumps(recipe_payload(rng)).encode()
+        request = ('POST', '/api/recipe/recipe/', body, {'Content-Type': 'application/json'})
+    elif name == 'upload':
+        body, content_type = multipart('image1', 'photo.png', image, 'image/png')
+        recipe_id = rng.choice(account.recipe_ids)
+        request = ('PATCH', f'/api/recipe/recipes/{recipe_id}/upload-photos/',
+                   body, {'Content-Type': content_type})
+    elif name == 'me':
+        request = ('GET', '/api/user/me/', None, None)
+    elif name == 'token':
+        body = json.dumps({'email': account.email, 'password': account.password}).encode()
+        request = ('POST', '/api/user/token/', body, {'Content-Type': 'application/json'})
+    else:
+        raise ValueError(f'unknown scenario {name!r}')
+
+    status, headers, _, elapsed = session.request(*request)
+    return status, headers, elapsed
+
+
+def run_mix(base_url, accounts, mix, concurrency, duration, seed):
+    """Drive the mix from ``concurrency`` clients for ``duration`` seconds"""
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    image = tiny_png()
+    samples = {name: [] for name in names}
+    lock = threading.Lock()
+    start = threading.Barrier(concurrency + 1)
+    deadline = [0.0]
+
+    def client(index):
+        rng = random.Random(f'{seed}-client-{index}')
+        account = accounts[index % len(accounts)]
+        session = Session(base_url, account.token)
+        local = []
+        start.wait()
+        while time.perf_counter() < deadline[0]:
+            name = rng.choices(names, weights)[0]
+            status, headers, elapsed = run_scenario(name, session, account, rng, image)
+            queries = headers.get('X-DB-Queries')
+            db_time = headers.get('X-DB-Time')
+            local.append((
+                name, status, elapsed,
+                int(queries) if queries is not None else None,
+                float(db_time) if db_time is not None else None,
+            ))
+        session.close()
+        with lock:
+            for name, *sample in local:
+                samples[name].append(sample)
+
+    threads = [threading.Thread(target=client, args=(index,), daemon=True)
+               for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    deadline[0] = time.perf_counter() + duration
+    started = time.perf_counter()
+    start.wait()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for name, rows in samples.items():
+        if rows:
+            results[name] = _scenario_stats(rows, elapsed)
+    results['all'] = _scenario_stats(
+        [row for rows in samples.values() for row in rows], elapsed
+    )
+    return results
+
+
+def _scenario_stats(rows, elapsed):
+    ok = [row for row in rows if 200 <= row[0] < 300]
+    latencies = [row[1] for row in ok]
+    queries = [row[2] for row in ok if row[2] is not None]
+    db_times = [row[3] for row in ok if row[3] is not None]
+    stats = summarize(latencies)
+    stats.update({
+        'requests': len(rows),
+        'errors': len(rows) - len(ok),
+        'throughput': len(ok) / elapsed,
+        'db_queries_mean': sum(queries) / len(queries) if queries else None,
+        'db_queries_max': max(queries) if queries else None,
+        'db_time_ms_mean': sum(db_times) / len(db_times) if db_times else None,
+    })
+    return stats
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _fmt(value, width, precision):
+    return f'{value:>{width}.{precision}f}' if value is not None else '-'.rjust(width)
+
+
+def print_results(results):
+    print(f"{'scenario':<10} {'requests':>9} {'errors':>6} {'req/s':>8} {'p50 ms':>8} "
+          f"{'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'db ms':>7}")
+    for name, stats in results.items():
+        print(f"{name:<10} {stats['requests']:>9} {stats['errors']:>6} "
+              f"{stats['throughput']:>8.1f} {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} "
+              f"{stats['p99_ms']:>8.1f} {_fmt(stats['db_queries_mean'], 8, 1)} "
+              f"{_fmt(stats['db_time_ms_mean'], 7, 2)}")
+
+
+def compare(before_path, after_path):
+    """Print the change of each scenario between two saved runs"""
+    before = json.loads(Path(before_path).read_text())
+    after = json.loads(Path(after_path).read_text())
+    print(f"before: {before['meta'].get('commit')}  after: {after['meta'].get('commit')}")
+    print(f"{'scenario':<10} {'metric':<16} {'before':>10} {'after':>10} {'change':>8}")
+    for name, stats in after['results'].items():
+        old = before['results'].get(name)
+        if old is None:
+            continue
+        for metric in ('throughput', 'p50_ms', 'p95_ms', 'p99_ms', 'db_queries_mean'):
+            if old.get(metric) is None or stats.get(metric) is None:
+                continue
+            change = (
+                f'{(stats[metric] - old[metric]) / old[metric] * 100:+.1f}%'
+                if old[metric] else '-'
+            )
+            print(f"{name:<10} {metric:<16} {old[metric]:>10.2f} "
+                  f"{stats[metric]:>10.2f} {change:>8}")
+
+
+def parse_mix(text):
+    mix = dict(SCENARIOS)
+    if text:
+        mix = {}
+        for item in text.split(','):
+            name, _, weight = item.partition('=')
+            if name not in SCENARIOS:
+                raise SystemExit(f'unknown scenario {name!r}, expected one of {sorted(SCENARIOS)}')
+            mix[name] = float(weight or 1)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--users', type=int, default=4)
+    parser.add_argument('--recipes', type=int, default=50, help='recipes per user')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--mix', help='weights as name=weight,... (default: SCENARIOS)')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='compare two saved runs instead of running')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    mix = parse_mix(args.mix)
+    accounts = prepare_accounts(args.base_url, args.users, args.recipes, args.seed)
+    results = run_mix(args.base_url, accounts, mix, args.concurrency, args.duration, args.seed)
+    print_results(results)
+    if results['all']['db_queries_mean'] is None:
+        print('No X-DB-Queries headers: start the server with QUERY_COUNT_HEADER=true',
+              file=sys.stderr)
+
+    if args.output:
+        report = {
+            'meta': {
+                'commit': git_commit(),
+                'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                'base_url': args.base_url,
+                'users': args.users,
+                'recipes': args.recipes,
+                'concurrency': args.concurrency,
+                'duration': args.duration,
+                'seed': args.seed,
+                'mix': mix,
+            },
+            'results': results,
+        }
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
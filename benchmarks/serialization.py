@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""
+Compare building and rendering a user's recipe list with the serializers
+and with the read fast path (recipe.representations + FastJSONRenderer).
+
+Runs in process against the configured database, e.g. one filled with
+
+    python app/manage.py seed_data --users 1 --recipes 5000
+
+and checks that both paths produce the same bytes before timing them:
+
+    python benchmarks/serialization.py --email seed-0-0@example.com --repeat 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'app'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+
+
+def serializer_path(queryset):
+    from rest_framework.renderers import JSONRenderer
+    from recipe.serializers import RecipeDetailSerializer
+
+    data = RecipeDetailSerializer(queryset.with_related(), many=True).data
+    return JSONRenderer().render(data)
+
+
+def fast_path(queryset):
+    from core.renderers import FastJSONRenderer
+    from recipe.representations import recipe_values, represent_recipes
+
+    return FastJSONRenderer().render(represent_recipes(recipe_values(queryset)))
+
+
+def timed(function, queryset, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(queryset)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--email', required=True, help='user whose recipes are listed')
+    parser.add_argument('--limit', type=int, help='only the first N recipes')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per path (median)')
+    args = parser.parse_args(argv)
+
+    import django
+    django.setup()
+    from core.models import Recipe
+
+    queryset = Recipe.objects.filter(user__email=args.email).order_by('id')
+    if args.limit:
+        queryset = queryset[:args.limit]
+    expected = serializer_path(queryset)
+    if fast_path(queryset) != expected:
+        sys.exit('The fast path output differs from the serializers')
+
+    count = len(queryset)
+    slow = timed(serializer_path, queryset, args.repeat)
+    fast = timed(fast_path, queryset, args.repeat)
+    print(f'{count} recipes, {len(expected)} bytes')
+    print(f'{"path":<12}{"ms":>10}{"recipes/s":>12}')
+    for label, seconds in (('serializer', slow), ('fast', fast)):
+        print(f'{label:<12}{seconds * 1000:>10.1f}{count / seconds:>12.0f}')
+    print(f'speedup {slow / fast:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
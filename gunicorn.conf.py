@@ -1,18 +1,66 @@
 # Gunicorn configuration file for Render deployment
+#
+# GUNICORN_PROFILE picks the worker model:
+#   sync    - one request at a time per worker process (default)
+#   gthread - GUNICORN_THREADS requests at a time per worker process
+#   asgi    - uvicorn workers serving asgi:application, needed for the
+#             async endpoints under /api/async/recipe/
+# See "Gunicorn profiles" in README.md for measured memory and throughput.
 import multiprocessing
 import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'app'))
+
+from core.db import connections_per_worker, max_workers  # noqa: E402
+from core.metrics import DEFAULT_DIRECTORY, clear_directory, retire_pid  # noqa: E402
+
+PROFILES = {
+    'sync': {'worker_class': 'sync', 'wsgi_app': 'wsgi:application', 'threads': 1},
+    'gthread': {'worker_class': 'gthread', 'wsgi_app': 'wsgi:application', 'threads': 4},
+    'asgi': {
+        'worker_class': 'uvicorn_worker.UvicornWorker',
+        'wsgi_app': 'asgi:application',
+        'threads': 1,
+    },
+}
+
+profile_name = os.environ.get('GUNICORN_PROFILE', 'sync').lower()
+if profile_name not in PROFILES:
+    raise RuntimeError(
+        f'Unknown GUNICORN_PROFILE {profile_name!r}, expected one of {sorted(PROFILES)}'
+    )
+profile = PROFILES[profile_name]
 
 # Server socket
 bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
 backlog = 2048
 
 # Worker processes
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = 'sync'
-worker_connections = 1000
-timeout = 30
+wsgi_app = profile['wsgi_app']
+worker_class = profile['worker_class']
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', profile['threads']))
 keepalive = 2
 
+# Database connection budget: every request thread and image processing
+# thread keeps one persistent connection, so cap the workers to stay under
+# DB_MAX_CONNECTIONS (the server's max_connections, or the pooler's limit)
+# minus DB_RESERVED_CONNECTIONS for migrations and shells. ASGI workers
+# open a connection per in-flight request and close it afterwards; run them
+# behind PgBouncer if that can exceed the limit.
+db_connections_per_worker = connections_per_worker(
+    threads, int(os.environ.get('IMAGE_PROCESSING_WORKERS', '2'))
+)
+db_max_workers = max_workers(
+    int(os.environ.get('DB_MAX_CONNECTIONS', '0')),
+    db_connections_per_worker,
+    reserved=int(os.environ.get('DB_RESERVED_CONNECTIONS', '3')),
+)
+if db_max_workers is not None and workers > db_max_workers:
+    workers = db_max_workers
+
 # Restart workers after this many requests to prevent memory leaks
 max_requests = 1000
 max_requests_jitter = 50
@@ -26,8 +74,51 @@ loglevel = 'info'
 proc_name = 'recipe_api'
 
 # Worker timeouts
-timeout = 120
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
 graceful_timeout = 120
 
-# Preload app for better memory usage
+# Preload app for better memory usage. The workers share the imported code
+# but must not share anything opened in the master; see post_fork.
 preload_app = True
+
+
+def on_starting(server):
+    """Start the metrics of this server run from zero"""
+    clear_directory(os.environ.get('METRICS_DIR', DEFAULT_DIRECTORY))
+
+
+def post_fork(server, worker):
+    """Drop state a worker must not inherit from the preloading master"""
+    from django.core.cache import caches
+    from django.db import connections
+
+    from core.db import stats as db_stats
+    from core.metrics import registry
+    from recipe.cache import stats as cache_stats
+    from recipe.images import reset_executor
+    from user.authentication import disable_process_local_cache
+
+    # Sockets opened by the master would be shared by every worker.
+    connections.close_all()
+    caches.close_all()
+    # Threads do not survive fork; the pool is recreated on first use.
+    reset_executor()
+    db_stats.reset()
+    cache_stats.reset()
+    registry.reset()
+    # A token revoked in one worker must not stay valid in the others.
+    if server.cfg.workers > 1:
+        disable_process_local_cache()
+
+
+def worker_exit(server, worker):
+    """Log connection reuse and keep the worker's metrics in the totals"""
+    from core.db import stats
+    from core.metrics import get_exporter
+    server.log.info('Worker %s database connections: %s', worker.pid, stats.snapshot())
+    get_exporter().retire()
+
+
+def child_exit(server, worker):
+    """Keep the metrics of a worker killed before worker_exit could run"""
+    retire_pid(os.environ.get('METRICS_DIR', DEFAULT_DIRECTORY), worker.pid)
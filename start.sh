@@ -13,7 +13,7 @@ python test_wsgi.py
 
 if [ $? -eq 0 ]; then
     echo "✓ WSGI test passed, starting gunicorn..."
-    exec gunicorn wsgi:application -c gunicorn.conf.py
+    exec gunicorn -c gunicorn.conf.py
 else
     echo "❌ WSGI test failed, exiting..."
     exit 1